@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Analyze Every Pull of a Boss in One Report
+
+analyze_druid.py analyzes one fight: the first kill, or the first pull if the
+boss wasn't killed. Progression reports often hold 10-30 pulls of the same
+boss. Analyzing them one by one would repeat the fights/masterData query and
+every event query for each pull.
+
+This mode fetches the report's fights and masterData once. It then fetches
+each per-fight event stream (buffs, resources, Lifebloom, damage taken,
+casts) once for all pulls together, with one paginated events query whose
+fightIDs lists every pull. The events are split by fight in memory, and each
+pull runs through the normal analysis pipeline with its share handed in via
+event_archive.prefill(). Only the per-fight tables (composition, healing,
+damage taken, player details) are still requested per pull.
+
+Phases are not supported in this mode; every pull is analyzed as a whole.
+
+Usage:
+    python all_pulls.py <report_id> <boss_name> <player_name> [--kills-only] [--details] [--archive]
+
+Examples:
+    python all_pulls.py wX7H9RtYJ48P1cdW Brutallus Mercychann
+    python all_pulls.py m329HYcBhMdfJgXz "M'uru" Treeheals --details
+"""
+
+import argparse
+import numpy as np
+import event_archive
+from auth import get_user_access_token
+from analyze_druid import (
+    analyze_druid_performance, api_request_with_retry, display_results,
+    FIGHTS_QUERY, LIFEBLOOM_ID
+)
+
+# Per-pull event queries that are fetched once for every pull: query description
+# (as used by run_druid_analysis) -> events filter (player_id is filled in).
+# Resources and Casts include classResources, which the mana timeline reads.
+BATCHED_QUERIES = {
+    "Fetch buff events": "dataType: Buffs",
+    "Check Vampiric Touch": "dataType: Resources, targetID: {player_id}, includeResources: true",
+    "Fetch Lifebloom uptime": "dataType: Buffs, sourceID: {player_id}, abilityID: " + str(LIFEBLOOM_ID),
+    "Fetch damage events": "dataType: DamageTaken",
+    "Fetch cast events": "dataType: Casts, sourceID: {player_id}, includeResources: true"
+}
+BATCH_DESCRIPTION_SUFFIX = " (all pulls)"
+EVENTS_PAGE_LIMIT = 10000
+
+
+def get_headers():
+    """API request headers with the user access token."""
+    return {
+        "Authorization": f"Bearer {get_user_access_token()}",
+        "Content-Type": "application/json"
+    }
+
+
+def events_payload(events):
+    """Wrap events in the response shape of a reportData events query."""
+    return {"data": {"reportData": {"report": {"events": {"data": events}}}}}
+
+
+def fetch_pull_events(report_code, fight_ids, event_filter, start_time, end_time, headers, query_description):
+    """
+    Fetch one event stream for several fights, following nextPageTimestamp.
+
+    Args:
+        report_code: The report code
+        fight_ids: Fight IDs to include
+        event_filter: Events arguments (dataType, sourceID, ...)
+        start_time: Report-relative start of the first fight
+        end_time: Report-relative end of the last fight
+        headers: API request headers
+        query_description: Description for logging and metrics
+
+    Returns:
+        List of event dicts across all pages
+    """
+    events = []
+    page_start = start_time
+
+    while page_start is not None:
+        query = f"""
+        query {{
+          reportData {{
+            report(code: "{report_code}") {{
+              events(fightIDs: {list(fight_ids)}, {event_filter}, startTime: {page_start}, endTime: {end_time}, limit: {EVENTS_PAGE_LIMIT}) {{
+                data
+                nextPageTimestamp
+              }}
+            }}
+          }}
+        }}
+        """
+
+        response = api_request_with_retry(
+            query=query,
+            headers=headers,
+            query_description=query_description
+        )
+
+        if not response or response.status_code != 200:
+            raise Exception(f"Query failed: {query_description}")
+
+        page = response.json().get("data", {}).get("reportData", {}).get("report", {}).get("events") or {}
+        events.extend(page.get("data") or [])
+        page_start = page.get("nextPageTimestamp")
+
+    return events
+
+
+def split_events_by_fight(events, pulls):
+    """
+    Split a time-sorted event list into the pulls it came from.
+
+    Args:
+        events: Event dicts from a multi-fight events query
+        pulls: Fights with 'id', 'startTime' and 'endTime' (report-relative)
+
+    Returns:
+        Dict of fight ID -> that fight's events, in time order
+    """
+    timestamps = np.array([e.get("timestamp", 0) for e in events], dtype=np.int64)
+    order = np.argsort(timestamps, kind='stable')
+    timestamps = timestamps[order]
+
+    by_fight = {}
+    for pull in pulls:
+        lo = np.searchsorted(timestamps, pull["startTime"], side='left')
+        hi = np.searchsorted(timestamps, pull["endTime"], side='right')
+        by_fight[pull["id"]] = [events[i] for i in order[lo:hi]]
+    return by_fight
+
+
+def analyze_all_pulls(report_code, boss_name, player_name, kills_only=False, archive=False):
+    """
+    Analyze every pull of a boss in a report from one batched fetch.
+
+    Args:
+        report_code: The report code/ID
+        boss_name: The name of the boss
+        player_name: The name of the Restoration Druid to analyze
+        kills_only: If True, skip wipes
+        archive: If True, save each pull's API responses to the event archive
+
+    Returns:
+        List of (fight, result) tuples in pull order; result is None if that pull failed
+    """
+    headers = get_headers()
+
+    print(f"Fetching fights for report {report_code}...")
+    response = api_request_with_retry(
+        query=FIGHTS_QUERY,
+        variables={"code": report_code},
+        headers=headers,
+        query_description="Fetch fights"
+    )
+    if not response or response.status_code != 200:
+        raise Exception(f"Query failed: {response.status_code} - {response.text}")
+
+    fights_payload = response.json()
+    if "errors" in fights_payload:
+        raise Exception(f"GraphQL errors: {fights_payload['errors']}")
+
+    report = fights_payload.get("data", {}).get("reportData", {}).get("report")
+    if not report:
+        raise Exception(f"Report {report_code} not found!")
+
+    pulls = [
+        f for f in report.get("fights", [])
+        if f.get("encounterID", 0) > 0 and f.get("name") == boss_name and (f.get("kill") or not kills_only)
+    ]
+    if not pulls:
+        raise Exception(f"Boss '{boss_name}' not found in report!")
+
+    actors = report.get("masterData", {}).get("actors", [])
+    player_id = next((a.get("id") for a in actors if a.get("name") == player_name), None)
+    if not player_id:
+        raise Exception(f"Player '{player_name}' not found in report!")
+
+    print(f"✓ Found {len(pulls)} {boss_name} pulls ({sum(1 for f in pulls if f.get('kill'))} kills)")
+
+    # One paginated request per event stream, covering every pull
+    fight_ids = [f["id"] for f in pulls]
+    start_time = min(f["startTime"] for f in pulls)
+    end_time = max(f["endTime"] for f in pulls)
+
+    prefilled = {fight_id: {} for fight_id in fight_ids}
+    fights_key = event_archive.get_request_key("Fetch fights", {"code": report_code})
+    for fight_id in fight_ids:
+        prefilled[fight_id][fights_key] = fights_payload
+
+    for query_description, event_filter in BATCHED_QUERIES.items():
+        events = fetch_pull_events(
+            report_code, fight_ids, event_filter.format(player_id=player_id), start_time, end_time,
+            headers, query_description + BATCH_DESCRIPTION_SUFFIX
+        )
+        print(f"✓ {query_description}: {len(events)} events across {len(pulls)} pulls")
+
+        request_key = event_archive.get_request_key(query_description, None)
+        for fight_id, fight_events in split_events_by_fight(events, pulls).items():
+            prefilled[fight_id][request_key] = events_payload(fight_events)
+
+    # Ability names don't change between pulls, so each one is fetched once
+    ability_responses = {}
+
+    results = []
+    for pull_number, fight in enumerate(pulls, 1):
+        print()
+        print(f"===== Pull {pull_number}/{len(pulls)}: fight {fight['id']} ({'KILL' if fight.get('kill') else 'WIPE'}) =====")
+
+        responses = dict(prefilled[fight["id"]])
+        responses.update(ability_responses)
+
+        try:
+            with event_archive.capture() as captured, event_archive.prefill(responses):
+                data = analyze_druid_performance(report_code, boss_name, player_name, fight_id=fight["id"])
+        except Exception as e:
+            print(f"⚠ Pull {pull_number} failed: {e}")
+            results.append((fight, None))
+            continue
+
+        for request in captured:
+            if request["step"] == "ability_names":
+                ability_responses[event_archive.get_request_key(request["description"], request["variables"])] = request["response"]
+
+        if archive:
+            event_archive.save_entry(captured, report_code, data)
+
+        results.append((fight, data))
+
+    return results
+
+
+def print_pull_summary(results):
+    """Print one line per pull."""
+    print()
+    print("=" * 100)
+    print("ALL PULLS")
+    print("=" * 100)
+    print(f"{'Pull':<6} {'Fight':<7} {'Result':<7} {'Duration':<10} {'LB Uptime':>10} {'LB on Tank':>11} "
+          f"{'LB HPS':>9} {'Rotations':>10} {'Tank Rot %':>11}")
+    print("-" * 100)
+
+    for pull_number, (fight, data) in enumerate(results, 1):
+        result_str = 'Kill' if fight.get('kill') else 'Wipe'
+        if data is None:
+            print(f"{pull_number:<6} {fight['id']:<7} {result_str:<7} {'ERROR':<10}")
+            continue
+        duration = f"{data['duration_minutes']}m {data['duration_seconds']}s"
+        print(f"{pull_number:<6} {fight['id']:<7} {result_str:<7} {duration:<10} "
+              f"{data['lifebloom_uptime_percent']:>9.2f}% {data['lifebloom_tank_uptime_percent']:>10.2f}% "
+              f"{data['lifebloom_hps']:>9.2f} {data['rotation_count']:>10} {data['tank_rotation_percent']:>10.2f}%")
+
+    print("=" * 100)
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description="Analyze every pull of a boss in one report (fetching shared events once)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python all_pulls.py wX7H9RtYJ48P1cdW Brutallus Mercychann
+  python all_pulls.py m329HYcBhMdfJgXz "M'uru" Treeheals --details
+        """
+    )
+    parser.add_argument("report_code", help="WarcraftLogs report code")
+    parser.add_argument("boss_name", help="Boss name as shown in the report")
+    parser.add_argument("player_name", help="Restoration Druid to analyze")
+    parser.add_argument("--kills-only", action="store_true", help="Skip wipes")
+    parser.add_argument("--details", action="store_true", help="Print the full analysis of every pull")
+    parser.add_argument("--archive", action="store_true",
+                        help="Save raw API responses of each pull to the event archive (see event_archive.py)")
+    args = parser.parse_args()
+
+    try:
+        results = analyze_all_pulls(args.report_code, args.boss_name, args.player_name,
+                                    kills_only=args.kills_only, archive=args.archive)
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        return 1
+
+    if args.details:
+        for fight, data in results:
+            if data is not None:
+                display_results(data)
+
+    print_pull_summary(results)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -11,6 +11,7 @@ Example:
     python analyze_druid.py wX7H9RtYJ48P1cdW Brutallus Mercychann
 """
 
+import os
 import sys
 import time
 import requests
@@ -18,9 +19,21 @@ from datetime import datetime
 from collections import Counter
 from auth import get_user_access_token
 from tbc_haste_items import calculate_gear_haste
+import event_archive
+import event_arrays
+import numpy as np
+import metrics
+import profiling
+from cast_timeline import CastTimeline, RotationSection
+import phases
+import mana_timeline
+from phases import (
+    LADY_SACROLASH_GAME_ID, GRAND_WARLOCK_ALYTHESS_GAME_ID, EREDAR_TWINS_ENCOUNTER_ID, MURU_ENCOUNTER_ID
+)
 
 # API Configuration
-API_URL = "https://www.warcraftlogs.com/api/v2/user"
+# Overridable to point at a local stand-in server (see wcl_standin.py)
+API_URL = os.environ.get("WARCRAFTLOGS_API_URL", "https://www.warcraftlogs.com/api/v2/user")
 REQUEST_TIMEOUT = 30  # seconds
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 2  # seconds
@@ -47,6 +60,57 @@ REGROWTH_IDS = {
     8941: "Rank 5"
 }
 
+# Lower Regrowth ranks (not reported in the healing breakdown, but still Regrowth casts)
+REGROWTH_LOW_RANK_IDS = {8936, 8938, 8939, 8940}
+HEALING_TOUCH_IDS = {5185, 5186, 5187, 5188, 5189, 6778, 8903, 9758, 9888, 9889, 25297, 26978, 26979}
+REBIRTH_IDS = {20484, 20739, 20742, 20747, 20748, 26994}
+
+# Mana potions, runes and trinket uses left out of the cast timeline
+FILTERED_CAST_IDS = {
+    17531: "Major Mana Potion",
+    28499: "Super Mana Potion",
+    27869: "Dark Rune",
+    35165: "Essence of the Martyr"
+}
+
+# Cast categories used by the rotation tracking (step 11)
+CAST_OTHER = 0
+CAST_LIFEBLOOM = 1
+CAST_INSTANT = 2
+CAST_REGROWTH = 3
+CAST_REBIRTH = 4
+CAST_FILTERED = 5
+
+ABILITY_CATEGORIES = {
+    LIFEBLOOM_ID: CAST_LIFEBLOOM,
+    **{ability_id: CAST_INSTANT for ability_id in (
+        REJUVENATION_ID, TREE_OF_LIFE_ID, SWIFTMEND_ID, NATURES_SWIFTNESS_ID, INNERVATE_ID
+    )},
+    **{ability_id: CAST_REGROWTH for ability_id in set(REGROWTH_IDS) | REGROWTH_LOW_RANK_IDS},
+    **{ability_id: CAST_REBIRTH for ability_id in REBIRTH_IDS},
+    **{ability_id: CAST_FILTERED for ability_id in set(FILTERED_CAST_IDS) | HEALING_TOUCH_IDS}
+}
+
+# Abilities missing from ABILITY_CATEGORIES are classified once by name (first match wins)
+CATEGORY_NAME_RULES = [
+    ("Regrowth", CAST_REGROWTH),
+    ("Restore Mana", CAST_FILTERED),
+    ("Healing Touch", CAST_FILTERED),
+    ("Dark Rune", CAST_FILTERED),
+    ("Hopped Up", CAST_FILTERED),
+    ("Essence of the Martyr", CAST_FILTERED),
+    ("Rebirth", CAST_REBIRTH)
+]
+
+# (class, spec) from the Summary table's composition -> healing spec name
+HEALER_SPECS = {
+    ("Paladin", "Holy"): "Holy Paladin",
+    ("Priest", "Holy"): "Holy Priest",
+    ("Priest", "Discipline"): "Discipline Priest",
+    ("Druid", "Restoration"): "Restoration Druid",
+    ("Shaman", "Restoration"): "Restoration Shaman"
+}
+
 # Rotation tracking constants
 LIFEBLOOM_DURATION = 7.0  # seconds
 BASE_GCD = 1.5  # seconds at 0 haste
@@ -54,15 +118,97 @@ HASTE_RATING_DIVISOR = 1577  # TBC haste rating conversion
 DEFAULT_ROTATION_TIMEOUT = 5.5  # fallback: 7.0 - 1.5 (0 haste GCD)
 CASTS_BETWEEN_SEPARATORS = 5
 
-# Eredar Twins gameIDs (constant across all reports)
-LADY_SACROLASH_GAME_ID = 25165
-GRAND_WARLOCK_ALYTHESS_GAME_ID = 25166
-EREDAR_TWINS_ENCOUNTER_ID = 727
+# Events queries are paged via nextPageTimestamp (see fetch_events). The first
+# page keeps the step's query description, so its archive key is unchanged;
+# later pages are requested under these descriptions.
+EVENTS_PAGE_LIMIT = 10000
+EVENT_PAGE_DESCRIPTIONS = {
+    "Fetch buff events": "Fetch buff events (next page)",
+    "Check Vampiric Touch": "Fetch resource events",
+    "Fetch Lifebloom uptime": "Fetch Lifebloom uptime (next page)",
+    "Fetch damage events": "Fetch damage events (next page)",
+    "Fetch cast events": "Fetch cast events (next page)",
+    "Detect phases": "Detect phases (next page)"
+}
+
+# GCD utilization (see calculate_gcd_utilization)
+OFF_GCD_CAST_IDS = set(FILTERED_CAST_IDS) | {NATURES_SWIFTNESS_ID}
+IDLE_GAP_GCDS = 2  # gaps between casts longer than this many GCDs count as idle
+
+# Report fights (with phase transitions) and actors, fetched once per analysis
+FIGHTS_QUERY = """
+query ($code: String!) {
+  reportData {
+    report(code: $code) {
+      title
+      startTime
+      fights {
+        id
+        encounterID
+        name
+        kill
+        startTime
+        endTime
+        phaseTransitions {
+          id
+          startTime
+        }
+      }
+      masterData {
+        actors {
+          id
+          name
+          type
+          subType
+          gameID
+        }
+      }
+    }
+  }
+}
+"""
+
+# Query for each fallback phase detector (see phases.py): events filter, limit, description
+PHASE_DETECTOR_QUERIES = {
+    "death": ("dataType: Deaths\n            hostilityType: Enemies", 100, "Detect phases (death)"),
+    "first_damage": ("dataType: DamageTaken", 100, "Detect phases (first damage)"),
+    "last_damage": ("dataType: DamageTaken", None, "Detect phases")  # paged with fetch_events
+}
 
-# M'uru gameIDs (constant across all reports)
-MURU_GAME_ID = 25741
-ENTROPIUS_GAME_ID = 25840
-MURU_ENCOUNTER_ID = 728
+# Pipeline steps reported to progress_callback, in order: (step, label)
+ANALYSIS_STEPS = [
+    ("fights", "Finding fight"),
+    ("phases", "Detecting phases"),
+    ("composition", "Querying healing composition"),
+    ("buffs", "Querying buffs"),
+    ("resources", "Querying resource events"),
+    ("lifebloom", "Calculating Lifebloom uptime"),
+    ("healing", "Querying healing breakdown"),
+    ("rankings", "Querying rankings"),
+    ("damage_taken", "Querying raid damage taken"),
+    ("tanks", "Identifying tanks"),
+    ("tank_timeline", "Building tank timeline"),
+    ("casts", "Querying cast events"),
+    ("ability_names", "Querying ability names"),
+    ("rotations", "Processing rotations"),
+]
+ANALYSIS_STEP_INDEX = {step: i for i, (step, _) in enumerate(ANALYSIS_STEPS)}
+
+
+def report_progress(progress_callback, step, partial=None):
+    """
+    Notify progress_callback that a pipeline step is starting.
+
+    The callback receives (step, label, percent, partial), where percent is the
+    share of steps already completed and partial holds the result fields the
+    previous steps finished (same keys as the final result dict).
+    """
+    metrics.mark_stage(step)
+    profiling.mark_step(step)
+    if progress_callback is None:
+        return
+    index = ANALYSIS_STEP_INDEX[step]
+    progress_callback(step, ANALYSIS_STEPS[index][1], int(index * 100 / len(ANALYSIS_STEPS)), partial or {})
 
 
 def calculate_gcd(haste_rating):
@@ -82,6 +228,55 @@ def calculate_gcd(haste_rating):
     return BASE_GCD / (1 + (haste_rating / HASTE_RATING_DIVISOR))
 
 
+def get_healer_composition(composition):
+    """
+    Group the healers of a fight by healing spec.
+
+    Args:
+        composition: The 'composition' list of a Summary table
+
+    Returns:
+        Dict of spec name (HEALER_SPECS values) -> player names
+    """
+    healer_composition = {spec: [] for spec in HEALER_SPECS.values()}
+
+    for player_data in composition:
+        for spec_data in player_data.get("specs", []):
+            spec = HEALER_SPECS.get((player_data.get("type"), spec_data.get("spec")))
+            if spec:
+                healer_composition[spec].append(player_data.get("name"))
+
+    return healer_composition
+
+
+def classify_casts(ability_ids, ability_names):
+    """
+    Look up the category (CAST_*) of every cast's ability.
+
+    Each distinct ability is classified once - from ABILITY_CATEGORIES, or by
+    name for abilities the table doesn't know - and the result is broadcast
+    back over the casts.
+
+    Args:
+        ability_ids: Ability ID of each cast (array-like)
+        ability_names: Dict mapping ability IDs to names (used only for unknown IDs)
+
+    Returns:
+        NumPy int8 array with one category per cast
+    """
+    unique_ids, inverse = np.unique(np.asarray(ability_ids, dtype=np.int64), return_inverse=True)
+
+    categories = np.empty(len(unique_ids), dtype=np.int8)
+    for i, ability_id in enumerate(unique_ids.tolist()):
+        category = ABILITY_CATEGORIES.get(ability_id)
+        if category is None:
+            name = ability_names.get(ability_id, "")
+            category = next((c for text, c in CATEGORY_NAME_RULES if text in name), CAST_OTHER)
+        categories[i] = category
+
+    return categories[inverse]
+
+
 def calculate_rotation_timeout(haste_rating):
     """
     Calculate rotation timeout based on Lifebloom duration minus GCD.
@@ -99,40 +294,157 @@ def calculate_rotation_timeout(haste_rating):
     return LIFEBLOOM_DURATION - gcd
 
 
-def detect_eredar_twins_phases(report_code, fight_id, fight_start_time, all_actors, headers):
+def calculate_gcd_utilization(cast_array, gcd, window_start, window_end):
+    """
+    Measure how much of a fight a player spent casting, from the cast stream alone.
+
+    Each cast keeps the player busy from its begincast (or the cast itself for
+    instants) until the cast lands or the GCD ends, whichever is later. Gaps
+    between consecutive casts that are shorter than one GCD are the player's
+    reaction time between buttons, so their distribution estimates latency.
+
+    Args:
+        cast_array: EVENT_DTYPE array of the player's Casts events, in time order
+        gcd: The player's haste-adjusted GCD in seconds
+        window_start: Report-relative start of the analyzed window (ms)
+        window_end: Report-relative end of the analyzed window (ms)
+
+    Returns:
+        dict with active_time_percent, casts_per_minute, idle_gap_count,
+        idle_gap_seconds, estimated_latency_ms and latency_p90_ms
+    """
+    gcd_ms = gcd * 1000
+    window_ms = window_end - window_start
+    starts, ends = event_arrays.cast_intervals(cast_array, gcd_ms, OFF_GCD_CAST_IDS)
+
+    active_ms = event_arrays.covered_length(
+        np.clip(starts, window_start, window_end), np.clip(ends, window_start, window_end)
+    )
+    gaps = event_arrays.idle_gaps(starts, ends)
+    idle = gaps[gaps > IDLE_GAP_GCDS * gcd_ms]
+    chained = gaps[(gaps >= 0) & (gaps < gcd_ms)]
+
+    return {
+        "active_time_percent": (active_ms / window_ms * 100) if window_ms > 0 else 0,
+        "casts_per_minute": (len(starts) / (window_ms / 60000)) if window_ms > 0 else 0,
+        "idle_gap_count": len(idle),
+        "idle_gap_seconds": int(idle.sum()) / 1000,
+        "estimated_latency_ms": float(np.median(chained)) if len(chained) else 0,
+        "latency_p90_ms": float(np.percentile(chained, 90)) if len(chained) else 0
+    }
+
+
+def fetch_events(report_code, fight_id, event_filter, start_time, end_time, headers, query_description,
+                 required=False):
     """
-    Detect phase boundaries for Eredar Twins encounter.
+    Fetch one events stream of a fight, following nextPageTimestamp.
 
-    Phase 1: Lady Sacrolash is active (taking damage)
-    Phase 2: Only Grand Warlock Alythess remains (after Sacrolash stops taking damage)
+    The first page is requested under query_description. Later pages pass
+    their start time as a variable and use EVENT_PAGE_DESCRIPTIONS, so each
+    page has its own archive key.
 
     Args:
         report_code: The report code
         fight_id: The fight ID
-        fight_start_time: The absolute start time of the fight (from report)
-        all_actors: List of all actors from report masterData
+        event_filter: Events arguments (dataType, sourceID, ...)
+        start_time: Report-relative start of the analyzed window
+        end_time: Report-relative end of the analyzed window
         headers: API request headers
+        query_description: Description of the first page (a key of EVENT_PAGE_DESCRIPTIONS)
+        required: Raise if a request fails instead of keeping the events fetched so far
 
     Returns:
-        Dictionary with phase information:
-        {
-            'has_phases': bool,
-            'phase1_end_ms': int,  # Relative to fight start (0-based)
-            'phase2_start_ms': int  # Relative to fight start (0-based)
-        }
+        List of event dicts across all pages
+    """
+    first_page_query = f"""
+    query {{
+      reportData {{
+        report(code: "{report_code}") {{
+          events(fightIDs: {[fight_id]}, {event_filter}, startTime: {start_time}, endTime: {end_time}, limit: {EVENTS_PAGE_LIMIT}) {{
+            data
+            nextPageTimestamp
+          }}
+        }}
+      }}
+    }}
+    """
+    page_query = f"""
+    query ($startTime: Float) {{
+      reportData {{
+        report(code: "{report_code}") {{
+          events(fightIDs: {[fight_id]}, {event_filter}, startTime: $startTime, endTime: {end_time}, limit: {EVENTS_PAGE_LIMIT}) {{
+            data
+            nextPageTimestamp
+          }}
+        }}
+      }}
+    }}
     """
-    print("Detecting Eredar Twins phase boundaries...")
+    page_description = EVENT_PAGE_DESCRIPTIONS[query_description]
+
+    events = []
+    query, variables, description = first_page_query, None, query_description
+
+    while True:
+        response = api_request_with_retry(query=query, variables=variables, headers=headers, query_description=description)
+        if not response or response.status_code != 200:
+            if required:
+                raise Exception(f"Query failed: {response.status_code} - {response.text}" if response
+                                else f"Query failed: {description}")
+            print(f"⚠ {description} failed, continuing with {len(events)} events")
+            break
 
-    # Find Lady Sacrolash's actor ID by gameID
-    sacrolash_actor_id = None
-    for actor in all_actors:
-        if actor.get("gameID") == LADY_SACROLASH_GAME_ID:
-            sacrolash_actor_id = actor.get("id")
+        page = response.json().get("data", {}).get("reportData", {}).get("report", {}).get("events") or {}
+        events.extend(page.get("data") or [])
+
+        next_page = page.get("nextPageTimestamp")
+        if next_page is None:
             break
 
-    if sacrolash_actor_id is None:
-        print("  ⚠ Could not find Lady Sacrolash in report actors")
-        return {'has_phases': False}
+        variables = {"startTime": next_page}
+        # Replaying an archive made before this stream was paged: keep the first page only
+        if event_archive.is_replaying() and not event_archive.has_response(page_description, variables):
+            break
+        query, description = page_query, page_description
+
+    return events
+
+
+def find_phase_boundary(report_code, fight_id, fight_start_time, fight_end_time, detector, actor_id, headers):
+    """
+    Run one fallback phase detector and return the Phase 2 start.
+
+    "death" and "first_damage" need one small page. "last_damage" pages
+    through all of the NPC's damage taken, since the last hit of a long pull
+    can be well past the first page.
+
+    Args:
+        report_code: The report code
+        fight_id: The fight ID
+        fight_start_time: The report-relative start time of the fight
+        fight_end_time: The report-relative end time of the fight
+        detector: "death", "first_damage" or "last_damage"
+        actor_id: Report actor ID of the NPC the detector watches
+        headers: API request headers
+
+    Returns:
+        Phase 2 start relative to fight start (0-based), or None if not found
+    """
+    event_filter, limit, description = PHASE_DETECTOR_QUERIES[detector]
+
+    # Replaying an archive that predates this detector: skip it instead of failing
+    if event_archive.is_replaying() and not event_archive.has_response(description, None):
+        return None
+
+    if detector == "last_damage":
+        try:
+            events = fetch_events(report_code, fight_id, f"{event_filter}, targetID: {actor_id}",
+                                  fight_start_time, fight_end_time, headers, description, required=True)
+        except Exception as e:
+            # A missing page would move the boundary early, so fall through to the next detector
+            print(f"  ⚠ {e}")
+            return None
+        return events[-1].get("timestamp") - fight_start_time if events else None
 
     query = f"""
     query {{
@@ -140,9 +452,9 @@ def detect_eredar_twins_phases(report_code, fight_id, fight_start_time, all_acto
         report(code: "{report_code}") {{
           events(
             fightIDs: {[fight_id]}
-            dataType: DamageTaken
-            targetID: {sacrolash_actor_id}
-            limit: 10000
+            {event_filter}
+            targetID: {actor_id}
+            limit: {limit}
           ) {{
             data
           }}
@@ -154,35 +466,67 @@ def detect_eredar_twins_phases(report_code, fight_id, fight_start_time, all_acto
     response = api_request_with_retry(
         query=query,
         headers=headers,
-        query_description="Detect phases"
+        query_description=description
     )
 
     if not response or response.status_code != 200:
-        print("  ⚠ Could not detect phases, treating as single-phase fight")
-        return {'has_phases': False}
+        return None
 
     result = response.json()
-    sacrolash_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
+    events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
+    if not events:
+        return None
+
+    return events[0].get("timestamp") - fight_start_time
+
+
+def detect_phases(report_code, fight, all_actors, headers):
+    """
+    Detect the phases of a fight for an encounter in phases.PHASE_REGISTRY.
+
+    Uses the fight's phaseTransitions from the report when present, otherwise
+    the encounter's fallback detectors in registry order.
 
-    if not sacrolash_events:
-        print("  ⚠ No damage events found for Lady Sacrolash")
+    Args:
+        report_code: The report code
+        fight: The fight from the fights query (with phaseTransitions)
+        all_actors: List of all actors from report masterData
+        headers: API request headers
+
+    Returns:
+        Dictionary with phase information:
+        {
+            'has_phases': bool,
+            'source': str,  # 'report' or the detector that found the boundary
+            'transitions': [{'id': int, 'start_ms': int}, ...]  # Relative to fight start (0-based)
+        }
+    """
+    spec = phases.get_phase_spec(fight.get("encounterID"))
+    if spec is None:
+        print(f"  ⚠ No phases registered for {fight.get('name')}")
         return {'has_phases': False}
 
-    # Phase 1 ends when Lady Sacrolash stops taking damage
-    # Get the timestamp of her last damage event (absolute timestamp)
-    last_damage_event = sacrolash_events[-1]
-    last_damage_absolute = last_damage_event.get("timestamp")
+    print(f"Detecting {spec['name']} phase boundaries...")
+    fight_start_time = fight.get("startTime")
 
-    # Convert to fight-relative timestamp (0-based)
-    phase1_end_relative = last_damage_absolute - fight_start_time
+    transitions = phases.transitions_from_report(fight.get("phaseTransitions"), fight_start_time)
+    if transitions:
+        print(f"✓ {len(transitions)} phase transitions from report metadata")
+        return {'has_phases': True, 'source': 'report', 'transitions': transitions}
 
-    print(f"✓ Phase 1 ends at {phase1_end_relative}ms (fight-relative, 0-based)")
+    for detector, game_id in spec['detectors']:
+        actor_id = phases.find_actor_id(all_actors, game_id)
+        if actor_id is None:
+            continue
 
-    return {
-        'has_phases': True,
-        'phase1_end_ms': phase1_end_relative,
-        'phase2_start_ms': phase1_end_relative
-    }
+        boundary_ms = find_phase_boundary(report_code, fight["id"], fight_start_time, fight.get("endTime"),
+                                          detector, actor_id, headers)
+        if boundary_ms is not None:
+            print(f"✓ Phase 1 ends at {boundary_ms}ms (fight-relative, 0-based, from {detector})")
+            return {'has_phases': True, 'source': detector, 'transitions': phases.transitions_from_boundary(boundary_ms)}
+
+    print("  ⚠ Could not detect phases, treating as single-phase fight")
+    return {'has_phases': False}
 
 
 def detect_eredar_twins_phase1_tanks(report_code, fight_id, api_start_time, api_end_time, all_actors, actor_names, player_ids, headers):
@@ -206,8 +550,6 @@ def detect_eredar_twins_phase1_tanks(report_code, fight_id, api_start_time, api_
     Returns:
         Tuple of (tanks list, tank_ids set) where tanks is a list of dicts with 'name' and 'id'
     """
-    from collections import defaultdict
-
     print("Detecting Eredar Twins Phase 1 tanks based on boss damage...")
 
     # Find boss actor IDs by gameID (actor IDs are report-specific)
@@ -257,25 +599,10 @@ def detect_eredar_twins_phase1_tanks(report_code, fight_id, api_start_time, api_
     result = response.json()
     all_damage_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
 
-    # Filter events by boss source (using dynamically looked up actor IDs)
-    alythess_events = [e for e in all_damage_events if e.get("sourceID") == alythess_actor_id]
-    sacrolash_events = [e for e in all_damage_events if e.get("sourceID") == sacrolash_actor_id]
-
-    # Sum damage taken by each player from Alythess
-    alythess_damage_by_player = defaultdict(int)
-    for event in alythess_events:
-        target_id = event.get("targetID")
-        if target_id in player_ids:
-            damage = event.get("amount", 0) + event.get("absorbed", 0)
-            alythess_damage_by_player[target_id] += damage
-
-    # Sum damage taken by each player from Sacrolash
-    sacrolash_damage_by_player = defaultdict(int)
-    for event in sacrolash_events:
-        target_id = event.get("targetID")
-        if target_id in player_ids:
-            damage = event.get("amount", 0) + event.get("absorbed", 0)
-            sacrolash_damage_by_player[target_id] += damage
+    # Sum damage taken by each player from each boss (using dynamically looked up actor IDs)
+    damage_events = event_arrays.to_event_array(all_damage_events)
+    alythess_damage_by_player = event_arrays.damage_by_target(damage_events, alythess_actor_id, player_ids)
+    sacrolash_damage_by_player = event_arrays.damage_by_target(damage_events, sacrolash_actor_id, player_ids)
 
     tanks = []
     tank_ids = set()
@@ -324,8 +651,6 @@ def detect_eredar_twins_phase2_tanks(report_code, fight_id, api_start_time, api_
     Returns:
         Tuple of (tanks list, tank_ids set) where tanks is a list of dicts with 'name' and 'id'
     """
-    from collections import defaultdict
-
     print("Detecting Eredar Twins Phase 2 tank based on Alythess damage...")
 
     # Find Alythess actor ID by gameID (actor IDs are report-specific)
@@ -372,16 +697,9 @@ def detect_eredar_twins_phase2_tanks(report_code, fight_id, api_start_time, api_
     result = response.json()
     all_damage_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
 
-    # Filter events to only those from Alythess
-    alythess_events = [e for e in all_damage_events if e.get("sourceID") == alythess_actor_id]
-
     # Sum damage taken by each player from Alythess
-    alythess_damage_by_player = defaultdict(int)
-    for event in alythess_events:
-        target_id = event.get("targetID")
-        if target_id in player_ids:
-            damage = event.get("amount", 0) + event.get("absorbed", 0)
-            alythess_damage_by_player[target_id] += damage
+    damage_events = event_arrays.to_event_array(all_damage_events)
+    alythess_damage_by_player = event_arrays.damage_by_target(damage_events, alythess_actor_id, player_ids)
 
     tanks = []
     tank_ids = set()
@@ -401,92 +719,6 @@ def detect_eredar_twins_phase2_tanks(report_code, fight_id, api_start_time, api_
     return tanks, tank_ids
 
 
-def detect_muru_phases(report_code, fight_id, fight_start_time, all_actors, headers):
-    """
-    Detect phase boundaries for M'uru encounter.
-
-    Phase 1: M'uru is active (taking damage)
-    Phase 2: Entropius phase (after M'uru transforms/stops taking damage)
-
-    Args:
-        report_code: The report code
-        fight_id: The fight ID
-        fight_start_time: The absolute start time of the fight (from report)
-        all_actors: List of all actors from report masterData
-        headers: API request headers
-
-    Returns:
-        Dictionary with phase information:
-        {
-            'has_phases': bool,
-            'phase1_end_ms': int,  # Relative to fight start (0-based)
-            'phase2_start_ms': int  # Relative to fight start (0-based)
-        }
-    """
-    print("Detecting M'uru phase boundaries...")
-
-    # Find M'uru's actor ID by gameID
-    muru_actor_id = None
-    for actor in all_actors:
-        if actor.get("gameID") == MURU_GAME_ID:
-            muru_actor_id = actor.get("id")
-            break
-
-    if muru_actor_id is None:
-        print("  ⚠ Could not find M'uru in report actors")
-        return {'has_phases': False}
-
-    query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(
-            fightIDs: {[fight_id]}
-            dataType: DamageTaken
-            targetID: {muru_actor_id}
-            limit: 10000
-          ) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = api_request_with_retry(
-        query=query,
-        headers=headers,
-        query_description="Detect M'uru phases"
-    )
-
-    if not response or response.status_code != 200:
-        print("  ⚠ Could not detect phases, treating as single-phase fight")
-        return {'has_phases': False}
-
-    result = response.json()
-    muru_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-
-    if not muru_events:
-        print("  ⚠ No damage events found for M'uru")
-        return {'has_phases': False}
-
-    # Phase 1 ends when M'uru stops taking damage (transforms into Entropius)
-    # Get the timestamp of his last damage event (absolute timestamp)
-    last_damage_event = muru_events[-1]
-    last_damage_absolute = last_damage_event.get("timestamp")
-
-    # Convert to fight-relative timestamp (0-based)
-    phase1_end_relative = last_damage_absolute - fight_start_time
-
-    print(f"✓ Phase 1 ends at {phase1_end_relative}ms (fight-relative, 0-based)")
-
-    return {
-        'has_phases': True,
-        'phase1_end_ms': phase1_end_relative,
-        'phase2_start_ms': phase1_end_relative
-    }
-
-
 def api_request_with_retry(query, variables=None, headers=None, query_description="API query"):
     """
     Execute an API request with timeout and retry logic.
@@ -503,30 +735,48 @@ def api_request_with_retry(query, variables=None, headers=None, query_descriptio
     Raises:
         Exception: If all retries fail with non-timeout errors
     """
+    # Offline recomputation: serve the response from the raw event archive
+    archived = event_archive.replay_response(query_description, variables)
+    if archived is not None:
+        return archived
+
+    # All-pulls mode: this pull's share of a batched request (still captured for --archive)
+    prefilled = event_archive.prefilled_response(query_description, variables)
+    if prefilled is not None:
+        event_archive.record_response(query_description, variables, prefilled)
+        return prefilled
+
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
 
+    query_label = event_archive.get_step_name(query_description)
+
     for attempt in range(MAX_RETRIES):
         try:
             print(f"    [{query_description}] Attempt {attempt + 1}/{MAX_RETRIES}...", end=" ")
 
-            response = requests.post(
-                API_URL,
-                json=payload,
-                headers=headers,
-                timeout=REQUEST_TIMEOUT
-            )
+            request_start = time.perf_counter()
+            with metrics.WCL_QUERY_SECONDS.time(query=query_label):
+                response = requests.post(
+                    API_URL,
+                    json=payload,
+                    headers=headers,
+                    timeout=REQUEST_TIMEOUT
+                )
 
             # Check for rate limiting (429) or server errors (5xx)
             if response.status_code == 429:
                 print(f"Rate limited!")
+                metrics.WCL_RATE_LIMITED.inc(query=query_label)
                 if attempt < MAX_RETRIES - 1:
                     delay = INITIAL_RETRY_DELAY * (2 ** attempt)
                     print(f"    Waiting {delay}s before retry...")
+                    metrics.WCL_RETRIES.inc(query=query_label, reason='rate_limited')
                     time.sleep(delay)
                     continue
                 else:
+                    metrics.WCL_FAILURES.inc(query=query_label)
                     raise Exception(f"Rate limited after {MAX_RETRIES} attempts")
 
             if response.status_code >= 500:
@@ -534,22 +784,29 @@ def api_request_with_retry(query, variables=None, headers=None, query_descriptio
                 if attempt < MAX_RETRIES - 1:
                     delay = INITIAL_RETRY_DELAY * (2 ** attempt)
                     print(f"    Waiting {delay}s before retry...")
+                    metrics.WCL_RETRIES.inc(query=query_label, reason='server_error')
                     time.sleep(delay)
                     continue
                 else:
+                    metrics.WCL_FAILURES.inc(query=query_label)
                     raise Exception(f"Server error after {MAX_RETRIES} attempts: {response.status_code}")
 
             print("OK")
+            response = profiling.record_response(query_label, response, time.perf_counter() - request_start)
+            event_archive.record_response(query_description, variables, response)
             return response
 
         except requests.exceptions.Timeout:
             print(f"Timeout!")
+            metrics.WCL_TIMEOUTS.inc(query=query_label)
             if attempt < MAX_RETRIES - 1:
                 delay = INITIAL_RETRY_DELAY * (2 ** attempt)
                 print(f"    Query timed out after {REQUEST_TIMEOUT}s. Waiting {delay}s before retry...")
+                metrics.WCL_RETRIES.inc(query=query_label, reason='timeout')
                 time.sleep(delay)
             else:
                 print(f"    Query failed after {MAX_RETRIES} timeout attempts. Skipping...")
+                metrics.WCL_FAILURES.inc(query=query_label)
                 raise Exception(f"Query timed out after {MAX_RETRIES} attempts")
 
         except requests.exceptions.RequestException as e:
@@ -557,14 +814,17 @@ def api_request_with_retry(query, variables=None, headers=None, query_descriptio
             if attempt < MAX_RETRIES - 1:
                 delay = INITIAL_RETRY_DELAY * (2 ** attempt)
                 print(f"    Waiting {delay}s before retry...")
+                metrics.WCL_RETRIES.inc(query=query_label, reason='request_error')
                 time.sleep(delay)
             else:
+                metrics.WCL_FAILURES.inc(query=query_label)
                 raise Exception(f"Request failed after {MAX_RETRIES} attempts: {e}")
 
     return None
 
 
-def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
+def analyze_druid_performance(report_code, boss_name, player_name, phase=None, archive=False, progress_callback=None,
+                              profile=False, cprofile_path=None, fight_id=None):
     """
     Comprehensive analysis combining performance metrics and rotation data.
 
@@ -573,50 +833,58 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         boss_name: The name of the boss
         player_name: The name of the Restoration Druid to analyze
         phase: Optional phase number (1 or 2) for multi-phase encounters like Eredar Twins
+        archive: If True, save the raw API responses to the event archive (see event_archive.py)
+        progress_callback: Optional callable(step, label, percent, partial) called as each step starts
+        profile: If True, attach per-step and per-query timings as result['profile'] (see profiling.py)
+        cprofile_path: Optional file to write cProfile stats to (implies profile)
+        fight_id: Optional fight to analyze (default: the first kill, else the first pull)
 
     Returns:
         Dictionary containing all performance and rotation data
     """
-    access_token = get_user_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
+    if profile or cprofile_path:
+        with profiling.profile_analysis(cprofile_path) as analysis_profile:
+            data = analyze_druid_performance(report_code, boss_name, player_name, phase, archive=archive,
+                                             progress_callback=progress_callback, fight_id=fight_id)
+        data['profile'] = analysis_profile.to_dict()
+        return data
+
+    if archive:
+        with event_archive.capture() as captured:
+            data = analyze_druid_performance(report_code, boss_name, player_name, phase,
+                                             progress_callback=progress_callback, fight_id=fight_id)
+        event_archive.save_entry(captured, report_code, data)
+        return data
+
+    # Times each pipeline step (see report_progress) and the whole analysis
+    with metrics.stage_timer():
+        return run_druid_analysis(report_code, boss_name, player_name, phase, progress_callback, fight_id)
+
+
+def run_druid_analysis(report_code, boss_name, player_name, phase=None, progress_callback=None, fight_id=None):
+    """
+    Run the analysis pipeline for analyze_druid_performance.
+
+    Returns:
+        Dictionary containing all performance and rotation data
+    """
+    if event_archive.is_replaying():
+        # Replayed requests never reach WarcraftLogs, so no token is needed
+        headers = {}
+    else:
+        access_token = get_user_access_token()
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
 
     phase_str = f" (Phase {phase})" if phase else ""
     print(f"Searching for {boss_name}{phase_str} in report {report_code}...")
 
     # ===== STEP 1: Get fight and player information =====
-    fights_query = """
-    query ($code: String!) {
-      reportData {
-        report(code: $code) {
-          title
-          startTime
-          fights {
-            id
-            encounterID
-            name
-            kill
-            startTime
-            endTime
-          }
-          masterData {
-            actors {
-              id
-              name
-              type
-              subType
-              gameID
-            }
-          }
-        }
-      }
-    }
-    """
-
+    report_progress(progress_callback, "fights")
     response = api_request_with_retry(
-        query=fights_query,
+        query=FIGHTS_QUERY,
         variables={"code": report_code},
         headers=headers,
         query_description="Fetch fights"
@@ -671,8 +939,13 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     if not boss_fights:
         raise Exception(f"Boss '{boss_name}' not found in report!")
 
-    boss_kills = [f for f in boss_fights if f.get("kill")]
-    target_fight = boss_kills[0] if boss_kills else boss_fights[0]
+    if fight_id is not None:
+        target_fight = next((f for f in boss_fights if f["id"] == fight_id), None)
+        if target_fight is None:
+            raise Exception(f"Fight {fight_id} is not a {boss_name} pull in report {report_code}!")
+    else:
+        boss_kills = [f for f in boss_fights if f.get("kill")]
+        target_fight = boss_kills[0] if boss_kills else boss_fights[0]
 
     fight_id = target_fight["id"]
     is_kill = target_fight.get("kill", False)
@@ -689,30 +962,25 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     print(f"✓ Found {boss_name} (Fight ID: {fight_id}, {'KILL' if is_kill else 'WIPE'})")
 
     # ===== STEP 1.5: Detect phases for multi-phase encounters =====
+    report_progress(progress_callback, "phases")
     phase_info = None
     query_start_time = fight_start_time
     query_end_time = fight_end_time
     encounter_id = target_fight.get("encounterID")
 
-    # Detect phases for Eredar Twins
-    if encounter_id == EREDAR_TWINS_ENCOUNTER_ID and phase:
-        phase_info = detect_eredar_twins_phases(report_code, fight_id, fight_start_time, all_actors, headers)
-    # Detect phases for M'uru
-    elif encounter_id == MURU_ENCOUNTER_ID and phase:
-        phase_info = detect_muru_phases(report_code, fight_id, fight_start_time, all_actors, headers)
+    if phase:
+        phase_info = detect_phases(report_code, target_fight, all_actors, headers)
 
     # Apply phase boundaries if detected
+    window = None
     if phase_info and phase_info.get('has_phases'):
-        if phase == 1:
-            # Phase 1: From start to phase transition
-            query_start_time = fight_start_time
-            query_end_time = fight_start_time + phase_info['phase1_end_ms']
-            print(f"✓ Analyzing Phase 1 only (0ms to {phase_info['phase1_end_ms']}ms)")
-        elif phase == 2:
-            # Phase 2: From phase transition to end
-            query_start_time = fight_start_time + phase_info['phase2_start_ms']
-            query_end_time = fight_end_time
-            print(f"✓ Analyzing Phase 2 only ({phase_info['phase2_start_ms']}ms to {fight_end_time - fight_start_time}ms)")
+        window = phases.get_phase_window(phase_info['transitions'], phase, fight_duration_ms)
+
+    if window:
+        phase_start_ms, phase_end_ms = window
+        query_start_time = fight_start_time + phase_start_ms
+        query_end_time = fight_start_time + phase_end_ms
+        print(f"✓ Analyzing {phases.get_phase_name(encounter_id, phase)} only ({phase_start_ms}ms to {phase_end_ms}ms)")
 
         # Recalculate fight duration for the phase
         fight_duration_ms = query_end_time - query_start_time
@@ -728,6 +996,14 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     api_end_time = query_end_time
 
     # ===== STEP 2: Get healing composition and player details =====
+    report_progress(progress_callback, "composition", {
+        "fight_id": fight_id,
+        "is_kill": is_kill,
+        "timestamp": fight_absolute_timestamp,
+        "duration_minutes": duration_minutes,
+        "duration_seconds": duration_seconds,
+        "phase": phase
+    })
     print("Querying healing composition and player details...")
 
     composition_query = f"""
@@ -765,33 +1041,7 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
 
     composition = table_data.get("data", {}).get("composition", [])
 
-    # Extract healing composition
-    healer_composition = {
-        "Holy Paladin": [],
-        "Holy Priest": [],
-        "Discipline Priest": [],
-        "Restoration Druid": [],
-        "Restoration Shaman": []
-    }
-
-    for player_data in composition:
-        player_type = player_data.get("type")
-        player_comp_name = player_data.get("name")
-        player_specs = player_data.get("specs", [])
-
-        for spec_data in player_specs:
-            spec_name = spec_data.get("spec")
-
-            if player_type == "Paladin" and spec_name == "Holy":
-                healer_composition["Holy Paladin"].append(player_comp_name)
-            elif player_type == "Priest" and spec_name == "Holy":
-                healer_composition["Holy Priest"].append(player_comp_name)
-            elif player_type == "Priest" and spec_name == "Discipline":
-                healer_composition["Discipline Priest"].append(player_comp_name)
-            elif player_type == "Druid" and spec_name == "Restoration":
-                healer_composition["Restoration Druid"].append(player_comp_name)
-            elif player_type == "Shaman" and spec_name == "Restoration":
-                healer_composition["Restoration Shaman"].append(player_comp_name)
+    healer_composition = get_healer_composition(composition)
 
     total_healers = sum(len(healers) for healers in healer_composition.values())
 
@@ -866,148 +1116,80 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         print(f"✓ No haste data available, using default timeout: {rotation_timeout}s")
 
     # ===== STEP 3: Get buff and resource events =====
+    report_progress(progress_callback, "buffs", {
+        "player_name": player_name,
+        "total_healers": total_healers,
+        "healer_composition": healer_composition,
+        "player_stats": player_stats,
+        "player_trinkets": player_trinkets
+    })
     print("Querying buffs and resource events...")
 
-    buff_query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(fightIDs: {[fight_id]}, dataType: Buffs, startTime: {api_start_time}, endTime: {api_end_time}, limit: 10000) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = api_request_with_retry(
-        query=buff_query,
-        headers=headers,
-        query_description="Fetch buff events"
-    )
-
-    if not response or response.status_code != 200:
-        raise Exception(f"Query failed: {response.status_code} - {response.text}")
-
-    result = response.json()
-    all_buff_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-
-    # Check for Innervate
-    innervate_events = [
-        event for event in all_buff_events
-        if event.get("abilityGameID") == INNERVATE_ID and
-           event.get("type") == "applybuff" and
-           event.get("targetID") == player_id
-    ]
-    innervate_count = len(innervate_events)
-
-    # Check for Bloodlust/Heroism
-    has_bloodlust = any(
-        event.get("abilityGameID") in [HEROISM_ID, BLOODLUST_ID] and
-        event.get("type") == "applybuff" and
-        event.get("targetID") == player_id
-        for event in all_buff_events
-    )
-
-    # Check for Nature's Grace
-    has_natures_grace = any(
-        event.get("abilityGameID") == NATURES_GRACE_ID and
-        event.get("type") == "applybuff" and
-        event.get("targetID") == player_id
-        for event in all_buff_events
-    )
-
-    # Query Vampiric Touch (resource events)
-    vt_query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(fightIDs: {[fight_id]}, dataType: Resources, targetID: {player_id}, startTime: {api_start_time}, endTime: {api_end_time}, limit: 500) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = api_request_with_retry(
-        query=vt_query,
-        headers=headers,
-        query_description="Check Vampiric Touch"
+    buff_events = event_arrays.to_event_array(fetch_events(
+        report_code, fight_id, "dataType: Buffs", api_start_time, api_end_time, headers,
+        "Fetch buff events", required=True
+    ))
+
+    # Check for Innervate, Bloodlust/Heroism and Nature's Grace applied to the player
+    innervate_count = event_arrays.count_buff_applications(buff_events, INNERVATE_ID, player_id)
+    has_bloodlust = event_arrays.count_buff_applications(buff_events, [HEROISM_ID, BLOODLUST_ID], player_id) > 0
+    has_natures_grace = event_arrays.count_buff_applications(buff_events, NATURES_GRACE_ID, player_id) > 0
+
+    # Resource events: Vampiric Touch now, the mana timeline once the casts are in (step 11)
+    report_progress(progress_callback, "resources")
+    # includeResources attaches classResources (the player's mana) to every event
+    resource_events = fetch_events(
+        report_code, fight_id, f"dataType: Resources, targetID: {player_id}, includeResources: true",
+        api_start_time, api_end_time, headers, "Check Vampiric Touch"
     )
-
-    has_vampiric_touch = False
-    if response and response.status_code == 200:
-        result = response.json()
-        all_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-        has_vampiric_touch = any(
-            event.get("abilityGameID") == VAMPIRIC_TOUCH_ID and
-            event.get("targetID") == player_id
-            for event in all_events
-        )
+    resource_array = event_arrays.to_event_array(resource_events)
+    has_vampiric_touch = bool(np.any(
+        (resource_array['abilityGameID'] == VAMPIRIC_TOUCH_ID) & (resource_array['targetID'] == player_id)
+    ))
+    print(f"✓ Found {len(resource_events)} resource events")
 
     # ===== STEP 4: Calculate Lifebloom uptime =====
+    report_progress(progress_callback, "lifebloom", {
+        "has_vampiric_touch": has_vampiric_touch,
+        "innervate_count": innervate_count,
+        "has_bloodlust": has_bloodlust,
+        "has_natures_grace": has_natures_grace
+    })
     print("Calculating Lifebloom uptime...")
 
-    lifebloom_query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(fightIDs: {[fight_id]}, dataType: Buffs, sourceID: {player_id}, abilityID: {LIFEBLOOM_ID}, startTime: {api_start_time}, endTime: {api_end_time}, limit: 10000) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
+    lifebloom_events = event_arrays.to_event_array(fetch_events(
+        report_code, fight_id, f"dataType: Buffs, sourceID: {player_id}, abilityID: {LIFEBLOOM_ID}",
+        api_start_time, api_end_time, headers, "Fetch Lifebloom uptime"
+    ))
 
-    response = api_request_with_retry(
-        query=lifebloom_query,
-        headers=headers,
-        query_description="Fetch Lifebloom uptime"
+    # Per-target segments during which the druid's Lifebloom was up, with its stack count
+    lifebloom_targets, lifebloom_starts, lifebloom_ends, lifebloom_stacks = event_arrays.buff_segments(
+        lifebloom_events, query_end_time
     )
 
-    lifebloom_uptime_percent = 0
-    if response and response.status_code == 200:
-        result = response.json()
-        lifebloom_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-
-        intervals = []
-        active_instances = {}
-
-        for event in sorted(lifebloom_events, key=lambda e: e.get("timestamp", 0)):
-            event_type = event.get("type")
-            target_id = event.get("targetID")
-            timestamp = event.get("timestamp")
+    total_uptime_ms = event_arrays.covered_length(lifebloom_starts, lifebloom_ends)
+    lifebloom_uptime_percent = (total_uptime_ms / fight_duration_ms * 100) if fight_duration_ms > 0 else 0
 
-            if event_type in ["applybuff", "refreshbuff"]:
-                if target_id in active_instances:
-                    intervals.append((active_instances[target_id], timestamp))
-                active_instances[target_id] = timestamp
-            elif event_type == "removebuff":
-                if target_id in active_instances:
-                    intervals.append((active_instances[target_id], timestamp))
-                    del active_instances[target_id]
-
-        for target_id, apply_time in active_instances.items():
-            intervals.append((apply_time, query_end_time))
-
-        if intervals:
-            intervals.sort()
-            merged_intervals = [intervals[0]]
-
-            for current_start, current_end in intervals[1:]:
-                last_start, last_end = merged_intervals[-1]
-
-                if current_start <= last_end:
-                    merged_intervals[-1] = (last_start, max(last_end, current_end))
-                else:
-                    merged_intervals.append((current_start, current_end))
+    target_uptime_ms = event_arrays.length_by_value(lifebloom_targets, lifebloom_starts, lifebloom_ends)
+    lifebloom_target_uptime = [
+        {"name": actor_names.get(target_id, f"Unknown (ID: {target_id})"), "id": target_id,
+         "uptime_percent": round((ms / fight_duration_ms * 100) if fight_duration_ms > 0 else 0, 2)}
+        for target_id, ms in sorted(target_uptime_ms.items(), key=lambda item: item[1], reverse=True)
+    ]
 
-            total_uptime_ms = sum(end - start for start, end in merged_intervals)
-            lifebloom_uptime_percent = (total_uptime_ms / fight_duration_ms * 100) if fight_duration_ms > 0 else 0
+    # Time at 1/2/3 stacks, summed over targets
+    stack_ms = event_arrays.length_by_value(np.minimum(lifebloom_stacks, 3), lifebloom_starts, lifebloom_ends)
+    lifebloom_stack_seconds = {stack: round(stack_ms.get(stack, 0) / 1000, 1) for stack in (1, 2, 3)}
+    total_stack_ms = sum(stack_ms.values())
+    lifebloom_stack3_percent = (stack_ms.get(3, 0) / total_stack_ms * 100) if total_stack_ms > 0 else 0
 
     # ===== STEP 5: Get healing breakdown =====
+    report_progress(progress_callback, "healing", {
+        "lifebloom_uptime_percent": round(lifebloom_uptime_percent, 2),
+        "lifebloom_target_uptime": lifebloom_target_uptime,
+        "lifebloom_stack_seconds": lifebloom_stack_seconds,
+        "lifebloom_stack3_percent": round(lifebloom_stack3_percent, 2)
+    })
     print("Querying healing breakdown...")
 
     healing_query = f"""
@@ -1065,6 +1247,12 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
             phase_hps = (total_phase_healing / fight_duration_seconds) if fight_duration_seconds > 0 else 0
 
     # ===== STEP 6: Get rankings =====
+    report_progress(progress_callback, "rankings", {
+        "lifebloom_hps": round(lifebloom_hps, 2),
+        "rejuvenation_hps": round(rejuvenation_hps, 2),
+        "regrowth_total_hps": round(regrowth_total_hps, 2),
+        "regrowth_by_rank": regrowth_by_rank
+    })
     print("Querying rankings...")
 
     player_ranking = {}
@@ -1107,6 +1295,7 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
                             break
 
     # ===== STEP 7: Get raid damage taken =====
+    report_progress(progress_callback, "damage_taken", {"player_ranking": player_ranking})
     print("Querying raid damage taken...")
 
     damage_taken_query = f"""
@@ -1147,6 +1336,9 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     print(f"✓ Total raid damage taken: {total_raid_damage_taken:,} ({raid_damage_taken_per_second:.2f} per second)")
 
     # ===== STEP 8: Identify tanks =====
+    report_progress(progress_callback, "tanks", {
+        "raid_damage_taken_per_second": round(raid_damage_taken_per_second, 2)
+    })
     tanks = []
     tank_ids = set()
 
@@ -1199,76 +1391,49 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         print(f"✓ Identified {len(tanks)} tanks")
 
     # ===== STEP 9: Build tank timeline from damage events =====
+    report_progress(progress_callback, "tank_timeline", {"tanks": tanks})
     print("Building tank timeline from boss melee swings...")
 
-    damage_query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(fightIDs: {[fight_id]}, dataType: DamageTaken, startTime: {api_start_time}, endTime: {api_end_time}, limit: 10000) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = api_request_with_retry(
-        query=damage_query,
-        headers=headers,
-        query_description="Fetch damage events"
-    )
-
-    tank_timeline = []
-    if response and response.status_code == 200:
-        result = response.json()
-        damage_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-
-        for event in damage_events:
-            source_id = event.get("sourceID")
-            target_id = event.get("targetID")
+    damage_events = event_arrays.to_event_array(fetch_events(
+        report_code, fight_id, "dataType: DamageTaken", api_start_time, api_end_time, headers,
+        "Fetch damage events"
+    ))
 
-            if source_id not in player_ids and event.get("type") == "damage" and target_id in tank_ids:
-                tank_timeline.append({
-                    "timestamp": event.get("timestamp"),
-                    "tank_id": target_id,
-                    "tank_name": actor_names.get(target_id, "Unknown")
-                })
+    # Melee swing timestamps and the tank each one hit, sorted by time
+    swing_timestamps, swing_tank_ids = event_arrays.build_swing_timeline(damage_events, player_ids, tank_ids)
 
-        tank_timeline.sort(key=lambda x: x["timestamp"])
+    print(f"✓ Built tank timeline with {len(swing_timestamps)} melee swings")
 
-    print(f"✓ Built tank timeline with {len(tank_timeline)} melee swings")
+    # Lifebloom uptime on whichever tank was taking melee swings at the time
+    tank_run_ids, tank_run_starts, tank_run_ends = event_arrays.timeline_runs(
+        swing_timestamps, swing_tank_ids, query_end_time
+    )
+    tank_uptime_ms = event_arrays.overlap_by_value(
+        lifebloom_targets, lifebloom_starts, lifebloom_ends,
+        tank_run_ids, tank_run_starts, tank_run_ends
+    )
+    lifebloom_tank_uptime_percent = (tank_uptime_ms / fight_duration_ms * 100) if fight_duration_ms > 0 else 0
 
     # ===== STEP 10: Get cast events =====
+    report_progress(progress_callback, "casts")
     print(f"Querying cast events for {player_name}...")
 
-    casts_query = f"""
-    query {{
-      reportData {{
-        report(code: "{report_code}") {{
-          events(fightIDs: {[fight_id]}, dataType: Casts, sourceID: {player_id}, startTime: {api_start_time}, endTime: {api_end_time}, limit: 10000) {{
-            data
-          }}
-        }}
-      }}
-    }}
-    """
-
-    response = api_request_with_retry(
-        query=casts_query,
-        headers=headers,
-        query_description="Fetch cast events"
+    cast_events = fetch_events(
+        report_code, fight_id, f"dataType: Casts, sourceID: {player_id}, includeResources: true",
+        api_start_time, api_end_time, headers, "Fetch cast events", required=True
     )
 
-    if not response or response.status_code != 200:
-        raise Exception(f"Query failed: {response.status_code} - {response.text}")
-
-    result = response.json()
-    cast_events = result.get("data", {}).get("reportData", {}).get("report", {}).get("events", {}).get("data", [])
-
     print(f"✓ Found {len(cast_events)} cast events")
 
+    gcd_utilization = calculate_gcd_utilization(
+        event_arrays.to_event_array(cast_events), player_gcd, api_start_time, api_end_time
+    )
+    print(f"✓ Active {gcd_utilization['active_time_percent']:.1f}% of the time, "
+          f"{gcd_utilization['casts_per_minute']:.1f} casts/min, "
+          f"{gcd_utilization['idle_gap_count']} idle gaps > {IDLE_GAP_GCDS} GCDs")
+
     # Get ability names
+    report_progress(progress_callback, "ability_names")
     ability_ids = set(event.get("abilityGameID") for event in cast_events if event.get("abilityGameID"))
 
     print(f"Querying names for {len(ability_ids)} unique abilities...")
@@ -1300,22 +1465,36 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
             else:
                 ability_names[ability_id] = f"Unknown ({ability_id})"
 
+    # Mana timeline from the resource events (step 3) and the casts' mana costs
+    innervate_events = buff_events[
+        (buff_events['abilityGameID'] == INNERVATE_ID) & (buff_events['targetID'] == player_id)
+    ]
+    _, innervate_starts, innervate_ends, _ = event_arrays.buff_segments(innervate_events, api_end_time)
+    mana = mana_timeline.calculate_mana_timeline(
+        resource_events, cast_events, player_id, api_start_time, api_end_time, ability_names,
+        innervate_starts, innervate_ends, phase_hps * fight_duration_seconds
+    )
+    if mana["has_mana_data"]:
+        oom_text = f"OOM at {mana['time_to_oom_seconds']:.0f}s" if mana["time_to_oom_seconds"] is not None else "never OOM"
+        print(f"✓ Mana: {mana['mana_spent']} spent, {oom_text}, {mana['healing_per_mana']:.2f} healing per mana")
+    else:
+        print("⚠ No mana data in the resource or cast events")
+
     # ===== STEP 11: Process cast events with rotation tracking =====
+    report_progress(progress_callback, "rotations")
     print("Processing cast events and rotation patterns...\n")
 
-    def get_active_tank_at_time(timestamp, timeline):
-        """Find the active tank at a given timestamp."""
-        active_tank_name = None
-        active_tank_id = None
-        for swing in timeline:
-            if swing["timestamp"] <= timestamp:
-                active_tank_name = swing["tank_name"]
-                active_tank_id = swing["tank_id"]
-            else:
-                break
-        return active_tank_name if active_tank_name else "Unknown", active_tank_id
+    # Active tank (the last one a boss swung at) at every cast, in one searchsorted
+    active_tank_ids = event_arrays.lookup_active(
+        swing_timestamps, swing_tank_ids, [event.get("timestamp", 0) for event in cast_events]
+    ).tolist()
+
+    # Cast category of every cast, from one lookup per distinct ability
+    cast_categories = classify_casts(
+        [event.get("abilityGameID") or -1 for event in cast_events], ability_names
+    ).tolist()
 
-    cast_data = []
+    cast_data = CastTimeline()
     rotation_count = 0
 
     # Check if this is a multi-tank encounter (special rotation logic)
@@ -1327,30 +1506,22 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     current_rotation_target_id = None  # The tank that started the current rotation
     current_rotation_start_time = None  # When the current rotation started
 
-    for event in cast_events:
+    for event_index, event in enumerate(cast_events):
         timestamp = event.get("timestamp", 0)
         ability_id = event.get("abilityGameID", "?")
         ability_name = ability_names.get(ability_id, f"Unknown ({ability_id})")
         event_type = event.get("type", "unknown")
         target_id = event.get("targetID")
         target_name = actor_names.get(target_id, f"Unknown (ID: {target_id})") if target_id else "-"
+        category = cast_categories[event_index]
 
-        # Filter out specific casts
-        if "Regrowth" in ability_name and event_type == "cast":
-            continue
-        if "Restore Mana" in ability_name:
-            continue
-        if "Healing Touch" in ability_name:
-            continue
-        if "Dark Rune" in ability_name:
-            continue
-        if "Hopped Up" in ability_name:
-            continue
-        if "Essence of the Martyr" in ability_name:
+        # Filter out specific casts (completed Regrowths show up as their begincast)
+        if category == CAST_FILTERED or (category == CAST_REGROWTH and event_type == "cast"):
             continue
-        if "Rebirth" in ability_name and target_name != "Environment":
+        if category == CAST_REBIRTH and target_name != "Environment":
             continue
-        active_tank_name, active_tank_id = get_active_tank_at_time(timestamp, tank_timeline)
+        active_tank_id = active_tank_ids[event_index] if active_tank_ids[event_index] >= 0 else None
+        active_tank_name = actor_names.get(active_tank_id, "Unknown") if active_tank_id is not None else "Unknown"
         relative_time = (timestamp - query_start_time) / 1000.0
 
         is_rotation_start = False
@@ -1359,13 +1530,13 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         is_regrowth = False
 
         # Treat Rebirth on Environment as Regrowth (likely a cancelled Regrowth cast)
-        if "Regrowth" in ability_name or ("Rebirth" in ability_name and target_name == "Environment"):
+        if category == CAST_REGROWTH or category == CAST_REBIRTH:
             is_regrowth = True
 
         elif is_multi_tank_encounter:
             # Multi-tank encounter: Special rotation logic with multiple tanks
             is_lifebloom_on_tank = (
-                ability_id == LIFEBLOOM_ID and
+                category == CAST_LIFEBLOOM and
                 event_type == "cast" and
                 target_id in tank_ids
             )
@@ -1389,54 +1560,39 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
                 else:
                     # Lifebloom on a DIFFERENT tank during active rotation
                     is_lifebloom_tank = True
-            elif ability_id == LIFEBLOOM_ID and event_type == "cast":
+            elif category == CAST_LIFEBLOOM and event_type == "cast":
                 # Lifebloom on non-tank = instant cast
                 is_instant_cast = True
-            elif (
-                (ability_id == REJUVENATION_ID and event_type == "cast") or
-                (ability_id == TREE_OF_LIFE_ID and event_type == "cast") or
-                (ability_id == SWIFTMEND_ID and event_type == "cast") or
-                (ability_id == NATURES_SWIFTNESS_ID and event_type == "cast") or
-                (ability_id == INNERVATE_ID and event_type == "cast")
-            ):
+            elif category == CAST_INSTANT and event_type == "cast":
                 is_instant_cast = True
 
         else:
             # Standard rotation logic (single active tank)
             is_rotation_start = (
-                ability_id == LIFEBLOOM_ID and
+                category == CAST_LIFEBLOOM and
                 event_type == "cast" and
                 target_id == active_tank_id and
                 active_tank_id is not None
             )
 
-            is_instant_cast = (
-                (ability_id == LIFEBLOOM_ID and event_type == "cast" and target_id != active_tank_id) or
-                (ability_id == REJUVENATION_ID and event_type == "cast") or
-                (ability_id == TREE_OF_LIFE_ID and event_type == "cast") or
-                (ability_id == SWIFTMEND_ID and event_type == "cast") or
-                (ability_id == NATURES_SWIFTNESS_ID and event_type == "cast") or
-                (ability_id == INNERVATE_ID and event_type == "cast")
+            is_instant_cast = event_type == "cast" and (
+                (category == CAST_LIFEBLOOM and target_id != active_tank_id) or
+                category == CAST_INSTANT
             )
 
         if is_rotation_start:
             rotation_count += 1
 
-        cast_data.append({
-            "time": relative_time,
-            "spell": ability_name,
-            "target": target_name,
-            "active_tank": active_tank_name,
-            "type": event_type,
-            "ability_id": ability_id,
-            "rotation_start": is_rotation_start,
-            "lifebloom_tank": is_lifebloom_tank,
-            "instant_cast": is_instant_cast,
-            "regrowth": is_regrowth,
-            "rotation_number": rotation_count if is_rotation_start else None
-        })
-
-    cast_data.sort(key=lambda x: x["time"])
+        cast_data.add(
+            relative_time, ability_name, target_name, active_tank_name, event_type, ability_id,
+            rotation_start=is_rotation_start,
+            lifebloom_tank=is_lifebloom_tank,
+            instant_cast=is_instant_cast,
+            regrowth=is_regrowth,
+            rotation_number=rotation_count if is_rotation_start else None
+        )
+
+    cast_data.sort()
 
     # Build rotation sections
     # Rules:
@@ -1460,11 +1616,11 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
     for i, cast in enumerate(cast_data):
         # Determine abbreviation
         # Note: Both "Rotation started" and "Lifebloom (Tank)" count as LB
-        if cast['rotation_start'] or cast.get('lifebloom_tank'):
+        if cast.rotation_start or cast.lifebloom_tank:
             abbr_str = "LB"
-        elif cast['instant_cast']:
+        elif cast.instant_cast:
             abbr_str = "I"
-        elif cast['regrowth']:
+        elif cast.regrowth:
             abbr_str = "RG"
         else:
             abbr_str = ""
@@ -1473,20 +1629,20 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         should_end_section = False
 
         # Rule: rotation_start ALWAYS starts a new section
-        if cast['rotation_start']:
+        if cast.rotation_start:
             if not first_rotation_seen:
                 # First rotation - save any pre-rotation casts as a section
                 if section_lb_count > 0 or section_i_count > 0 or section_rg_count > 0:
-                    rotation_sections.append({
-                        "type": section_type,
-                        "start_time": section_start_time,
-                        "end_time": cast['time'],
-                        "lb": section_lb_count,
-                        "i": section_i_count,
-                        "rg": section_rg_count
-                    })
+                    rotation_sections.append(RotationSection(
+                        type=section_type,
+                        start_time=section_start_time,
+                        end_time=cast.time,
+                        lb=section_lb_count,
+                        i=section_i_count,
+                        rg=section_rg_count
+                    ))
                 first_rotation_seen = True
-                section_start_time = cast['time']
+                section_start_time = cast.time
                 section_type = f"Rotation #{len(rotation_sections) + 1}"
                 section_lb_count = 0
                 section_i_count = 0
@@ -1498,7 +1654,7 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
 
         # Rule: timeout ends the current rotation (only if not a rotation_start)
         elif in_rotation and last_rotation_time is not None:
-            time_since_last_rotation = cast['time'] - last_rotation_time
+            time_since_last_rotation = cast.time - last_rotation_time
             if time_since_last_rotation >= rotation_timeout:
                 should_end_section = True
                 in_rotation = False
@@ -1511,15 +1667,15 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
 
         # End the current section if needed
         if should_end_section:
-            rotation_sections.append({
-                "type": section_type,
-                "start_time": section_start_time,
-                "end_time": cast['time'],
-                "lb": section_lb_count,
-                "i": section_i_count,
-                "rg": section_rg_count
-            })
-            section_start_time = cast['time']
+            rotation_sections.append(RotationSection(
+                type=section_type,
+                start_time=section_start_time,
+                end_time=cast.time,
+                lb=section_lb_count,
+                i=section_i_count,
+                rg=section_rg_count
+            ))
+            section_start_time = cast.time
             section_type = f"Rotation #{len(rotation_sections) + 1}"
             section_lb_count = 0
             section_i_count = 0
@@ -1534,8 +1690,8 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
             section_rg_count += 1
 
         # Update rotation tracking
-        if cast['rotation_start']:
-            last_rotation_time = cast['time']
+        if cast.rotation_start:
+            last_rotation_time = cast.time
             in_rotation = True
             casts_since_rotation_end = 0
         elif not in_rotation:
@@ -1543,32 +1699,32 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
 
     # Save final section
     if section_lb_count > 0 or section_i_count > 0 or section_rg_count > 0:
-        rotation_sections.append({
-            "type": section_type,
-            "start_time": section_start_time,
-            "end_time": cast_data[-1]['time'] if cast_data else 0,
-            "lb": section_lb_count,
-            "i": section_i_count,
-            "rg": section_rg_count
-        })
+        rotation_sections.append(RotationSection(
+            type=section_type,
+            start_time=section_start_time,
+            end_time=cast_data[-1].time if cast_data else 0,
+            lb=section_lb_count,
+            i=section_i_count,
+            rg=section_rg_count
+        ))
 
     # Filter out uninteresting rotations
     actual_rotations = [
         s for s in rotation_sections
         if not (
-            (s['lb'] == 1 and s['i'] == 0 and s['rg'] == 0) or
-            (s['lb'] == 0 and s['i'] == 1 and s['rg'] == 0)
+            (s.lb == 1 and s.i == 0 and s.rg == 0) or
+            (s.lb == 0 and s.i == 1 and s.rg == 0)
         )
     ]
 
     # Calculate rotation pattern frequencies
-    rotation_patterns = [f"[{s['lb']}LB {s['i']}I {s['rg']}RG]" for s in actual_rotations]
+    rotation_patterns = [s.notation for s in actual_rotations]
     pattern_counts = Counter(rotation_patterns)
     sorted_patterns = sorted(pattern_counts.items(), key=lambda x: x[1], reverse=True)
 
     # Calculate tank rotation percentage (rotations starting with 1+ LB on tank)
     total_rotations = len(actual_rotations)
-    tank_rotations = sum(1 for s in actual_rotations if s['lb'] >= 1)
+    tank_rotations = sum(1 for s in actual_rotations if s.lb >= 1)
     tank_rotation_percent = (tank_rotations / total_rotations * 100) if total_rotations > 0 else 0
 
     # Determine if player is rotating on tank (70% threshold)
@@ -1593,6 +1749,10 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         "has_bloodlust": has_bloodlust,
         "has_natures_grace": has_natures_grace,
         "lifebloom_uptime_percent": round(lifebloom_uptime_percent, 2),
+        "lifebloom_target_uptime": lifebloom_target_uptime,
+        "lifebloom_tank_uptime_percent": round(lifebloom_tank_uptime_percent, 2),
+        "lifebloom_stack_seconds": lifebloom_stack_seconds,
+        "lifebloom_stack3_percent": round(lifebloom_stack3_percent, 2),
         "lifebloom_hps": round(lifebloom_hps, 2),
         "rejuvenation_hps": round(rejuvenation_hps, 2),
         "regrowth_total_hps": round(regrowth_total_hps, 2),
@@ -1609,6 +1769,21 @@ def analyze_druid_performance(report_code, boss_name, player_name, phase=None):
         "fight_start_time": fight_start_time,
         "player_gcd": round(player_gcd, 3),
         "rotation_timeout": round(rotation_timeout, 3),
+        "active_time_percent": round(gcd_utilization["active_time_percent"], 2),
+        "casts_per_minute": round(gcd_utilization["casts_per_minute"], 2),
+        "idle_gap_count": gcd_utilization["idle_gap_count"],
+        "idle_gap_seconds": round(gcd_utilization["idle_gap_seconds"], 2),
+        "estimated_latency_ms": round(gcd_utilization["estimated_latency_ms"]),
+        "latency_p90_ms": round(gcd_utilization["latency_p90_ms"]),
+        "has_mana_data": mana["has_mana_data"],
+        "time_to_oom_seconds": mana["time_to_oom_seconds"],
+        "min_mana_percent": mana["min_mana_percent"],
+        "end_mana_percent": mana["end_mana_percent"],
+        "mana_spent": mana["mana_spent"],
+        "mana_spent_by_spell": mana["mana_spent_by_spell"],
+        "mana_gained": mana["mana_gained"],
+        "healing_per_mana": mana["healing_per_mana"],
+        "mana_timeline": mana["mana_timeline"],
         "phase": phase,
         "phase_info": phase_info,
         "boss_name": boss_name,
@@ -1716,6 +1891,30 @@ def display_results(data):
 
     # Display Lifebloom uptime
     print(f"    Lifebloom Uptime: {data['lifebloom_uptime_percent']}%")
+    print(f"      • On active tank: {data['lifebloom_tank_uptime_percent']}%")
+    stacks = data['lifebloom_stack_seconds']
+    print(f"      • Time at 1/2/3 stacks: {stacks[1]}s / {stacks[2]}s / {stacks[3]}s "
+          f"({data['lifebloom_stack3_percent']}% at 3 stacks)")
+    for target in data['lifebloom_target_uptime'][:5]:
+        print(f"      • {target['name']}: {target['uptime_percent']}%")
+
+    # Display GCD utilization
+    print(f"    Active Time: {data['active_time_percent']}% ({data['casts_per_minute']} casts/min, GCD {data['player_gcd']}s)")
+    print(f"      • Idle gaps > {IDLE_GAP_GCDS} GCDs: {data['idle_gap_count']} ({data['idle_gap_seconds']}s)")
+    print(f"      • Estimated latency: {data['estimated_latency_ms']}ms median, {data['latency_p90_ms']}ms p90")
+
+    # Display mana
+    if data['has_mana_data']:
+        oom = data['time_to_oom_seconds']
+        print(f"    Mana: {'OOM at ' + format(oom, '.0f') + 's' if oom is not None else 'Never OOM'} "
+              f"(lowest {data['min_mana_percent']}%, ended at {data['end_mana_percent']}%)")
+        print(f"      • Spent: {data['mana_spent']} ({data['healing_per_mana']} healing per mana)")
+        for spell in data['mana_spent_by_spell'][:5]:
+            print(f"        - {spell['name']}: {spell['mana']} ({spell['percent']}%, {spell['casts']} casts)")
+        gains = ", ".join(f"{source} {amount}" for source, amount in data['mana_gained'].items() if amount > 0)
+        print(f"      • Gained: {gains or 'None'}")
+    else:
+        print(f"    Mana: Unknown")
 
     # Display spell HPS
     if ranking and ranking.get("hps", 0) > 0:
@@ -1780,28 +1979,29 @@ def display_results(data):
     section_i_count = 0
     section_rg_count = 0
 
-    for i, cast in enumerate(data['cast_data']):
-        time_str = f"{cast['time']:.2f}s"
+    timeline = data['cast_data']
+    for i, cast in enumerate(timeline):
+        time_str = f"{cast.time:.2f}s"
 
         # Determine action string
-        if cast['rotation_start']:
+        if cast.rotation_start:
             action_str = "Rotation started"
-        elif cast.get('lifebloom_tank'):
+        elif cast.lifebloom_tank:
             action_str = "Lifebloom (Tank)"
-        elif cast['instant_cast']:
+        elif cast.instant_cast:
             action_str = "Instant cast"
-        elif cast['regrowth']:
+        elif cast.regrowth:
             action_str = "Regrowth"
         else:
             action_str = ""
 
         # Determine abbreviation
         # Note: Both "Rotation started" and "Lifebloom (Tank)" count as LB
-        if cast['rotation_start'] or cast.get('lifebloom_tank'):
+        if cast.rotation_start or cast.lifebloom_tank:
             abbr_str = "LB"
-        elif cast['instant_cast']:
+        elif cast.instant_cast:
             abbr_str = "I"
-        elif cast['regrowth']:
+        elif cast.regrowth:
             abbr_str = "RG"
         else:
             abbr_str = ""
@@ -1810,7 +2010,7 @@ def display_results(data):
         should_end_section = False
 
         # Rule: rotation_start ALWAYS starts a new section
-        if cast['rotation_start']:
+        if cast.rotation_start:
             if not first_rotation_seen:
                 # First rotation - print any pre-rotation summary
                 if section_lb_count > 0 or section_i_count > 0 or section_rg_count > 0:
@@ -1827,7 +2027,7 @@ def display_results(data):
 
         # Rule: timeout ends the current rotation (only if not a rotation_start)
         elif in_rotation and last_rotation_time is not None:
-            time_since_last_rotation = cast['time'] - last_rotation_time
+            time_since_last_rotation = cast.time - last_rotation_time
             if time_since_last_rotation >= rotation_timeout:
                 should_end_section = True
                 in_rotation = False
@@ -1847,7 +2047,8 @@ def display_results(data):
             section_rg_count = 0
 
         # Print the cast
-        print(f"{time_str:<10} {cast['spell']:<30} {cast['target']:<25} {cast['active_tank']:<20} {cast['type']:<12} {action_str:<20} {abbr_str:<6}")
+        print(f"{time_str:<10} {timeline.name(cast.spell):<30} {timeline.name(cast.target):<25} "
+              f"{timeline.name(cast.active_tank):<20} {timeline.name(cast.type):<12} {action_str:<20} {abbr_str:<6}")
 
         # Update section counts
         if abbr_str == "LB":
@@ -1858,8 +2059,8 @@ def display_results(data):
             section_rg_count += 1
 
         # Update rotation tracking
-        if cast['rotation_start']:
-            last_rotation_time = cast['time']
+        if cast.rotation_start:
+            last_rotation_time = cast.time
             in_rotation = True
             casts_since_rotation_end = 0
         elif not in_rotation:
@@ -1883,8 +2084,8 @@ def display_results(data):
 
         for idx, section in enumerate(actual_rotations, 1):
             section_name = f"Rotation #{idx}"
-            time_range = f"{section['start_time']:.2f}s - {section['end_time']:.2f}s"
-            notation = f"[{section['lb']}LB {section['i']}I {section['rg']}RG]"
+            time_range = f"{section.start_time:.2f}s - {section.end_time:.2f}s"
+            notation = section.notation
             print(f"{section_name:<30} {time_range:<25} {notation:<30}")
 
         print("=" * 150)
@@ -1915,18 +2116,50 @@ def display_results(data):
 
         print("=" * 150)
 
+    # ===== PROFILE (--profile) =====
+    if data.get('profile'):
+        print()
+        print("=" * 70)
+        print("PROFILE")
+        print("=" * 70)
+        for line in profiling.format_profile(data['profile']):
+            print(line)
+        print("=" * 70)
+
 
 def main():
     """Main execution function"""
+    archive = "--archive" in sys.argv
+    if archive:
+        sys.argv.remove("--archive")
+
+    profile = "--profile" in sys.argv
+    if profile:
+        sys.argv.remove("--profile")
+
+    cprofile_path = None
+    if "--cprofile" in sys.argv:
+        index = sys.argv.index("--cprofile")
+        if index + 1 >= len(sys.argv):
+            print("Error: --cprofile needs an output file")
+            return 1
+        cprofile_path = sys.argv[index + 1]
+        del sys.argv[index:index + 2]
+
     if len(sys.argv) < 4 or len(sys.argv) > 5:
-        print("Usage: python analyze_druid.py <report_id> <boss_name> <player_name> [phase]")
+        print("Usage: python analyze_druid.py <report_id> <boss_name> <player_name> [phase] [--archive] [--profile] [--cprofile FILE]")
         print("\nExamples:")
         print("  python analyze_druid.py wX7H9RtYJ48P1cdW Brutallus Mercychann")
         print("  python analyze_druid.py wX7H9RtYJ48P1cdW \"Eredar Twins\" Mercychann 1")
         print("  python analyze_druid.py wX7H9RtYJ48P1cdW \"Eredar Twins\" Mercychann 2")
         print("  python analyze_druid.py wX7H9RtYJ48P1cdW \"M'uru\" Mercychann 1")
         print("  python analyze_druid.py wX7H9RtYJ48P1cdW \"M'uru\" Mercychann 2")
-        print("\nNote: Phase parameter is optional and works for Eredar Twins and M'uru")
+        print("  python analyze_druid.py wX7H9RtYJ48P1cdW \"Kil'jaeden\" Mercychann 4")
+        print("\nNote: Phase parameter is optional and works for the encounters in phases.py")
+        print("      (Felmyst, Eredar Twins, M'uru, Kil'jaeden)")
+        print("      --archive saves the raw API responses to the event archive (see event_archive.py)")
+        print("      --profile prints wall/CPU time per step and network/decode time per query")
+        print("      --cprofile FILE also writes cProfile stats to FILE")
         return 1
 
     report_code = sys.argv[1]
@@ -1937,11 +2170,11 @@ def main():
     if len(sys.argv) == 5:
         try:
             phase = int(sys.argv[4])
-            if phase not in [1, 2]:
-                print("Error: Phase must be 1 or 2")
+            if phase not in phases.PHASE_NUMBERS:
+                print(f"Error: Phase must be one of {phases.PHASE_NUMBERS}")
                 return 1
         except ValueError:
-            print("Error: Phase must be a number (1 or 2)")
+            print(f"Error: Phase must be a number ({', '.join(map(str, phases.PHASE_NUMBERS))})")
             return 1
 
     print("=" * 70)
@@ -1950,8 +2183,11 @@ def main():
     print()
 
     try:
-        data = analyze_druid_performance(report_code, boss_name, player_name, phase)
+        data = analyze_druid_performance(report_code, boss_name, player_name, phase, archive=archive,
+                                         profile=profile, cprofile_path=cprofile_path)
         display_results(data)
+        if cprofile_path:
+            print(f"✓ cProfile stats saved to {cprofile_path} (view with: python -m pstats {cprofile_path})")
         return 0
     except Exception as e:
         print()
@@ -12,6 +12,7 @@ Example:
     python analyze_top_rankings.py 725 1 100 brutallus_top100.csv
 """
 
+import os
 import sys
 import csv
 import time
@@ -21,10 +22,17 @@ from collections import Counter
 from auth import get_user_access_token
 
 # API Configuration
-API_URL = "https://www.warcraftlogs.com/api/v2/user"
+# Overridable to point at a local stand-in server (see wcl_standin.py)
+API_URL = os.environ.get("WARCRAFTLOGS_API_URL", "https://www.warcraftlogs.com/api/v2/user")
 
 # Import the analysis function from analyze_druid
 from analyze_druid import analyze_druid_performance
+from datasets import CSV_FIELDNAMES, publish_dataset
+from phases import PHASE_NUMBERS
+import metrics
+from crawl_planner import (
+    record_crawl_sample, estimate_analysis_cost, plan_crawl, print_crawl_plan, DEFAULT_POINTS_PER_RANKINGS_PAGE
+)
 
 # Rate limiting configuration
 BASE_DELAY = 2.0  # Base delay between players in seconds
@@ -73,12 +81,14 @@ def check_rate_limit():
             reset_in = data.get("pointsResetIn", 0)
             percent_used = (spent / limit * 100) if limit > 0 else 0
 
-            return {
+            rate_status = {
                 "limitPerHour": limit,
                 "pointsSpentThisHour": spent,
                 "pointsResetIn": reset_in,
                 "percentUsed": percent_used
             }
+            metrics.record_rate_limit(rate_status)
+            return rate_status
 
     # Return default values if query fails
     return {
@@ -323,7 +333,7 @@ def fetch_rankings(encounter_id, start_rank=1, end_rank=100, region=None):
     return result, encounter_name
 
 
-def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
+def analyze_ranking(ranking, rank_number, encounter_name, phase=None, archive=False):
     """
     Analyze a single ranking entry and return CSV row data.
 
@@ -332,6 +342,7 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
         rank_number: The rank number for this entry
         encounter_name: Name of the boss encounter
         phase: Optional phase number for multi-phase encounters (e.g., Eredar Twins)
+        archive: If True, save the raw API responses to the event archive
 
     Returns: dict with all CSV columns
     """
@@ -350,7 +361,7 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
 
     try:
         # Run the full analysis
-        data = analyze_druid_performance(report_code, encounter_name, player_name, phase)
+        data = analyze_druid_performance(report_code, encounter_name, player_name, phase, archive=archive)
 
         # Extract date and duration
         encounter_date = datetime.fromtimestamp(data['timestamp'] / 1000)
@@ -436,6 +447,8 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
             'Trinket1': trinket1,
             'Trinket2': trinket2,
             'LifebloomUptime': round(data['lifebloom_uptime_percent'], 2),
+            'LifebloomTankUptime': round(data['lifebloom_tank_uptime_percent'], 2),
+            'LifebloomStack3Percent': round(data['lifebloom_stack3_percent'], 2),
             'LifebloomHPS': round(lifebloom_hps, 2),
             'LifebloomPercentHPS': round(lifebloom_percent, 2),
             'RejuvenationHPS': round(rejuvenation_hps, 2),
@@ -447,7 +460,18 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
             'Rotation2': rotation2,
             'Rotation2Percent': round(rotation2_percent, 2),
             'TankRotationPercent': round(data['tank_rotation_percent'], 2),
-            'RotatingOnTank': 'Yes' if data['rotating_on_tank'] else 'No'
+            'RotatingOnTank': 'Yes' if data['rotating_on_tank'] else 'No',
+            'ActiveTimePercent': data['active_time_percent'],
+            'CastsPerMinute': data['casts_per_minute'],
+            'IdleGapCount': data['idle_gap_count'],
+            'IdleGapSeconds': data['idle_gap_seconds'],
+            'EstimatedLatencyMs': data['estimated_latency_ms'],
+            'TimeToOOM': data['time_to_oom_seconds'] if data['time_to_oom_seconds'] is not None else '',
+            'HealingPerMana': data['healing_per_mana'],
+            'ManaFromInnervate': data['mana_gained']['Innervate'],
+            'ManaFromVampiricTouch': data['mana_gained']['Vampiric Touch'],
+            'ManaFromPotions': data['mana_gained']['Potions'],
+            'ManaFromRunes': data['mana_gained']['Runes']
         }
 
         return row
@@ -483,6 +507,8 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
             'Trinket1': '',
             'Trinket2': '',
             'LifebloomUptime': 0,
+            'LifebloomTankUptime': 0,
+            'LifebloomStack3Percent': 0,
             'LifebloomHPS': 0,
             'LifebloomPercentHPS': 0,
             'RejuvenationHPS': 0,
@@ -494,7 +520,18 @@ def analyze_ranking(ranking, rank_number, encounter_name, phase=None):
             'Rotation2': '',
             'Rotation2Percent': 0,
             'TankRotationPercent': 0,
-            'RotatingOnTank': 'ERROR'
+            'RotatingOnTank': 'ERROR',
+            'ActiveTimePercent': 0,
+            'CastsPerMinute': 0,
+            'IdleGapCount': 0,
+            'IdleGapSeconds': 0,
+            'EstimatedLatencyMs': 0,
+            'TimeToOOM': '',
+            'HealingPerMana': 0,
+            'ManaFromInnervate': 0,
+            'ManaFromVampiricTouch': 0,
+            'ManaFromPotions': 0,
+            'ManaFromRunes': 0
         }
 
 
@@ -522,6 +559,7 @@ Examples:
   python analyze_top_rankings.py 727 1 100 eredar_twins_p1.csv --phase 1
   python analyze_top_rankings.py 728 1 100 muru_p1.csv --phase 1
   python analyze_top_rankings.py 728 1 100 muru_p2.csv --phase 2
+  python analyze_top_rankings.py 725 1 2000 data/t6/brutallus.csv --plan
         """
     )
 
@@ -531,8 +569,12 @@ Examples:
     parser.add_argument("output_file", help="Output CSV file path")
     parser.add_argument("--region", "-r", type=str, choices=["US", "EU", "KR", "TW", "CN"],
                         help="Filter rankings by region (US, EU, KR, TW, CN)")
-    parser.add_argument("--phase", "-p", type=int, choices=[1, 2],
-                        help="Phase number for multi-phase encounters (e.g., Eredar Twins: 1 or 2)")
+    parser.add_argument("--phase", "-p", type=int, choices=PHASE_NUMBERS,
+                        help="Phase number for multi-phase encounters (see phases.py; e.g., Eredar Twins: 1 or 2)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Dry run: enumerate the work and project points/runtime without analyzing")
+    parser.add_argument("--archive", action="store_true",
+                        help="Save raw API responses of each analysis to the event archive (see event_archive.py)")
 
     args = parser.parse_args()
 
@@ -542,6 +584,8 @@ Examples:
     output_file = args.output_file
     region = args.region
     phase = args.phase
+    plan_only = args.plan
+    archive = args.archive
 
     if start_rank < 1:
         print("Error: start_rank must be at least 1")
@@ -565,30 +609,19 @@ Examples:
         region_str = f" in {region}" if region else ""
         phase_str = f" (Phase {phase})" if phase else ""
         print(f"Fetching rankings {start_rank}-{end_rank} for encounter {encounter_id}{region_str}...")
+        if plan_only:
+            rate_before = check_rate_limit()
         rankings, encounter_name = fetch_rankings(encounter_id, start_rank, end_rank, region)
         print(f"\n✓ Found {len(rankings)} rankings for {encounter_name}{phase_str}{region_str}")
         print()
 
         # Prepare CSV
-        fieldnames = [
-            'Rank', 'Name', 'Server', 'Region', 'Date', 'Duration', 'ReportID', 'ReportLink', 'HPS',
-            'HasteSummary', 'HasteGear', 'Spirit', 'Intellect', 'TotalHealers',
-            'nDruid', 'nPaladin', 'nHPriest', 'nDPriest', 'nShaman',
-            'RaidDamageTakenPerSecond',
-            'VampiricTouch', 'InnervateCount', 'Bloodlust', 'NaturesGrace',
-            'Trinket1', 'Trinket2',
-            'LifebloomUptime', 'LifebloomHPS', 'LifebloomPercentHPS',
-            'RejuvenationHPS', 'RejuvenationPercentHPS',
-            'RegrowthHPS', 'RegrowthPercentHPS',
-            'Rotation1', 'Rotation1Percent', 'Rotation2', 'Rotation2Percent',
-            'TankRotationPercent', 'RotatingOnTank'
-        ]
+        fieldnames = CSV_FIELDNAMES
 
         # Load existing data if CSV exists
         existing_data = []
         existing_report_ids = set()
 
-        import os
         if os.path.exists(output_file):
             print(f"✓ Found existing CSV file: {output_file}")
             print(f"  Loading existing data...")
@@ -605,6 +638,18 @@ Examples:
             print(f"✓ Creating new CSV file: {output_file}")
             print()
 
+        if plan_only:
+            rate_status = check_rate_limit()
+            rankings_pages = ((end_rank - 1) // 100) - ((start_rank - 1) // 100) + 1
+            page_points = (rate_status['pointsSpentThisHour'] - rate_before['pointsSpentThisHour']) / rankings_pages
+            if page_points < 0:
+                page_points = DEFAULT_POINTS_PER_RANKINGS_PAGE  # Hourly reset happened mid-fetch
+
+            analysis_cost = estimate_analysis_cost(encounter_id, phase)
+            plan = plan_crawl(rankings, existing_report_ids, analysis_cost)
+            print_crawl_plan(plan, analysis_cost, rankings_pages, page_points, rate_status)
+            return 0
+
         # Analyze each ranking
         print(f"Analyzing {len(rankings)} players...")
 
@@ -614,6 +659,11 @@ Examples:
         print(f"  ⏰ Points reset in: {rate_status['pointsResetIn']} seconds")
         print()
 
+        # Cost sampling for the crawl planner (points/time between rate checks)
+        sample_points = rate_status['pointsSpentThisHour']
+        sample_time = time.time()
+        sample_count = 0
+
         new_count = 0
         skipped_count = 0
         SAVE_INTERVAL = 10  # Save every 10 new entries
@@ -636,6 +686,9 @@ Examples:
                 for row in existing_data:
                     writer.writerow(row)
 
+            # Keep the typed Arrow copy (and the SQLite copy, if enabled) used by the web app in sync
+            publish_dataset(output_file)
+
         for idx, ranking in enumerate(rankings):
             # Use the actual rank that we added during fetch (before Anonymous filtering)
             rank_number = ranking.get("actual_rank", start_rank + idx)
@@ -650,16 +703,21 @@ Examples:
                 continue
 
             # Analyze new player
-            row_data = analyze_ranking(ranking, rank_number, encounter_name, phase)
+            row_data = analyze_ranking(ranking, rank_number, encounter_name, phase, archive=archive)
             existing_data.append(row_data)
             existing_report_ids.add(report_code)  # Add to set to prevent duplicates in same run
             new_count += 1
+            sample_count += 1
 
             # Check rate limit periodically and adjust delay
             if new_count % RATE_CHECK_INTERVAL == 0:
                 rate_status = check_rate_limit()
                 percent_used = rate_status['percentUsed']
 
+                record_crawl_sample(encounter_id, phase, sample_count,
+                                    rate_status['pointsSpentThisHour'] - sample_points,
+                                    time.time() - sample_time)
+
                 print(f"  📊 Rate check after {new_count} players: {rate_status['pointsSpentThisHour']}/{rate_status['limitPerHour']} ({percent_used:.1f}%)")
 
                 # If we're at or over 90%, wait until usage drops
@@ -667,6 +725,7 @@ Examples:
                     print(f"  🛑 Usage at {percent_used:.1f}% - pausing to avoid hitting rate limit")
                     wait_for_rate_limit()
                     current_delay = BASE_DELAY  # Reset delay after waiting
+                    rate_status = check_rate_limit()
 
                 # Adjust delay based on usage
                 elif percent_used > RATE_THRESHOLD * 100:
@@ -681,6 +740,10 @@ Examples:
                 else:
                     current_delay = BASE_DELAY
 
+                sample_points = rate_status['pointsSpentThisHour']
+                sample_time = time.time()
+                sample_count = 0
+
             # Save progress every 10 new entries
             if new_count % SAVE_INTERVAL == 0:
                 save_progress()
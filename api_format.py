@@ -0,0 +1,132 @@
+"""
+Compact Columnar Response Format for the Dataset Endpoints
+
+`/api/data?format=columnar` and `/api/top/<n>?format=columnar` return a table
+as per-column arrays instead of one object per row:
+
+    {
+        "columns": ["Rank", "Name", "Region", ...],
+        "length": 1927,
+        "values": {"Rank": [1, 2, ...], "Region": [0, 1, ...], ...},
+        "dictionaries": {"Region": ["CN", "EU", "US"], ...}
+    }
+
+Columns listed in "dictionaries" are dictionary-encoded: their values are
+indices into the dictionary, with -1 for a missing value. Other columns hold
+plain values with null for missing ones.
+
+Responses are serialized with orjson when it is installed (numeric columns
+go straight from NumPy) and compressed with brotli or gzip when the client
+accepts it.
+"""
+
+import gzip
+import json
+import numpy as np
+import pandas as pd
+from flask import Response
+from dataset_store import COLUMN_DTYPES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNAR_FORMAT = 'columnar'
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def wants_columnar(args):
+    """Whether the request asked for the columnar format."""
+    return args.get('format') == COLUMNAR_FORMAT
+
+
+def clean_values(values):
+    """Replace NaN with None in a list of values."""
+    return [None if v != v else v for v in values]
+
+
+def frame_to_columnar(df):
+    """Convert a dataset DataFrame to the columnar payload."""
+    values = {}
+    dictionaries = {}
+
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            dictionaries[col] = series.cat.categories.tolist()
+            values[col] = series.cat.codes.to_numpy() if orjson else series.cat.codes.tolist()
+        elif series.dtype.kind in 'iuf' and orjson:
+            # orjson writes NumPy arrays directly, NaN as null
+            values[col] = np.ascontiguousarray(series.to_numpy())
+        else:
+            values[col] = clean_values(series.tolist())
+
+    return {
+        "columns": list(df.columns),
+        "length": len(df),
+        "values": values,
+        "dictionaries": dictionaries
+    }
+
+
+def records_to_columnar(records, columns):
+    """
+    Convert row dicts (SQLite backend) to the columnar payload.
+
+    Dictionary-encodes the same columns the typed dataset files do.
+    """
+    values = {}
+    dictionaries = {}
+
+    for col in columns:
+        column_values = [record.get(col) for record in records]
+        if COLUMN_DTYPES.get(col) == 'category':
+            dictionary = sorted(set(v for v in column_values if v is not None))
+            lookup = {v: i for i, v in enumerate(dictionary)}
+            dictionaries[col] = dictionary
+            values[col] = [lookup[v] if v is not None else -1 for v in column_values]
+        else:
+            values[col] = column_values
+
+    return {
+        "columns": list(columns),
+        "length": len(records),
+        "values": values,
+        "dictionaries": dictionaries
+    }
+
+
+def dumps(payload):
+    """Serialize a payload to JSON bytes."""
+    if orjson:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def make_json_response(payload, request):
+    """
+    Serialize a payload and compress it to match the client's Accept-Encoding.
+
+    Prefers brotli (if installed), then gzip. Small bodies are sent as-is.
+    """
+    body = dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        accepted = request.headers.get('Accept-Encoding', '')
+        if brotli and 'br' in accepted:
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            headers['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers['Content-Encoding'] = 'gzip'
+
+    return Response(body, mimetype='application/json', headers=headers)
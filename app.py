@@ -1,79 +1,232 @@
-from flask import Flask, render_template, jsonify, request
-import pandas as pd
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context, g
 import os
 import re
-from analyze_druid import analyze_druid_performance
+import time
+import threading
+from datasets import DATASETS_BEST, DATASETS_ALL, CSV_FIELDNAMES, get_dataset_path
+from dataset_store import read_dataset, to_json_records, get_columnar_path
+from http_cache import cached_response
+from api_format import wants_columnar, frame_to_columnar, records_to_columnar, make_json_response
+from db_backend import query_all, query_stats, query_top_n, database_exists, get_dataset_version as get_sql_dataset_version
+from jobs import submit_analysis, get_job, job_status_payload, iter_job_events, acquire_sse_slot, release_sse_slot
+from result_cache import get_cached_result, get_cache_stats
+import metrics
 
 app = Flask(__name__)
 
-# Available datasets - best report per player
-DATASETS_BEST = {
-    'brutallus': 'data/t6/brutallus.csv',
-    'felmyst': 'data/t6/felmyst.csv',
-    'eredar_twins_p1': 'data/t6/eredar_twins_p1.csv',
-    'eredar_twins_p2': 'data/t6/eredar_twins_p2.csv',
-    'muru_p1': 'data/t6/muru_p1.csv',
-    'muru_p2': 'data/t6/muru_p2.csv',
-    'kiljaeden': 'data/t6/kiljaeden.csv'
-}
-
-# Available datasets - all reports per player
-DATASETS_ALL = {
-    'brutallus': 'data/t6/brutallus_all_reports.csv',
-    'felmyst': 'data/t6/felmyst_all_reports.csv',
-    'eredar_twins_p1': 'data/t6/eredar_twins_all_reports_p1.csv',
-    'eredar_twins_p2': 'data/t6/eredar_twins_all_reports_p2.csv',
-    'muru_p1': 'data/t6/muru_all_reports_p1.csv',
-    'muru_p2': 'data/t6/muru_all_reports_p2.csv',
-    'kiljaeden': 'data/t6/kiljaeden_all_reports.csv'
-}
+# Serve /api/data, /api/stats and /api/top from the SQLite database (see db_backend.py)
+USE_SQL_BACKEND = os.environ.get('LIFEBLOOM_BACKEND', 'pandas').lower() == 'sqlite'
+
+def resolve_data_path(dataset, data_source):
+    """Resolve a dataset's CSV path, falling back to best if the all-reports file doesn't exist"""
+    data_path = get_dataset_path(dataset, data_source)
+
+    # Fallback to best if all reports file doesn't exist
+    if data_source == 'all' and (not data_path or not os.path.exists(data_path)):
+        data_path = DATASETS_BEST.get(dataset)
+
+    return data_path
+
+# Datasets loaded by this process, keyed by path: (file version, DataFrame).
+# warm_datasets() fills it before the server forks its workers (gunicorn
+# --preload / uwsgi without lazy-apps), so workers share the loaded pages
+# copy-on-write and recycled workers start warm.
+_dataset_cache = {}
+_dataset_cache_lock = threading.Lock()
+_warm_state = {'warm': False, 'datasets': 0, 'rows': 0, 'seconds': None}
+
+def get_file_version(data_path):
+    """Modification time and size of a dataset CSV (or its Arrow copy if the CSV is missing)"""
+    for path in (data_path, get_columnar_path(data_path)):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+    return None
 
 def load_data(dataset='brutallus', data_source='best'):
     """Load and return the specified dataset
 
+    The DataFrame is shared between requests, so callers must not modify it in place.
+
     Args:
         dataset: The boss/encounter name (e.g., 'brutallus', 'felmyst')
         data_source: 'best' for best report per player, 'all' for all reports
     """
-    # Select the appropriate dataset dictionary
-    datasets = DATASETS_ALL if data_source == 'all' else DATASETS_BEST
-    data_path = datasets.get(dataset)
+    data_path = resolve_data_path(dataset, data_source)
+    if not data_path:
+        return None
+
+    version = get_file_version(data_path)
+    if version is None:
+        return None
+
+    cached = _dataset_cache.get(data_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _dataset_cache_lock:
+        cached = _dataset_cache.get(data_path)
+        if cached and cached[0] == version:
+            return cached[1]
+        # Prefers the memory-mapped Arrow copy, falls back to parsing the CSV
+        df = read_dataset(data_path)
+        _dataset_cache[data_path] = (version, df)
+        return df
 
-    # Fallback to best if all reports file doesn't exist
-    if data_source == 'all' and (not data_path or not os.path.exists(data_path)):
-        data_path = DATASETS_BEST.get(dataset)
+def warm_datasets():
+    """Load every registered dataset into this process's cache (call before forking workers)"""
+    if USE_SQL_BACKEND:
+        if not database_exists():
+            print("⚠ LIFEBLOOM_BACKEND=sqlite but the database does not exist. Run: python db_backend.py init")
+        _warm_state.update(warm=True)
+        return _warm_state
+
+    start = time.time()
+    datasets = 0
+    rows = 0
+    for data_source, registry in (('best', DATASETS_BEST), ('all', DATASETS_ALL)):
+        for dataset in registry:
+            df = load_data(dataset, data_source)
+            if df is not None:
+                datasets += 1
+                rows += len(df)
+
+    _warm_state.update(warm=True, datasets=datasets, rows=rows, seconds=round(time.time() - start, 3))
+    print(f"✓ Warmed {datasets} datasets ({rows:,} rows) in {_warm_state['seconds']}s")
+    return _warm_state
+
+def get_dataset_version():
+    """Version of the dataset a request reads, plus the backend
+
+    The pandas backend serves the CSV, so its version is the file's modification
+    time and size. The SQLite backend serves the database copy, which a crawler
+    re-syncs after saving the CSV, so its version comes from dataset_versions.
+
+    Returns None for unknown datasets so their error responses are not cached.
+    """
+    dataset = request.args.get('dataset', 'brutallus')
+    data_source = request.args.get('dataSource', 'best')
+    if USE_SQL_BACKEND:
+        version = get_sql_dataset_version(dataset, data_source)
+        return f"{dataset}:{version}:sqlite" if version else None
+
+    data_path = resolve_data_path(dataset, data_source)
+    version = get_file_version(data_path) if data_path else None
+    if version is None:
+        return None
+    return f"{data_path}:{version}:pandas"
+
+# /api/top query parameters that filter a column by equality: (param, column, kind)
+# "yes_no" accepts only 'Yes'/'No', "int" accepts only digit strings
+TOP_FILTERS = [
+    ('naturesGrace', 'NaturesGrace', 'yes_no'),
+    ('totalHealers', 'TotalHealers', 'int'),
+    ('vampiricTouch', 'VampiricTouch', 'yes_no'),
+    ('innervates', 'InnervateCount', 'int'),
+    ('rotatingOnTank', 'RotatingOnTank', 'yes_no'),
+    ('nDruid', 'nDruid', 'int'),
+    ('nPaladin', 'nPaladin', 'int'),
+    ('nHPriest', 'nHPriest', 'int'),
+    ('nDPriest', 'nDPriest', 'int'),
+    ('nShaman', 'nShaman', 'int'),
+]
+
+def parse_top_filters(args):
+    """
+    Normalize /api/top query parameters into a list of filters.
 
-    if data_path and os.path.exists(data_path):
-        df = pd.read_csv(data_path)
-        # Convert numeric columns to appropriate types
-        numeric_cols = ['HPS', 'HasteGear', 'HasteSummary', 'Spirit', 'Intellect']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        return df
-    return None
+    Invalid values are ignored, matching the original per-parameter checks.
+
+    Returns:
+        List of (column, op, value) tuples where op is '>', '==' or 'in'
+    """
+    # Filter out HPS = 0.0
+    filters = [('HPS', '>', 0)]
+
+    regions_filter = args.get('regions', None)
+    if regions_filter:
+        filters.append(('Region', 'in', regions_filter.split(',')))
+
+    for param, column, kind in TOP_FILTERS:
+        value = args.get(param, None)
+        if kind == 'yes_no' and value in ['Yes', 'No']:
+            filters.append((column, '==', value))
+        elif kind == 'int' and value and value.isdigit():
+            filters.append((column, '==', int(value)))
+
+    return filters
+
+def apply_filters(df, filters):
+    """Apply parsed filters to a dataset DataFrame (pandas backend)"""
+    for column, op, value in filters:
+        if op == '>':
+            df = df[df[column] > value]
+        elif op == 'in':
+            df = df[df[column].isin(value)]
+        else:
+            df = df[df[column] == value]
+    return df
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe request latency and count the status code, per route pattern"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route=route, method=request.method)
+    metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
+@app.route('/api/ready')
+def get_ready():
+    """Readiness endpoint: 200 once datasets are loaded in this worker, 503 before"""
+    state = dict(_warm_state, backend='sqlite' if USE_SQL_BACKEND else 'pandas',
+                 cached_datasets=len(_dataset_cache), pid=os.getpid())
+    return jsonify(state), 200 if state['warm'] else 503
+
 @app.route('/api/data')
+@cached_response(get_dataset_version)
 def get_data():
     """API endpoint to get the full dataset"""
     dataset = request.args.get('dataset', 'brutallus')
     data_source = request.args.get('dataSource', 'best')
+
+    if USE_SQL_BACKEND:
+        data_records = query_all(dataset, data_source)
+        if data_records is None:
+            return jsonify({'error': 'Data not found'}), 404
+        if wants_columnar(request.args):
+            return make_json_response(records_to_columnar(data_records, CSV_FIELDNAMES), request)
+        return jsonify(data_records)
+
     df = load_data(dataset, data_source)
     if df is not None:
+        if wants_columnar(request.args):
+            return make_json_response(frame_to_columnar(df), request)
         # Replace NaN with None for proper JSON serialization
-        return jsonify(df.where(pd.notna(df), None).to_dict(orient='records'))
+        return jsonify(to_json_records(df))
     return jsonify({'error': 'Data not found'}), 404
 
 @app.route('/api/stats')
+@cached_response(get_dataset_version)
 def get_stats():
     """API endpoint to get summary statistics"""
     dataset = request.args.get('dataset', 'brutallus')
     data_source = request.args.get('dataSource', 'best')
+
+    if USE_SQL_BACKEND:
+        stats = query_stats(dataset, data_source)
+        if stats is None:
+            return jsonify({'error': 'Data not found'}), 404
+        return jsonify(stats)
+
     df = load_data(dataset, data_source)
     if df is None:
         return jsonify({'error': 'Data not found'}), 404
@@ -91,69 +244,33 @@ def get_stats():
     return jsonify(stats)
 
 @app.route('/api/top/<int:n>')
+@cached_response(get_dataset_version)
 def get_top_n(n):
     """API endpoint to get top N healers by HPS"""
     dataset = request.args.get('dataset', 'brutallus')
     data_source = request.args.get('dataSource', 'best')
-    natures_grace_filter = request.args.get('naturesGrace', None)
-    total_healers_filter = request.args.get('totalHealers', None)
-    vampiric_touch_filter = request.args.get('vampiricTouch', None)
-    innervates_filter = request.args.get('innervates', None)
-    rotating_on_tank_filter = request.args.get('rotatingOnTank', None)
-    n_druid_filter = request.args.get('nDruid', None)
-    n_paladin_filter = request.args.get('nPaladin', None)
-    n_hpriest_filter = request.args.get('nHPriest', None)
-    n_dpriest_filter = request.args.get('nDPriest', None)
-    n_shaman_filter = request.args.get('nShaman', None)
-    regions_filter = request.args.get('regions', None)
+    filters = parse_top_filters(request.args)
+
+    if USE_SQL_BACKEND:
+        result = query_top_n(dataset, data_source, filters, n)
+        if result is None:
+            return jsonify({'error': 'Data not found'}), 404
+        data_records, total_count = result
+        if wants_columnar(request.args):
+            return make_json_response({
+                'data': records_to_columnar(data_records, CSV_FIELDNAMES + ['AdjustedRank']),
+                'total_count': total_count
+            }, request)
+        return jsonify({
+            'data': data_records,
+            'total_count': total_count
+        })
 
     df = load_data(dataset, data_source)
     if df is None:
         return jsonify({'error': 'Data not found'}), 404
 
-    # Filter out HPS = 0.0
-    df = df[df['HPS'] > 0]
-
-    # Apply regions filter if specified
-    if regions_filter:
-        allowed_regions = regions_filter.split(',')
-        df = df[df['Region'].isin(allowed_regions)]
-
-    # Apply NaturesGrace filter if specified
-    if natures_grace_filter in ['Yes', 'No']:
-        df = df[df['NaturesGrace'] == natures_grace_filter]
-
-    # Apply TotalHealers filter if specified
-    if total_healers_filter and total_healers_filter.isdigit():
-        df = df[df['TotalHealers'] == int(total_healers_filter)]
-
-    # Apply VampiricTouch filter if specified
-    if vampiric_touch_filter in ['Yes', 'No']:
-        df = df[df['VampiricTouch'] == vampiric_touch_filter]
-
-    # Apply Innervates filter if specified
-    if innervates_filter and innervates_filter.isdigit():
-        df = df[df['InnervateCount'] == int(innervates_filter)]
-
-    # Apply RotatingOnTank filter if specified
-    if rotating_on_tank_filter in ['Yes', 'No']:
-        df = df[df['RotatingOnTank'] == rotating_on_tank_filter]
-
-    # Apply healer composition filters if specified
-    if n_druid_filter and n_druid_filter.isdigit():
-        df = df[df['nDruid'] == int(n_druid_filter)]
-
-    if n_paladin_filter and n_paladin_filter.isdigit():
-        df = df[df['nPaladin'] == int(n_paladin_filter)]
-
-    if n_hpriest_filter and n_hpriest_filter.isdigit():
-        df = df[df['nHPriest'] == int(n_hpriest_filter)]
-
-    if n_dpriest_filter and n_dpriest_filter.isdigit():
-        df = df[df['nDPriest'] == int(n_dpriest_filter)]
-
-    if n_shaman_filter and n_shaman_filter.isdigit():
-        df = df[df['nShaman'] == int(n_shaman_filter)]
+    df = apply_filters(df, filters)
 
     # Store total count before limiting
     total_count = len(df)
@@ -164,8 +281,14 @@ def get_top_n(n):
     top_n = top_n.copy()
     top_n['AdjustedRank'] = range(1, len(top_n) + 1)
 
+    if wants_columnar(request.args):
+        return make_json_response({
+            'data': frame_to_columnar(top_n),
+            'total_count': total_count
+        }, request)
+
     # Replace NaN with None for proper JSON serialization
-    data_records = top_n.where(pd.notna(top_n), None).to_dict(orient='records')
+    data_records = to_json_records(top_n)
 
     # Return both data and total count
     return jsonify({
@@ -175,7 +298,7 @@ def get_top_n(n):
 
 @app.route('/api/analyze-report', methods=['POST'])
 def analyze_report():
-    """API endpoint to analyze a specific report for a player"""
+    """API endpoint to queue analysis of a specific report for a player (returns a job ID)"""
     data = request.get_json()
 
     if not data:
@@ -199,65 +322,76 @@ def analyze_report():
     if url_match:
         report_code = url_match.group(1)
 
-    try:
-        # Call the analysis function
-        result = analyze_druid_performance(report_code, boss_name, player_name)
-
-        # Convert datetime-like fields for JSON serialization
-        from datetime import datetime
-
-        # Build response with formatted data
-        response_data = {
-            'success': True,
-            'report_code': report_code,
-            'fight_id': result['fight_id'],
-            'player_id': result['player_id'],
-            'is_kill': result['is_kill'],
-            'date': datetime.fromtimestamp(result['timestamp'] / 1000).strftime("%Y-%m-%d"),
-            'duration': f"{result['duration_minutes']}m {result['duration_seconds']}s",
-            'duration_minutes': result['duration_minutes'],
-            'duration_seconds': result['duration_seconds'],
-            'total_healers': result['total_healers'],
-            'healer_composition': result['healer_composition'],
-            'raid_damage_taken_per_second': result['raid_damage_taken_per_second'],
-            'player_name': result['player_name'],
-            'player_stats': result['player_stats'],
-            'player_trinkets': result['player_trinkets'],
-            'player_ranking': result['player_ranking'],
-            'has_vampiric_touch': result['has_vampiric_touch'],
-            'innervate_count': result['innervate_count'],
-            'has_bloodlust': result['has_bloodlust'],
-            'has_natures_grace': result['has_natures_grace'],
-            'lifebloom_uptime_percent': result['lifebloom_uptime_percent'],
-            'lifebloom_hps': result['lifebloom_hps'],
-            'rejuvenation_hps': result['rejuvenation_hps'],
-            'regrowth_total_hps': result['regrowth_total_hps'],
-            'regrowth_by_rank': result['regrowth_by_rank'],
-            'tanks': result['tanks'],
-            'rotation_count': result['rotation_count'],
-            'actual_rotations': result['actual_rotations'],
-            'rotation_sections': result['rotation_sections'],
-            'sorted_patterns': result['sorted_patterns'],
-            'tank_rotation_percent': result['tank_rotation_percent'],
-            'rotating_on_tank': result['rotating_on_tank'],
-            'cast_data': result['cast_data'],
-            'report_link': f"https://classic.warcraftlogs.com/reports/{report_code}?fight={result['fight_id']}&source={result['player_id']}&type=healing"
-        }
-
-        return jsonify(response_data)
-
-    except Exception as e:
-        error_message = str(e)
-
-        # Provide more user-friendly error messages
-        if 'not found' in error_message.lower():
-            return jsonify({'error': f'Could not find the specified data: {error_message}'}), 404
-        elif 'token' in error_message.lower() or 'auth' in error_message.lower():
-            return jsonify({'error': 'Authentication error. Please ensure your WarcraftLogs credentials are configured.'}), 401
-        elif 'rate limit' in error_message.lower():
-            return jsonify({'error': 'Rate limit exceeded. Please wait a few minutes and try again.'}), 429
-        else:
-            return jsonify({'error': f'Analysis failed: {error_message}'}), 500
+    # Repeat analyses are served straight from the shared result cache
+    cached = get_cached_result(report_code, boss_name, player_name)
+    if cached is not None:
+        return app.response_class(cached, mimetype='application/json')
+
+    # Run the analysis in the background pool and return immediately
+    # (identical requests already in flight share a single job)
+    job_id, status = submit_analysis(report_code, boss_name, player_name)
+
+    return jsonify({
+        'job_id': job_id,
+        'status': status,
+        'status_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events',
+        'result_url': f'/api/jobs/{job_id}/result'
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def get_job_status(job_id):
+    """API endpoint to poll an analysis job's status and progress"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status_payload(job))
+
+@app.route('/api/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """API endpoint streaming an analysis job's progress and partial results (Server-Sent Events)"""
+    if get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    # Streams hold a worker thread; when this worker's stream slots are taken,
+    # the 503 closes the EventSource and the page polls /result instead
+    if not acquire_sse_slot():
+        return jsonify({'error': 'Too many open event streams, poll the result URL'}), 503
+
+    response = Response(
+        stream_with_context(iter_job_events(job_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(release_sse_slot)
+    return response
+
+@app.route('/api/jobs/<job_id>/result')
+def get_job_result(job_id):
+    """API endpoint to fetch a finished analysis (202 while still running)"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), job['error_status']
+    if job['status'] != 'done':
+        return jsonify(job_status_payload(job)), 202
+
+    # Result is stored as serialized JSON, so serve it as-is
+    return app.response_class(job['result'], mimetype='application/json')
+
+@app.route('/api/result-cache')
+def get_result_cache_stats():
+    """API endpoint to get analysis result cache size and hit-rate stats"""
+    return jsonify(get_cache_stats())
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics, merged across web workers, analysis processes and crawlers"""
+    for stat, value in get_cache_stats().items():
+        metrics.RESULT_CACHE_STATS.set(value, stat=stat)
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
@@ -7,9 +7,7 @@ Authenticates as a user to access subscription features like archived reports
 import os
 import json
 import time
-import webbrowser
 import requests
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 
@@ -33,8 +31,13 @@ RETRY_DELAY = 2  # seconds between retries
 auth_code = None
 
 
-class OAuthCallbackHandler(BaseHTTPRequestHandler):
-    """HTTP request handler for OAuth callback"""
+class OAuthCallbackHandler:
+    """
+    HTTP request handler for OAuth callback.
+
+    Mixed into http.server.BaseHTTPRequestHandler by get_authorization_code, so
+    http.server is only imported when the interactive flow actually runs.
+    """
 
     def do_GET(self):
         """Handle GET request from OAuth redirect"""
@@ -93,6 +96,10 @@ def get_authorization_code():
     """
     global auth_code
 
+    # Only needed for the interactive flow, so not imported at module level
+    import webbrowser
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
     # Construct authorization URL
     auth_params = {
         'client_id': CLIENT_ID,
@@ -111,7 +118,8 @@ def get_authorization_code():
 
     # Start local server to receive callback
     print("Starting local server on http://localhost:8080 to receive callback...")
-    server = HTTPServer(('localhost', 8080), OAuthCallbackHandler)
+    handler = type('OAuthCallbackHandler', (OAuthCallbackHandler, BaseHTTPRequestHandler), {})
+    server = HTTPServer(('localhost', 8080), handler)
 
     # Handle one request (the callback)
     print("Waiting for authorization...")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark for the Analyzer, Crawlers and Flask Endpoints
+
+Runs against the local WarcraftLogs stand-in (wcl_standin.py), so results are
+reproducible and spend no API points. Benchmark cases are recorded once from
+the real API; recording saves the fixtures and adds the case to
+data/fixtures/cases.json.
+
+Reports:
+  - analyzer: wall time per analysis and per pipeline step, and latency per
+    GraphQL query (from the metrics registry, see metrics.py)
+  - crawler: rankings fetched and analyzed per second, including 429 retries
+  - web app: latency and requests/second of the dataset endpoints, uncached
+    and from the response cache
+
+Usage:
+    python benchmark.py record-analysis <report_code> <boss_name> <player_name> [phase]
+    python benchmark.py record-crawl <encounter_id> <start_rank> <end_rank> [--phase N]
+    python benchmark.py run [--iterations 3] [--latency-ms 80] [--error-rate 0] [--output results.json]
+"""
+
+import io
+import os
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+
+# Benchmark runs must not mix their numbers into the app's metrics snapshots
+os.environ['LIFEBLOOM_METRICS_DUMP_INTERVAL'] = '0'
+
+import metrics
+from wcl_standin import FIXTURE_DIR, StandInState, start_server, get_server_url, UPSTREAM_API_URL
+
+CASES_FILE = os.path.join(FIXTURE_DIR, 'cases.json')
+
+# Dataset endpoints measured against the web app
+WEB_ENDPOINTS = [
+    '/api/data?dataset={dataset}',
+    '/api/data?dataset={dataset}&format=columnar',
+    '/api/stats?dataset={dataset}',
+    '/api/top/100?dataset={dataset}',
+    '/api/top/100?dataset={dataset}&format=columnar',
+]
+WEB_REQUESTS = 20
+
+
+def load_cases():
+    """Recorded benchmark cases."""
+    if not os.path.exists(CASES_FILE):
+        return {"analyses": [], "crawls": []}
+    with open(CASES_FILE, 'r') as f:
+        return json.load(f)
+
+
+def add_case(kind, case):
+    """Add a recorded case to CASES_FILE (once)."""
+    cases = load_cases()
+    if case not in cases[kind]:
+        cases[kind].append(case)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(CASES_FILE, 'w') as f:
+        json.dump(cases, f, indent=2)
+
+
+def use_standin(server):
+    """Point the API clients at a running stand-in (before they are imported)."""
+    os.environ['WARCRAFTLOGS_API_URL'] = get_server_url(server)
+
+
+def percentile(values, fraction):
+    """Value at a fraction (0-1) of a sorted copy of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize_times(times):
+    """Mean, median, p95 and max of a list of seconds, in milliseconds."""
+    return {
+        "count": len(times),
+        "mean_ms": round(sum(times) / len(times) * 1000, 2),
+        "p50_ms": round(percentile(times, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(times, 0.95) * 1000, 2),
+        "max_ms": round(max(times) * 1000, 2)
+    }
+
+
+def summarize_histogram(histogram):
+    """Count and mean milliseconds per label of a metrics histogram."""
+    summary = {}
+    for key, (_, total, count) in sorted(histogram.values.items()):
+        summary["/".join(key)] = {"count": count, "mean_ms": round(total / count * 1000, 2),
+                                  "total_ms": round(total * 1000, 2)}
+    return summary
+
+
+def record_analysis(report_code, boss_name, player_name, phase=None):
+    """Run one analysis through the recording proxy and save it as a case."""
+    server = start_server(StandInState(upstream=UPSTREAM_API_URL))
+    use_standin(server)
+    from analyze_druid import analyze_druid_performance
+
+    analyze_druid_performance(report_code, boss_name, player_name, phase)
+    server.shutdown()
+
+    add_case("analyses", {"report_code": report_code, "boss_name": boss_name,
+                          "player_name": player_name, "phase": phase})
+    print(f"\n✓ Recorded {server.state.stats['recorded']} responses for {report_code} {boss_name} {player_name}")
+
+
+def record_crawl(encounter_id, start_rank, end_rank, phase=None):
+    """Fetch and analyze a rankings range through the recording proxy and save it as a case."""
+    server = start_server(StandInState(upstream=UPSTREAM_API_URL))
+    use_standin(server)
+    from analyze_top_rankings import fetch_rankings, analyze_ranking
+
+    rankings, encounter_name = fetch_rankings(encounter_id, start_rank, end_rank)
+    for idx, ranking in enumerate(rankings):
+        analyze_ranking(ranking, ranking.get("actual_rank", start_rank + idx), encounter_name, phase)
+    server.shutdown()
+
+    add_case("crawls", {"encounter_id": encounter_id, "start_rank": start_rank,
+                        "end_rank": end_rank, "phase": phase})
+    print(f"\n✓ Recorded {server.state.stats['recorded']} responses for encounter {encounter_id} ranks {start_rank}-{end_rank}")
+
+
+def benchmark_analyses(cases, iterations):
+    """Time every recorded analysis case."""
+    from analyze_druid import analyze_druid_performance
+
+    metrics.reset_metrics()
+    times = []
+    failures = 0
+    for _ in range(iterations):
+        for case in cases:
+            start = time.perf_counter()
+            try:
+                with redirect_stdout(io.StringIO()):
+                    analyze_druid_performance(case["report_code"], case["boss_name"],
+                                              case["player_name"], case["phase"])
+                times.append(time.perf_counter() - start)
+            except Exception as e:
+                failures += 1
+                print(f"  ⚠ {case['report_code']} {case['player_name']}: {e}")
+
+    if not times:
+        return {"failures": failures}
+    return {
+        "wall": summarize_times(times),
+        "analyses_per_second": round(len(times) / sum(times), 3),
+        "failures": failures,
+        "stages": summarize_histogram(metrics.ANALYSIS_STAGE_SECONDS),
+        "queries": summarize_histogram(metrics.WCL_QUERY_SECONDS)
+    }
+
+
+def benchmark_crawls(cases):
+    """Time fetching and analyzing every recorded rankings range."""
+    from analyze_top_rankings import fetch_rankings, analyze_ranking
+
+    metrics.reset_metrics()
+    analyzed = 0
+    failures = 0
+    start = time.perf_counter()
+    for case in cases:
+        with redirect_stdout(io.StringIO()):
+            rankings, encounter_name = fetch_rankings(case["encounter_id"], case["start_rank"], case["end_rank"])
+            for idx, ranking in enumerate(rankings):
+                row = analyze_ranking(ranking, ranking.get("actual_rank", case["start_rank"] + idx),
+                                      encounter_name, case["phase"])
+                analyzed += 1
+                if not row['Date']:
+                    failures += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "rankings_analyzed": analyzed,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "rankings_per_second": round(analyzed / elapsed, 3) if elapsed else 0,
+        "retries": sum(metrics.WCL_RETRIES.values.values())
+    }
+
+
+def benchmark_web(datasets):
+    """Time the dataset endpoints, uncached and from the response cache."""
+    from app import app
+
+    client = app.test_client()
+    results = {}
+    for dataset in datasets:
+        for endpoint in WEB_ENDPOINTS:
+            url = endpoint.format(dataset=dataset)
+            client.get(url)  # Load the dataset into the worker cache
+
+            # A unique extra parameter changes the ETag, so every request misses
+            uncached = []
+            for i in range(WEB_REQUESTS):
+                start = time.perf_counter()
+                client.get(f"{url}&bench={time.time_ns()}{i}", headers={'Accept-Encoding': 'gzip'})
+                uncached.append(time.perf_counter() - start)
+
+            cached = []
+            for _ in range(WEB_REQUESTS):
+                start = time.perf_counter()
+                client.get(url, headers={'Accept-Encoding': 'gzip'})
+                cached.append(time.perf_counter() - start)
+
+            results[url] = {
+                "uncached": summarize_times(uncached),
+                "cached": summarize_times(cached),
+                "uncached_rps": round(len(uncached) / sum(uncached), 1),
+                "cached_rps": round(len(cached) / sum(cached), 1)
+            }
+    return results
+
+
+def print_results(results):
+    """Print benchmark results as tables."""
+    print("\n" + "=" * 80)
+    print("BENCHMARK RESULTS")
+    print("=" * 80)
+
+    analyses = results.get("analyzer")
+    if analyses and "wall" in analyses:
+        wall = analyses["wall"]
+        print(f"\nAnalyzer: {wall['count']} analyses, mean {wall['mean_ms']:.0f} ms, "
+              f"p95 {wall['p95_ms']:.0f} ms, {analyses['analyses_per_second']} analyses/s")
+        print(f"\n  {'Step':<20} {'Count':>6} {'Mean ms':>10} {'Total ms':>12}")
+        for stage, row in analyses["stages"].items():
+            print(f"  {stage:<20} {row['count']:>6} {row['mean_ms']:>10.1f} {row['total_ms']:>12.1f}")
+        print(f"\n  {'Query':<20} {'Count':>6} {'Mean ms':>10} {'Total ms':>12}")
+        for query, row in analyses["queries"].items():
+            print(f"  {query:<20} {row['count']:>6} {row['mean_ms']:>10.1f} {row['total_ms']:>12.1f}")
+
+    crawler = results.get("crawler")
+    if crawler:
+        print(f"\nCrawler: {crawler['rankings_analyzed']} rankings in {crawler['seconds']}s "
+              f"({crawler['rankings_per_second']} rankings/s, {crawler['retries']} retries, {crawler['failures']} failures)")
+
+    web = results.get("web")
+    if web:
+        print(f"\n  {'Endpoint':<55} {'Uncached ms':>12} {'Cached ms':>10} {'Cached rps':>11}")
+        for url, row in web.items():
+            print(f"  {url:<55} {row['uncached']['mean_ms']:>12.2f} {row['cached']['mean_ms']:>10.2f} {row['cached_rps']:>11.1f}")
+
+    standin = results.get("standin")
+    if standin:
+        print(f"\nStand-in: {json.dumps(standin)}")
+
+
+def run_benchmark(args):
+    """Run every benchmark section against a serving stand-in."""
+    state = StandInState(args.latency_ms, args.jitter_ms, args.limit_per_hour,
+                         args.points_per_query, args.error_rate, args.seed)
+    server = start_server(state)
+    use_standin(server)
+    # The stand-in ignores the token, so skip the OAuth flow
+    os.environ['WARCRAFTLOGS_TOKEN_JSON'] = json.dumps({"access_token": "standin"})
+
+    cases = load_cases()
+    results = {"settings": vars(args)}
+
+    if cases["analyses"]:
+        print(f"Benchmarking {len(cases['analyses'])} analyses x {args.iterations}...")
+        results["analyzer"] = benchmark_analyses(cases["analyses"], args.iterations)
+    else:
+        print(f"⚠ No recorded analyses in {CASES_FILE} (see record-analysis)")
+
+    if cases["crawls"]:
+        print(f"Benchmarking {len(cases['crawls'])} crawls...")
+        results["crawler"] = benchmark_crawls(cases["crawls"])
+    else:
+        print(f"⚠ No recorded crawls in {CASES_FILE} (see record-crawl)")
+
+    print(f"Benchmarking web endpoints ({', '.join(args.datasets)})...")
+    results["web"] = benchmark_web(args.datasets)
+
+    server.shutdown()
+    results["standin"] = state.stats
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}")
+    return 0
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Offline benchmark against the WarcraftLogs stand-in")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_analysis_parser = subparsers.add_parser("record-analysis", help="Record one analysis from the real API")
+    record_analysis_parser.add_argument("report_code")
+    record_analysis_parser.add_argument("boss_name")
+    record_analysis_parser.add_argument("player_name")
+    record_analysis_parser.add_argument("phase", type=int, nargs="?")
+
+    record_crawl_parser = subparsers.add_parser("record-crawl", help="Record a rankings crawl from the real API")
+    record_crawl_parser.add_argument("encounter_id", type=int)
+    record_crawl_parser.add_argument("start_rank", type=int)
+    record_crawl_parser.add_argument("end_rank", type=int)
+    record_crawl_parser.add_argument("--phase", type=int, choices=[1, 2])
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark against the recorded fixtures")
+    run_parser.add_argument("--iterations", type=int, default=3)
+    run_parser.add_argument("--latency-ms", type=float, default=80)
+    run_parser.add_argument("--jitter-ms", type=float, default=20)
+    run_parser.add_argument("--limit-per-hour", type=int, default=3600)
+    run_parser.add_argument("--points-per-query", type=float, default=1.0)
+    run_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of queries answered with 429")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--datasets", nargs="+", default=["brutallus"])
+    run_parser.add_argument("--output", help="Save the results as JSON")
+
+    args = parser.parse_args()
+
+    if args.command == "record-analysis":
+        record_analysis(args.report_code, args.boss_name, args.player_name, args.phase)
+        return 0
+    if args.command == "record-crawl":
+        record_crawl(args.encounter_id, args.start_rank, args.end_rank, args.phase)
+        return 0
+    return run_benchmark(args)
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,129 @@
+"""
+Compact Cast Timeline and Rotation Sections
+
+The cast timeline of a 10-minute fight holds a few thousand casts. As dicts,
+every cast repeated eleven keys plus the spell, target and active-tank names,
+both in memory and in the /api/analyze-report JSON. Here each cast is a
+slotted dataclass whose spell, target, active tank and event type are small
+integers into one per-analysis names table (CastTimeline.names).
+
+to_payload() turns a timeline (or a list of RotationSection) into the same
+columnar layout the dataset endpoints use (see api_format.py), with the names
+table sent once:
+
+    {
+        "columns": ["time", "spell", "target", ...],
+        "length": 2350,
+        "values": {"time": [0.0, 1.52, ...], "spell": [0, 0, 3, ...], ...},
+        "dictionaries": {},
+        "names": ["Lifebloom", "Tankname", "cast", ...],
+        "name_columns": ["spell", "target", "active_tank", "type"]
+    }
+
+Columns listed in "name_columns" hold indices into "names".
+"""
+
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True)
+class Cast:
+    """One row of the cast timeline (spell/target/active_tank/type index CastTimeline.names)."""
+
+    time: float
+    spell: int
+    target: int
+    active_tank: int
+    type: int
+    ability_id: int
+    rotation_start: bool
+    lifebloom_tank: bool
+    instant_cast: bool
+    regrowth: bool
+    rotation_number: int | None
+
+
+@dataclass(slots=True)
+class RotationSection:
+    """A run of casts between rotation boundaries, with its LB/I/RG counts."""
+
+    type: str
+    start_time: float
+    end_time: float
+    lb: int
+    i: int
+    rg: int
+
+    @property
+    def notation(self):
+        return f"[{self.lb}LB {self.i}I {self.rg}RG]"
+
+
+CAST_COLUMNS = [f.name for f in fields(Cast)]
+SECTION_COLUMNS = [f.name for f in fields(RotationSection)]
+NAME_COLUMNS = ['spell', 'target', 'active_tank', 'type']
+
+
+class CastTimeline:
+    """The casts of one analysis plus the names table their string fields point into."""
+
+    __slots__ = ('names', 'casts', '_name_ids')
+
+    def __init__(self):
+        self.names = []
+        self.casts = []
+        self._name_ids = {}
+
+    def intern(self, name):
+        """Index of a name in the names table (added on first use)."""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def name(self, name_id):
+        """The string behind an interned index."""
+        return self.names[name_id]
+
+    def add(self, time, spell, target, active_tank, event_type, ability_id,
+            rotation_start, lifebloom_tank, instant_cast, regrowth, rotation_number):
+        """Append a cast; spell, target, active_tank and event_type are strings."""
+        self.casts.append(Cast(
+            time, self.intern(spell), self.intern(target), self.intern(active_tank), self.intern(event_type),
+            ability_id, rotation_start, lifebloom_tank, instant_cast, regrowth, rotation_number
+        ))
+
+    def sort(self):
+        """Order the casts by time (stable)."""
+        self.casts.sort(key=lambda cast: cast.time)
+
+    def __len__(self):
+        return len(self.casts)
+
+    def __iter__(self):
+        return iter(self.casts)
+
+    def __getitem__(self, index):
+        return self.casts[index]
+
+    def to_payload(self):
+        """The timeline as a columnar table with the names table sent once."""
+        return {
+            "columns": CAST_COLUMNS,
+            "length": len(self.casts),
+            "values": {col: [getattr(cast, col) for cast in self.casts] for col in CAST_COLUMNS},
+            "dictionaries": {},
+            "names": self.names,
+            "name_columns": NAME_COLUMNS
+        }
+
+
+def sections_to_payload(sections):
+    """A list of RotationSection as a columnar table."""
+    return {
+        "columns": SECTION_COLUMNS,
+        "length": len(sections),
+        "values": {col: [getattr(section, col) for section in sections] for col in SECTION_COLUMNS},
+        "dictionaries": {}
+    }
@@ -0,0 +1,207 @@
+"""
+Crawl Cost Planner
+
+Estimates how many WarcraftLogs API points and how much wall-clock time a
+rankings crawl will take before it is launched, using cost samples measured
+during previous crawls.
+
+Samples are appended to CRAWL_HISTORY_FILE by analyze_top_rankings.py at
+every rate-limit check: (analyses completed, points spent, seconds elapsed).
+
+Cache hits are not modelled: the crawler analyzes every new report over the
+network (it doesn't replay the event archive or reuse another dataset's
+requests), so each report to analyze is charged the full per-analysis cost.
+
+Usage:
+    python analyze_top_rankings.py 725 1 2000 data/t6/brutallus.csv --plan
+"""
+
+import os
+import json
+import math
+import statistics
+from datetime import datetime, timedelta
+
+CRAWL_HISTORY_FILE = ".crawl_history.json"
+MAX_HISTORY_SAMPLES = 500
+
+# Fallback estimates used until a crawl has been measured
+DEFAULT_POINTS_PER_ANALYSIS = 10.0
+DEFAULT_SECONDS_PER_ANALYSIS = 20.0
+DEFAULT_POINTS_PER_RANKINGS_PAGE = 1.0
+
+# Crawlers pause at this fraction of the hourly limit (see HIGH_USAGE_THRESHOLD)
+USABLE_BUDGET_FRACTION = 0.90
+RATE_LIMIT_WINDOW_SECONDS = 3600
+
+
+def load_history():
+    """Load recorded crawl cost samples."""
+    if not os.path.exists(CRAWL_HISTORY_FILE):
+        return []
+    try:
+        with open(CRAWL_HISTORY_FILE, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return []
+
+
+def record_crawl_sample(encounter_id, phase, analyses, points, seconds):
+    """
+    Append a measured cost sample to the crawl history.
+
+    Samples spanning an hourly reset (negative point deltas) are discarded,
+    since the spend before the reset is unknown.
+
+    Args:
+        encounter_id: Encounter being crawled
+        phase: Phase being crawled (None for full fight)
+        analyses: Number of analyze_druid_performance runs in the sample
+        points: Points spent during the sample
+        seconds: Wall-clock seconds elapsed during the sample
+    """
+    if analyses <= 0 or points < 0:
+        return
+
+    history = load_history()
+    history.append({
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "encounter_id": encounter_id,
+        "phase": phase,
+        "analyses": analyses,
+        "points": points,
+        "seconds": round(seconds, 1)
+    })
+    history = history[-MAX_HISTORY_SAMPLES:]
+
+    with open(CRAWL_HISTORY_FILE, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def estimate_analysis_cost(encounter_id, phase, history=None):
+    """
+    Estimate points and seconds for one analysis from measured history.
+
+    Prefers samples from the same encounter/phase, then any sample, then the
+    defaults. Uses the median so one slow, retry-heavy batch doesn't skew it.
+
+    Returns:
+        dict with keys: points, seconds, samples, source
+    """
+    if history is None:
+        history = load_history()
+
+    matching = [s for s in history if s.get("encounter_id") == encounter_id and s.get("phase") == phase]
+    samples = matching or history
+    if not samples:
+        return {
+            "points": DEFAULT_POINTS_PER_ANALYSIS,
+            "seconds": DEFAULT_SECONDS_PER_ANALYSIS,
+            "samples": 0,
+            "source": "default"
+        }
+
+    return {
+        "points": statistics.median(s["points"] / s["analyses"] for s in samples),
+        "seconds": statistics.median(s["seconds"] / s["analyses"] for s in samples),
+        "samples": len(samples),
+        "source": "encounter history" if matching else "global history"
+    }
+
+
+def plan_crawl(rankings, existing_report_ids, analysis_cost):
+    """
+    Enumerate the work a crawl would do without analyzing anything.
+
+    Mirrors the skip rules of analyze_top_rankings.main(): a report already in
+    the output file, or already analyzed earlier in the same run (multiple
+    druids in one report), is skipped.
+
+    Returns:
+        dict describing the work items and their projected cost
+    """
+    seen_reports = set(existing_report_ids)
+    already_present = 0
+    multi_druid = 0
+    to_analyze = 0
+
+    for ranking in rankings:
+        report_code = ranking.get("report", {}).get("code", "Unknown")
+        if report_code in existing_report_ids:
+            already_present += 1
+            continue
+        if report_code in seen_reports:
+            multi_druid += 1
+            continue
+        seen_reports.add(report_code)
+        to_analyze += 1
+
+    return {
+        "rankings": len(rankings),
+        "already_present": already_present,
+        "multi_druid": multi_druid,
+        "to_analyze": to_analyze,
+        "points": to_analyze * analysis_cost["points"],
+        "seconds": to_analyze * analysis_cost["seconds"]
+    }
+
+
+def project_runtime(total_points, compute_seconds, rate_status):
+    """
+    Project wall-clock runtime of a crawl against the hourly points budget.
+
+    The crawler pauses once USABLE_BUDGET_FRACTION of the limit is spent, so
+    each reset window contributes at most that many points.
+
+    Returns:
+        dict with keys: windows, fits_current_window, runtime_seconds
+    """
+    limit = rate_status['limitPerHour']
+    window_budget = limit * USABLE_BUDGET_FRACTION
+    current_budget = max(0, window_budget - rate_status['pointsSpentThisHour'])
+
+    if total_points <= current_budget:
+        return {"windows": 1, "fits_current_window": True, "runtime_seconds": compute_seconds}
+
+    remaining = total_points - current_budget
+    extra_windows = math.ceil(remaining / window_budget) if window_budget > 0 else 0
+    rate_bound_seconds = rate_status['pointsResetIn'] + (extra_windows - 1) * RATE_LIMIT_WINDOW_SECONDS
+    return {
+        "windows": 1 + extra_windows,
+        "fits_current_window": False,
+        "runtime_seconds": max(compute_seconds, rate_bound_seconds)
+    }
+
+
+def format_duration(seconds):
+    """Format seconds as 'Xh Ym'."""
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def print_crawl_plan(plan, analysis_cost, rankings_pages, page_points, rate_status):
+    """Print a crawl plan with projected points and runtime."""
+    total_points = plan["points"] + rankings_pages * page_points
+    projection = project_runtime(total_points, plan["seconds"], rate_status)
+    finish_time = datetime.now() + timedelta(seconds=projection["runtime_seconds"])
+
+    print("=" * 80)
+    print("CRAWL PLAN (dry run - nothing analyzed)")
+    print("=" * 80)
+    print(f"Rankings pages:             {rankings_pages} (~{page_points:.1f} points each)")
+    print(f"Rankings returned:          {plan['rankings']}")
+    print(f"Already present (skipped):  {plan['already_present']}")
+    print(f"Shared report (skipped):    {plan['multi_druid']} (multiple druids in one report)")
+    print(f"Reports to analyze:         {plan['to_analyze']} (no cache hits modelled, each charged in full)")
+    print()
+    print(f"Cost per analysis:          {analysis_cost['points']:.1f} points, {analysis_cost['seconds']:.1f}s "
+          f"({analysis_cost['source']}, {analysis_cost['samples']} samples)")
+    print(f"Projected points:           {total_points:,.0f}")
+    print()
+    print(f"Rate limit:                 {rate_status['pointsSpentThisHour']}/{rate_status['limitPerHour']} points used, "
+          f"resets in {rate_status['pointsResetIn']}s")
+    print(f"Fits in current window:     {'Yes' if projection['fits_current_window'] else 'No'}")
+    print(f"Reset windows needed:       {projection['windows']}")
+    print(f"Projected runtime:          {format_duration(projection['runtime_seconds'])} "
+          f"(finishing ~{finish_time.strftime('%Y-%m-%d %H:%M')})")
+    print("=" * 80)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Typed Columnar Storage for the data/t6 Datasets
+
+Each dataset CSV can have an Arrow IPC sibling (brutallus.csv -> brutallus.arrow)
+written with explicit dtypes and dictionary-encoded string columns. The web app
+reads the Arrow file through a memory map when it is at least as new as the
+CSV, and falls back to parsing the CSV otherwise. CSV remains the export format
+written by the crawlers.
+
+Usage:
+    python dataset_store.py                 # convert every registered dataset
+    python dataset_store.py <csv_file> ...  # convert specific CSV files
+"""
+
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+from datasets import DATASETS_BEST, DATASETS_ALL
+
+COLUMNAR_EXTENSION = ".arrow"
+
+# Explicit dtypes per dataset column. "int" columns fall back to float64 if a
+# value is missing, "category" columns are dictionary-encoded on disk.
+COLUMN_DTYPES = {
+    'Rank': 'int',
+    'Name': 'string',
+    'Server': 'category',
+    'Region': 'category',
+    'Date': 'string',
+    'Duration': 'string',
+    'ReportID': 'string',
+    'ReportLink': 'string',
+    'HPS': 'float',
+    'HasteSummary': 'int',
+    'HasteGear': 'int',
+    'Spirit': 'int',
+    'Intellect': 'int',
+    'TotalHealers': 'int',
+    'nDruid': 'int',
+    'nPaladin': 'int',
+    'nHPriest': 'int',
+    'nDPriest': 'int',
+    'nShaman': 'int',
+    'RaidDamageTakenPerSecond': 'float',
+    'VampiricTouch': 'category',
+    'InnervateCount': 'int',
+    'Bloodlust': 'category',
+    'NaturesGrace': 'category',
+    'Trinket1': 'category',
+    'Trinket2': 'category',
+    'LifebloomUptime': 'float',
+    'LifebloomTankUptime': 'float',
+    'LifebloomStack3Percent': 'float',
+    'LifebloomHPS': 'float',
+    'LifebloomPercentHPS': 'float',
+    'RejuvenationHPS': 'float',
+    'RejuvenationPercentHPS': 'float',
+    'RegrowthHPS': 'float',
+    'RegrowthPercentHPS': 'float',
+    'Rotation1': 'category',
+    'Rotation1Percent': 'float',
+    'Rotation2': 'category',
+    'Rotation2Percent': 'float',
+    'TankRotationPercent': 'float',
+    'RotatingOnTank': 'category',
+    'ActiveTimePercent': 'float',
+    'CastsPerMinute': 'float',
+    'IdleGapCount': 'int',
+    'IdleGapSeconds': 'float',
+    'EstimatedLatencyMs': 'int',
+    'TimeToOOM': 'float',
+    'HealingPerMana': 'float',
+    'ManaFromInnervate': 'int',
+    'ManaFromVampiricTouch': 'int',
+    'ManaFromPotions': 'int',
+    'ManaFromRunes': 'int'
+}
+
+
+def get_columnar_path(csv_path):
+    """Return the Arrow IPC path that sits next to a dataset CSV."""
+    return os.path.splitext(csv_path)[0] + COLUMNAR_EXTENSION
+
+
+def apply_column_dtypes(df):
+    """
+    Convert a freshly parsed dataset DataFrame to the explicit column dtypes.
+
+    Unknown columns are left as parsed so older or newer CSV layouts still load.
+    """
+    for col, kind in COLUMN_DTYPES.items():
+        if col not in df.columns:
+            continue
+
+        if kind in ('int', 'float'):
+            values = pd.to_numeric(df[col], errors='coerce')
+            if kind == 'int' and not values.isna().any():
+                values = values.astype('int32')
+            else:
+                values = values.astype('float64')
+            df[col] = values
+        elif kind == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            df[col] = df[col].astype(object)
+
+    return df
+
+
+def read_csv_dataset(csv_path):
+    """Parse a dataset CSV and apply the explicit column dtypes."""
+    return apply_column_dtypes(pd.read_csv(csv_path))
+
+
+def write_columnar(csv_path):
+    """
+    Write the Arrow IPC copy of a dataset CSV.
+
+    The file is uncompressed so readers can memory-map it, and it is written to
+    a temporary path first so a worker never maps a half-written file.
+
+    Returns:
+        Path of the Arrow file
+    """
+    df = read_csv_dataset(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    arrow_path = get_columnar_path(csv_path)
+    tmp_path = f"{arrow_path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+    return arrow_path
+
+
+def read_columnar(arrow_path):
+    """Read an Arrow IPC dataset through a memory map."""
+    with pa.memory_map(arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def read_dataset(csv_path):
+    """
+    Load a dataset, preferring its Arrow IPC copy when it is up to date.
+
+    Args:
+        csv_path: Path of the dataset CSV (the Arrow path is derived from it)
+
+    Returns:
+        DataFrame, or None if neither file exists
+    """
+    arrow_path = get_columnar_path(csv_path)
+    csv_exists = os.path.exists(csv_path)
+
+    if os.path.exists(arrow_path):
+        if not csv_exists or os.path.getmtime(arrow_path) >= os.path.getmtime(csv_path):
+            return read_columnar(arrow_path)
+
+    if csv_exists:
+        return read_csv_dataset(csv_path)
+    return None
+
+
+def to_json_records(df):
+    """
+    Convert a dataset DataFrame to JSON-ready records with NaN replaced by None.
+
+    Categorical columns keep NaN through DataFrame.where, so they are widened to
+    object first.
+    """
+    categorical_cols = df.select_dtypes('category').columns
+    if len(categorical_cols):
+        df = df.astype({col: object for col in categorical_cols})
+    return df.where(pd.notna(df), None).to_dict(orient='records')
+
+
+def main():
+    """Convert dataset CSVs to Arrow IPC."""
+    csv_paths = sys.argv[1:] or sorted(set(DATASETS_BEST.values()) | set(DATASETS_ALL.values()))
+
+    for csv_path in csv_paths:
+        if not os.path.exists(csv_path):
+            print(f"  Skipping {csv_path} (not found)")
+            continue
+        arrow_path = write_columnar(csv_path)
+        print(f"✓ {csv_path} -> {arrow_path} ({os.path.getsize(arrow_path):,} bytes)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
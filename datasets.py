@@ -0,0 +1,129 @@
+"""
+Dataset Registry for the data/t6 Datasets
+
+Single source of truth for which datasets exist, where they live on disk,
+which encounter/phase they were crawled from, and the CSV column layout
+shared by the crawlers and the web app.
+
+Usage:
+    from datasets import DATASETS_BEST, DATASETS_ALL, DATASET_ENCOUNTERS, CSV_FIELDNAMES
+"""
+
+# Available datasets - best report per player
+DATASETS_BEST = {
+    'brutallus': 'data/t6/brutallus.csv',
+    'felmyst': 'data/t6/felmyst.csv',
+    'eredar_twins_p1': 'data/t6/eredar_twins_p1.csv',
+    'eredar_twins_p2': 'data/t6/eredar_twins_p2.csv',
+    'muru_p1': 'data/t6/muru_p1.csv',
+    'muru_p2': 'data/t6/muru_p2.csv',
+    'kiljaeden': 'data/t6/kiljaeden.csv'
+}
+
+# Available datasets - all reports per player
+DATASETS_ALL = {
+    'brutallus': 'data/t6/brutallus_all_reports.csv',
+    'felmyst': 'data/t6/felmyst_all_reports.csv',
+    'eredar_twins_p1': 'data/t6/eredar_twins_all_reports_p1.csv',
+    'eredar_twins_p2': 'data/t6/eredar_twins_all_reports_p2.csv',
+    'muru_p1': 'data/t6/muru_all_reports_p1.csv',
+    'muru_p2': 'data/t6/muru_all_reports_p2.csv',
+    'kiljaeden': 'data/t6/kiljaeden_all_reports.csv'
+}
+
+# WarcraftLogs encounter ID and phase (None = full fight) behind each dataset
+DATASET_ENCOUNTERS = {
+    'brutallus': {'encounter_id': 725, 'phase': None},
+    'felmyst': {'encounter_id': 726, 'phase': None},
+    'eredar_twins_p1': {'encounter_id': 727, 'phase': 1},
+    'eredar_twins_p2': {'encounter_id': 727, 'phase': 2},
+    'muru_p1': {'encounter_id': 728, 'phase': 1},
+    'muru_p2': {'encounter_id': 728, 'phase': 2},
+    'kiljaeden': {'encounter_id': 729, 'phase': None}
+}
+
+# CSV columns written by analyze_top_rankings.py and fetch_all_reports.py
+CSV_FIELDNAMES = [
+    'Rank', 'Name', 'Server', 'Region', 'Date', 'Duration', 'ReportID', 'ReportLink', 'HPS',
+    'HasteSummary', 'HasteGear', 'Spirit', 'Intellect', 'TotalHealers',
+    'nDruid', 'nPaladin', 'nHPriest', 'nDPriest', 'nShaman',
+    'RaidDamageTakenPerSecond',
+    'VampiricTouch', 'InnervateCount', 'Bloodlust', 'NaturesGrace',
+    'Trinket1', 'Trinket2',
+    'LifebloomUptime', 'LifebloomTankUptime', 'LifebloomStack3Percent', 'LifebloomHPS', 'LifebloomPercentHPS',
+    'RejuvenationHPS', 'RejuvenationPercentHPS',
+    'RegrowthHPS', 'RegrowthPercentHPS',
+    'Rotation1', 'Rotation1Percent', 'Rotation2', 'Rotation2Percent',
+    'TankRotationPercent', 'RotatingOnTank',
+    'ActiveTimePercent', 'CastsPerMinute', 'IdleGapCount', 'IdleGapSeconds', 'EstimatedLatencyMs',
+    'TimeToOOM', 'HealingPerMana',
+    'ManaFromInnervate', 'ManaFromVampiricTouch', 'ManaFromPotions', 'ManaFromRunes'
+]
+
+# Per-spec healer datasets written by raid_healers.py: spec -> file suffix
+HEALER_SPEC_DATASETS = {
+    'Holy Paladin': 'holy_paladin',
+    'Holy Priest': 'holy_priest',
+    'Discipline Priest': 'discipline_priest',
+    'Restoration Druid': 'restoration_druid',
+    'Restoration Shaman': 'restoration_shaman'
+}
+HEALER_DATASET_DIR = 'data/t6/healers'
+
+# CSV columns of the per-spec healer datasets
+HEALER_CSV_FIELDNAMES = [
+    'Rank', 'Name', 'Spec', 'Date', 'Duration', 'ReportID', 'FightID', 'ReportLink', 'HPS',
+    'OverhealPercent', 'HasteSummary', 'HasteGear', 'GCD', 'Casts', 'CastsPerMinute', 'TotalHealers',
+    'Spell1', 'Spell1HPS', 'Spell1PercentHPS', 'Spell2', 'Spell2HPS', 'Spell2PercentHPS',
+    'Spell3', 'Spell3HPS', 'Spell3PercentHPS',
+    'Cast1', 'Cast1Percent', 'Cast2', 'Cast2Percent', 'Cast3', 'Cast3Percent'
+]
+
+
+def get_dataset_path(dataset, data_source='best'):
+    """
+    Resolve the on-disk path for a dataset.
+
+    Args:
+        dataset: The boss/encounter name (e.g., 'brutallus', 'muru_p1')
+        data_source: 'best' for best report per player, 'all' for all reports
+
+    Returns:
+        Path string, or None if the dataset is unknown
+    """
+    datasets = DATASETS_ALL if data_source == 'all' else DATASETS_BEST
+    return datasets.get(dataset)
+
+
+def get_healer_dataset_path(dataset, spec):
+    """
+    Resolve the on-disk path for a per-spec healer dataset.
+
+    Args:
+        dataset: The boss/encounter name (e.g., 'brutallus', 'muru_p1')
+        spec: Healing spec name (a HEALER_SPEC_DATASETS key)
+
+    Returns:
+        Path string, or None if the dataset or spec is unknown
+    """
+    if dataset not in DATASET_ENCOUNTERS or spec not in HEALER_SPEC_DATASETS:
+        return None
+    return f"{HEALER_DATASET_DIR}/{dataset}_{HEALER_SPEC_DATASETS[spec]}.csv"
+
+
+def publish_dataset(csv_path):
+    """
+    Refresh the derived copies of a dataset after its CSV was saved.
+
+    Writes the typed Arrow copy read by the web app and re-syncs the SQLite
+    copy (if that database exists).
+
+    Args:
+        csv_path: Path of the dataset CSV that was just written
+    """
+    # Imported here so the crawler CLIs don't load pandas/pyarrow until the first save
+    from dataset_store import write_columnar
+    from db_backend import sync_dataset_file
+
+    write_columnar(csv_path)
+    sync_dataset_file(csv_path)
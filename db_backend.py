@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Embedded SQLite Backend for the Dataset API
+
+Optional alternative to holding a pandas copy of every dataset in each web
+worker. All datasets live in one SQLite file with indexes on the filter
+columns, and /api/data, /api/stats and /api/top compile their filters to SQL.
+
+The backend is opt-in:
+  - `python db_backend.py init` creates the database from the dataset CSVs
+  - once the file exists, the crawlers re-sync a dataset after every save
+  - the web app uses it when LIFEBLOOM_BACKEND=sqlite
+
+A database created before new dataset columns were added is migrated in
+place: create_schema() adds the missing columns. Each dataset remembers which
+columns its CSV had, and queries return only those, so the SQL path returns
+the same keys as the pandas path.
+
+Usage:
+    python db_backend.py init     # (re)build the database from every dataset CSV
+    python db_backend.py status   # show row counts per dataset
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from datasets import DATASETS_BEST, DATASETS_ALL, CSV_FIELDNAMES
+from dataset_store import read_csv_dataset, COLUMN_DTYPES
+
+DATABASE_PATH = os.environ.get('LIFEBLOOM_DB', 'data/t6/lifebloom.db')
+ROWS_TABLE = 'dataset_rows'
+VERSIONS_TABLE = 'dataset_versions'
+
+# Columns the /api/top filters compare against, each indexed per dataset
+INDEXED_COLUMNS = [
+    'HPS', 'Region', 'TotalHealers', 'nDruid', 'nPaladin', 'nHPriest', 'nDPriest', 'nShaman',
+    'NaturesGrace', 'VampiricTouch', 'InnervateCount', 'RotatingOnTank'
+]
+
+SQL_TYPES = {'int': 'INTEGER', 'float': 'REAL'}
+SQL_OPERATORS = {'>': '>', '==': '='}
+
+_local = threading.local()
+
+
+_migrate_lock = threading.Lock()
+_migrated = False
+
+
+def get_connection():
+    """
+    Return this thread's read-only connection to the database.
+
+    Raises if the database hasn't been created, instead of letting SQLite
+    create an empty one that would answer every request with "no data".
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        if not database_exists():
+            raise Exception(f"{DATABASE_PATH} does not exist. Run: python db_backend.py init")
+        migrate_database()
+        conn = sqlite3.connect(f"file:{DATABASE_PATH}?mode=ro", uri=True)
+        _local.conn = conn
+    return conn
+
+
+def migrate_database():
+    """Bring an existing database's schema up to date, once per process."""
+    global _migrated
+    with _migrate_lock:
+        if _migrated or not database_exists():
+            return
+        conn = sqlite3.connect(DATABASE_PATH)
+        try:
+            with conn:
+                create_schema(conn)
+        except sqlite3.OperationalError as e:
+            # Read-only deployments keep working on the old schema (see get_synced_columns)
+            print(f"⚠ Could not migrate {DATABASE_PATH}: {e}")
+        finally:
+            conn.close()
+        _migrated = True
+
+
+def database_exists():
+    """Whether the optional database has been created."""
+    return os.path.exists(DATABASE_PATH)
+
+
+def quote(column):
+    """Quote a column name for SQL."""
+    return f'"{column}"'
+
+
+def create_schema(conn):
+    """Create the rows/versions tables and the filter-column indexes."""
+    columns = ", ".join(
+        f"{quote(col)} {SQL_TYPES.get(COLUMN_DTYPES.get(col), 'TEXT')}"
+        for col in CSV_FIELDNAMES
+    )
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROWS_TABLE} (
+            dataset TEXT NOT NULL,
+            source TEXT NOT NULL,
+            row_order INTEGER NOT NULL,
+            {columns}
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+            dataset TEXT NOT NULL,
+            source TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            synced_at TEXT NOT NULL,
+            columns TEXT,
+            version INTEGER,
+            PRIMARY KEY (dataset, source)
+        )
+    """)
+
+    # Databases created before a column was added get it now (NULL for existing rows)
+    add_missing_columns(conn, ROWS_TABLE, {
+        col: SQL_TYPES.get(COLUMN_DTYPES.get(col), 'TEXT') for col in CSV_FIELDNAMES
+    })
+    add_missing_columns(conn, VERSIONS_TABLE, {'columns': 'TEXT', 'version': 'INTEGER'})
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_rows_order ON {ROWS_TABLE} (dataset, source, row_order)")
+    for col in INDEXED_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_rows_{col} ON {ROWS_TABLE} (dataset, source, {quote(col)})")
+
+
+def add_missing_columns(conn, table, column_types):
+    """
+    ALTER TABLE ... ADD COLUMN for every column a table doesn't have yet.
+
+    Args:
+        conn: Writable connection
+        table: Table name
+        column_types: Dict of column name -> SQL type, in the order to add them
+    """
+    existing = get_table_columns(conn, table)
+    for col, sql_type in column_types.items():
+        if col not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {quote(col)} {sql_type}")
+
+
+def sync_dataset(conn, dataset, data_source, csv_path):
+    """
+    Replace one dataset's rows with the contents of its CSV.
+
+    Rows keep their CSV order in row_order so SQL results come back in the
+    same order as the pandas path.
+
+    Returns:
+        Number of rows written
+    """
+    df = read_csv_dataset(csv_path)
+    columns = [col for col in CSV_FIELDNAMES if col in df.columns]
+    records = df[columns].astype(object).where(df[columns].notna(), None).itertuples(index=False, name=None)
+
+    placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+    column_sql = ", ".join(["dataset", "source", "row_order"] + [quote(col) for col in columns])
+
+    with conn:
+        conn.execute(f"DELETE FROM {ROWS_TABLE} WHERE dataset = ? AND source = ?", (dataset, data_source))
+        conn.executemany(
+            f"INSERT INTO {ROWS_TABLE} ({column_sql}) VALUES ({placeholders})",
+            ((dataset, data_source, i) + record for i, record in enumerate(records))
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {VERSIONS_TABLE} (dataset, source, row_count, synced_at, columns, version) "
+            f"VALUES (?, ?, ?, ?, ?, ?)",
+            (dataset, data_source, len(df), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ",".join(columns),
+             time.time_ns())
+        )
+
+    return len(df)
+
+
+def sync_dataset_file(csv_path):
+    """
+    Re-sync the database copy of a dataset after a crawler saved its CSV.
+
+    Does nothing unless the database exists or the path isn't a registered dataset.
+    """
+    if not database_exists():
+        return
+
+    csv_path = os.path.normpath(csv_path)
+    for data_source, datasets in (('best', DATASETS_BEST), ('all', DATASETS_ALL)):
+        for dataset, path in datasets.items():
+            if os.path.normpath(path) == csv_path:
+                conn = sqlite3.connect(DATABASE_PATH)
+                try:
+                    create_schema(conn)
+                    sync_dataset(conn, dataset, data_source, csv_path)
+                finally:
+                    conn.close()
+                return
+
+
+def resolve_source(conn, dataset, data_source):
+    """
+    Pick the source to query, falling back to 'best' when 'all' is missing.
+
+    Returns:
+        'best', 'all', or None if the dataset isn't in the database
+    """
+    sources = [data_source, 'best'] if data_source == 'all' else [data_source]
+    for source in sources:
+        row = conn.execute(
+            f"SELECT 1 FROM {VERSIONS_TABLE} WHERE dataset = ? AND source = ?", (dataset, source)
+        ).fetchone()
+        if row:
+            return source
+    return None
+
+
+def get_dataset_version(dataset, data_source):
+    """
+    Version of a dataset's database copy, changing on every sync.
+
+    The web app uses it as the ETag version with the SQLite backend, so the
+    response cache follows the rows it actually serves instead of the CSV.
+
+    Returns:
+        Version string, or None if the dataset isn't in the database
+    """
+    conn = get_connection()
+    source = resolve_source(conn, dataset, data_source)
+    if source is None:
+        return None
+
+    # Databases that couldn't be migrated have no version column; synced_at still changes per sync
+    version_sql = "version" if 'version' in get_table_columns(conn, VERSIONS_TABLE) else "NULL"
+    version, synced_at, row_count = conn.execute(
+        f"SELECT {version_sql}, synced_at, row_count FROM {VERSIONS_TABLE} WHERE dataset = ? AND source = ?",
+        (dataset, source)
+    ).fetchone()
+    return f"{source}:{version or synced_at}:{row_count}"
+
+
+def get_table_columns(conn, table):
+    """Names of a table's columns."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def get_synced_columns(conn, dataset, source):
+    """
+    The dataset columns a synced CSV had, in CSV_FIELDNAMES order.
+
+    Datasets synced before the columns were recorded fall back to the columns
+    holding at least one value.
+    """
+    table_columns = get_table_columns(conn, ROWS_TABLE)
+    candidates = [col for col in CSV_FIELDNAMES if col in table_columns]
+
+    if 'columns' in get_table_columns(conn, VERSIONS_TABLE):
+        row = conn.execute(
+            f"SELECT columns FROM {VERSIONS_TABLE} WHERE dataset = ? AND source = ?", (dataset, source)
+        ).fetchone()
+        if row and row[0]:
+            synced = set(row[0].split(","))
+            return [col for col in candidates if col in synced]
+
+    counts = conn.execute(
+        f"SELECT {', '.join(f'COUNT({quote(col)})' for col in candidates)} "
+        f"FROM {ROWS_TABLE} WHERE dataset = ? AND source = ?", (dataset, source)
+    ).fetchone()
+    return [col for col, count in zip(candidates, counts) if count]
+
+
+def compile_filters(filters):
+    """
+    Compile parsed /api/top filters to a SQL WHERE fragment.
+
+    Args:
+        filters: List of (column, op, value) tuples from app.parse_top_filters
+
+    Returns:
+        Tuple of (sql, params)
+    """
+    clauses = []
+    params = []
+    for column, op, value in filters:
+        if op == 'in':
+            clauses.append(f"{quote(column)} IN ({', '.join('?' for _ in value)})")
+            params.extend(value)
+        else:
+            clauses.append(f"{quote(column)} {SQL_OPERATORS[op]} ?")
+            params.append(value)
+    return " AND ".join(clauses), params
+
+
+def fetch_records(cursor):
+    """Turn a cursor's rows into dicts keyed by column name."""
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def query_all(dataset, data_source):
+    """SQL equivalent of /api/data. Returns a list of records or None."""
+    conn = get_connection()
+    source = resolve_source(conn, dataset, data_source)
+    if source is None:
+        return None
+
+    column_sql = ", ".join(quote(col) for col in get_synced_columns(conn, dataset, source))
+    cursor = conn.execute(
+        f"SELECT {column_sql} FROM {ROWS_TABLE} WHERE dataset = ? AND source = ? ORDER BY row_order",
+        (dataset, source)
+    )
+    return fetch_records(cursor)
+
+
+def query_stats(dataset, data_source):
+    """SQL equivalent of /api/stats. Returns the stats dict or None."""
+    conn = get_connection()
+    source = resolve_source(conn, dataset, data_source)
+    if source is None:
+        return None
+
+    row = conn.execute(f"""
+        SELECT COUNT(*), AVG("HPS"), MAX("HPS"), MIN("HPS"),
+               AVG("HasteGear"), AVG("Spirit"), AVG("Intellect")
+        FROM {ROWS_TABLE} WHERE dataset = ? AND source = ?
+    """, (dataset, source)).fetchone()
+
+    return {
+        'total_records': row[0],
+        'avg_hps': row[1],
+        'max_hps': row[2],
+        'min_hps': row[3],
+        'avg_haste': row[4],
+        'avg_spirit': row[5],
+        'avg_intellect': row[6],
+    }
+
+
+def query_top_n(dataset, data_source, filters, n):
+    """
+    SQL equivalent of /api/top/<n>.
+
+    Returns:
+        Tuple of (records with AdjustedRank, total filtered count), or None
+    """
+    conn = get_connection()
+    source = resolve_source(conn, dataset, data_source)
+    if source is None:
+        return None
+
+    where_sql, params = compile_filters(filters)
+    where_sql = "dataset = ? AND source = ?" + (f" AND {where_sql}" if where_sql else "")
+    params = [dataset, source] + params
+
+    total_count = conn.execute(f"SELECT COUNT(*) FROM {ROWS_TABLE} WHERE {where_sql}", params).fetchone()[0]
+
+    column_sql = ", ".join(quote(col) for col in get_synced_columns(conn, dataset, source))
+    cursor = conn.execute(
+        f"SELECT {column_sql} FROM {ROWS_TABLE} WHERE {where_sql} ORDER BY row_order LIMIT ?",
+        params + [n]
+    )
+    records = fetch_records(cursor)
+    for i, record in enumerate(records, start=1):
+        record['AdjustedRank'] = i
+
+    return records, total_count
+
+
+def build_database():
+    """(Re)build the database from every registered dataset CSV."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        create_schema(conn)
+        for data_source, datasets in (('best', DATASETS_BEST), ('all', DATASETS_ALL)):
+            for dataset, csv_path in datasets.items():
+                if not os.path.exists(csv_path):
+                    print(f"  Skipping {dataset} / {data_source} ({csv_path} not found)")
+                    continue
+                count = sync_dataset(conn, dataset, data_source, csv_path)
+                print(f"✓ {dataset} / {data_source}: {count} rows")
+    finally:
+        conn.close()
+
+
+def main():
+    """Main execution function"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    if command == 'init':
+        print(f"Building {DATABASE_PATH}...")
+        build_database()
+        return 0
+
+    if command == 'status':
+        if not database_exists():
+            print(f"{DATABASE_PATH} does not exist. Run: python db_backend.py init")
+            return 1
+        conn = sqlite3.connect(DATABASE_PATH)
+        for dataset, source, row_count, synced_at in conn.execute(
+            f"SELECT dataset, source, row_count, synced_at FROM {VERSIONS_TABLE} ORDER BY dataset, source"
+        ):
+            print(f"  {dataset:<18} {source:<5} {row_count:>6} rows (synced {synced_at})")
+        conn.close()
+        return 0
+
+    print("Usage: python db_backend.py [init|status]")
+    return 1
+
+
+if __name__ == "__main__":
+    exit(main())
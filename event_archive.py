@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Raw Event Archive for Analyzed Fights
+
+Persists the raw API responses behind an analyze_druid_performance run
+(fights/masterData, phases, composition, buffs, Lifebloom events, healing
+table, damage taken, tank timeline, casts and ability names) so new metrics
+can be computed offline instead of recrawling WarcraftLogs.
+
+Each analyzed fight is one compressed file keyed by report/fight/player/phase,
+listed in an index file:
+
+    data/archive/index.json
+    data/archive/<report_code>/<fight_id>_<player>_p<phase>.json.zz
+
+Responses are stored as JSON compressed with zlib (both standard library).
+The codec is recorded per entry in the index so it can change without
+invalidating older entries.
+
+Usage:
+    python event_archive.py list [boss_name]
+    python event_archive.py reanalyze <report_code> <fight_id> <player_name> [phase]
+"""
+
+import os
+import sys
+import json
+import zlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+ARCHIVE_DIR = os.environ.get('LIFEBLOOM_ARCHIVE_DIR', 'data/archive')
+INDEX_FILE = 'index.json'
+ARCHIVE_CODEC = 'json+zlib'
+COMPRESSION_LEVEL = 6
+
+# Archive step for each api_request_with_retry query_description
+ARCHIVE_STEPS = {
+    "Fetch fights": "fights",
+    "Detect phases": "phases",
+    "Detect phases (death)": "phases",
+    "Detect phases (first damage)": "phases",
+    "Detect M'uru phases": "phases",
+    "Fetch healing composition": "composition",
+    "Fetch buff events": "buffs",
+    "Check Vampiric Touch": "resources",
+    "Fetch resource events": "resources",
+    "Fetch Lifebloom uptime": "lifebloom",
+    "Fetch healing data": "healing",
+    "Fetch raid damage taken": "damage_taken",
+    "Fetch player details": "tanks",
+    "Detect Eredar Twins tanks": "tanks",
+    "Detect Eredar Twins Phase 2 tank": "tanks",
+    "Fetch damage events": "tank_timeline",
+    "Fetch cast events": "casts",
+    # Later pages of the paged events streams (see analyze_druid.fetch_events)
+    "Fetch buff events (next page)": "buffs",
+    "Fetch Lifebloom uptime (next page)": "lifebloom",
+    "Fetch damage events (next page)": "tank_timeline",
+    "Fetch cast events (next page)": "casts",
+    "Detect phases (next page)": "phases",
+    # Batched requests of the all-pulls mode (see all_pulls.py)
+    "Fetch buff events (all pulls)": "buffs",
+    "Check Vampiric Touch (all pulls)": "resources",
+    "Fetch Lifebloom uptime (all pulls)": "lifebloom",
+    "Fetch damage events (all pulls)": "tank_timeline",
+    "Fetch cast events (all pulls)": "casts",
+    # Requests of the raid-wide healer mode (see raid_healers.py)
+    "Fetch raid healing": "healing",
+    "Fetch raid healer casts": "casts",
+}
+
+# Capture/replay state is per thread so concurrent analyses don't mix
+_state = threading.local()
+
+
+class ArchivedResponse:
+    """Stand-in for requests.Response served from the archive during replay."""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return json.dumps(self._payload)
+
+
+def get_step_name(query_description):
+    """Map a query description to its archive step."""
+    if query_description.startswith("Fetch ability "):
+        return "ability_names"
+    return ARCHIVE_STEPS.get(query_description, query_description)
+
+
+def get_request_key(query_description, variables):
+    """Key identifying one API request within an archived fight."""
+    return f"{query_description}|{json.dumps(variables or {}, sort_keys=True)}"
+
+
+def get_entry_key(report_code, fight_id, player_name, phase=None):
+    """Index key for one analyzed fight."""
+    return f"{report_code}/{fight_id}/{player_name}/{phase or 0}"
+
+
+def get_entry_path(report_code, fight_id, player_name, phase=None):
+    """Archive file path for one analyzed fight, relative to ARCHIVE_DIR."""
+    return os.path.join(report_code, f"{fight_id}_{player_name}_p{phase or 0}.json.zz")
+
+
+def encode_entry(entry):
+    """Serialize and compress an archive entry."""
+    return zlib.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decode_entry(blob, codec=ARCHIVE_CODEC):
+    """Decompress and deserialize an archive entry."""
+    if codec != ARCHIVE_CODEC:
+        raise Exception(f"Unsupported archive codec: {codec}")
+    return json.loads(zlib.decompress(blob))
+
+
+def load_index():
+    """Load the archive index (entry key -> metadata)."""
+    index_path = os.path.join(ARCHIVE_DIR, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+
+def save_index(index):
+    """Write the archive index atomically."""
+    index_path = os.path.join(ARCHIVE_DIR, INDEX_FILE)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+
+
+@contextmanager
+def capture():
+    """
+    Record every successful API response made on this thread.
+
+    Yields:
+        List the captured requests are appended to
+    """
+    requests_captured = []
+    _state.capture = requests_captured
+    try:
+        yield requests_captured
+    finally:
+        _state.capture = None
+
+
+def record_response(query_description, variables, response):
+    """Add a response to the active capture, if any (called by api_request_with_retry)."""
+    captured = getattr(_state, 'capture', None)
+    if captured is None or response.status_code != 200:
+        return
+
+    captured.append({
+        "step": get_step_name(query_description),
+        "description": query_description,
+        "variables": variables,
+        "response": response.json()
+    })
+
+
+def save_entry(captured, report_code, data):
+    """
+    Write a captured analysis to the archive and add it to the index.
+
+    Args:
+        captured: Requests yielded by capture()
+        report_code: The report code/ID
+        data: Result dict from analyze_druid_performance
+
+    Returns:
+        Index key of the entry
+    """
+    fight_id = data['fight_id']
+    player_name = data['player_name']
+    phase = data.get('phase')
+
+    relative_path = get_entry_path(report_code, fight_id, player_name, phase)
+    path = os.path.join(ARCHIVE_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    blob = encode_entry({"requests": captured})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    key = get_entry_key(report_code, fight_id, player_name, phase)
+    index = load_index()
+    index[key] = {
+        "path": relative_path,
+        "codec": ARCHIVE_CODEC,
+        "report_code": report_code,
+        "fight_id": fight_id,
+        "player_name": player_name,
+        "phase": phase,
+        "boss_name": data.get('boss_name'),
+        "encounter_id": data.get('encounter_id'),
+        "steps": sorted(set(r["step"] for r in captured)),
+        "bytes": len(blob),
+        "archived_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    save_index(index)
+
+    return key
+
+
+def read_entry(meta):
+    """Read the archived requests for one index entry."""
+    with open(os.path.join(ARCHIVE_DIR, meta["path"]), 'rb') as f:
+        return decode_entry(f.read(), meta.get("codec", ARCHIVE_CODEC))["requests"]
+
+
+def load_entry(report_code, fight_id, player_name, phase=None):
+    """
+    Load one archived fight.
+
+    Returns:
+        Tuple of (index metadata, list of archived requests), or None if not archived
+    """
+    meta = load_index().get(get_entry_key(report_code, fight_id, player_name, phase))
+    if meta is None:
+        return None
+    return meta, read_entry(meta)
+
+
+def iter_entries(boss_name=None, encounter_id=None, player_name=None):
+    """
+    Stream archived fights one at a time, optionally filtered.
+
+    Yields:
+        Tuple of (index metadata, list of archived requests)
+    """
+    for meta in load_index().values():
+        if boss_name is not None and meta.get("boss_name") != boss_name:
+            continue
+        if encounter_id is not None and meta.get("encounter_id") != encounter_id:
+            continue
+        if player_name is not None and meta.get("player_name") != player_name:
+            continue
+        yield meta, read_entry(meta)
+
+
+def get_step(requests_archived, step):
+    """Return the archived responses for one step (e.g. 'casts', 'buffs')."""
+    return [r["response"] for r in requests_archived if r["step"] == step]
+
+
+@contextmanager
+def replay(requests_archived):
+    """Serve API requests made on this thread from archived responses."""
+    _state.replay = {
+        get_request_key(r["description"], r["variables"]): r["response"]
+        for r in requests_archived
+    }
+    try:
+        yield
+    finally:
+        _state.replay = None
+
+
+@contextmanager
+def prefill(responses):
+    """
+    Serve some API requests made on this thread from payloads fetched elsewhere.
+
+    Unlike replay(), requests missing from responses still go to the API. The
+    all-pulls mode (see all_pulls.py) uses this to hand each pull its share of
+    the events fetched for every pull at once.
+
+    Args:
+        responses: Dict of request key (see get_request_key) -> response payload
+    """
+    _state.prefill = responses
+    try:
+        yield
+    finally:
+        _state.prefill = None
+
+
+def prefilled_response(query_description, variables):
+    """ArchivedResponse for a prefilled request, or None (called by api_request_with_retry)."""
+    responses = getattr(_state, 'prefill', None)
+    if not responses:
+        return None
+    payload = responses.get(get_request_key(query_description, variables))
+    return ArchivedResponse(payload) if payload is not None else None
+
+
+def is_replaying():
+    """Whether API requests on this thread are being served from the archive."""
+    return getattr(_state, 'replay', None) is not None
+
+
+def has_response(query_description, variables):
+    """Whether the archive being replayed holds this request (False when not replaying)."""
+    responses = getattr(_state, 'replay', None)
+    return responses is not None and get_request_key(query_description, variables) in responses
+
+
+def replay_response(query_description, variables):
+    """
+    Look up an archived response during replay (called by api_request_with_retry).
+
+    Returns:
+        ArchivedResponse, or None when not replaying
+
+    Raises:
+        Exception: If replaying and the request was never archived
+    """
+    responses = getattr(_state, 'replay', None)
+    if responses is None:
+        return None
+
+    key = get_request_key(query_description, variables)
+    if key not in responses:
+        raise Exception(f"Request not in archive: {query_description}")
+    return ArchivedResponse(responses[key])
+
+
+def reanalyze(meta, requests_archived):
+    """
+    Re-run analyze_druid_performance offline against an archived fight.
+
+    Returns:
+        Result dict from analyze_druid_performance
+    """
+    # Imported here: analyze_druid imports this module for capture/replay
+    from analyze_druid import analyze_druid_performance
+
+    with replay(requests_archived):
+        return analyze_druid_performance(meta["report_code"], meta["boss_name"], meta["player_name"], meta["phase"])
+
+
+def main():
+    """Main execution function"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'list':
+        boss_name = sys.argv[2] if len(sys.argv) > 2 else None
+        index = load_index()
+        total_bytes = 0
+        for key, meta in sorted(index.items()):
+            if boss_name and meta.get("boss_name") != boss_name:
+                continue
+            total_bytes += meta["bytes"]
+            print(f"  {key:<50} {meta['boss_name']:<14} {meta['bytes']:>10,} bytes  {meta['archived_at']}")
+        print(f"\n{len(index)} archived fights, {total_bytes:,} bytes")
+        return 0
+
+    if command == 'reanalyze' and len(sys.argv) in (5, 6):
+        phase = int(sys.argv[5]) if len(sys.argv) == 6 else None
+        entry = load_entry(sys.argv[2], int(sys.argv[3]), sys.argv[4], phase)
+        if entry is None:
+            print("⚠ Fight not found in archive")
+            return 1
+
+        from analyze_druid import display_results
+        display_results(reanalyze(*entry))
+        return 0
+
+    print("Usage: python event_archive.py list [boss_name]")
+    print("       python event_archive.py reanalyze <report_code> <fight_id> <player_name> [phase]")
+    return 1
+
+
+if __name__ == "__main__":
+    exit(main())
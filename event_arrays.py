@@ -0,0 +1,325 @@
+"""
+Columnar NumPy Representation of WarcraftLogs Events
+
+A page of events from the API is a list of JSON dicts. Walking it with
+.get() calls in every stage (buff detection, per-boss damage sums, tank
+timelines) costs seconds on busy 25-man fights. to_event_array() converts a
+page once into a NumPy structured array, and the helpers below answer the
+questions the analysis asks with vectorized masks, np.add.at sums and
+np.searchsorted lookups.
+
+Columns: timestamp, type (code from EVENT_TYPE_CODES), sourceID, targetID,
+abilityGameID, amount, absorbed, stack. Missing IDs are -1, missing amounts
+and stack counts are 0.
+
+Buff uptime is handled as intervals: buff_segments() turns one buff's
+apply/refresh/stack/remove events into per-target segments (with the stack
+count held during each), and covered_length()/overlap_length() measure unions
+and intersections of segments with a sort and a cumulative sum instead of a
+merge loop. cast_intervals() and idle_gaps() do the same for the time a
+player spent casting.
+"""
+
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('type', np.int16),
+    ('sourceID', np.int32),
+    ('targetID', np.int32),
+    ('abilityGameID', np.int32),
+    ('amount', np.int64),
+    ('absorbed', np.int64),
+    ('stack', np.int16),
+])
+
+# Event types the analysis looks at; anything else gets UNKNOWN_TYPE
+EVENT_TYPES = [
+    'cast', 'begincast', 'damage', 'heal', 'absorbed',
+    'applybuff', 'refreshbuff', 'removebuff', 'applybuffstack', 'removebuffstack',
+    'applydebuff', 'refreshdebuff', 'removedebuff', 'applydebuffstack', 'removedebuffstack',
+    'energize', 'resourcechange', 'death',
+]
+EVENT_TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+UNKNOWN_TYPE = -1
+
+
+def to_event_array(events):
+    """
+    Convert a list of event dicts to an EVENT_DTYPE array (one pass over the dicts).
+
+    Args:
+        events: Event dicts from an events(...) { data } query
+
+    Returns:
+        NumPy structured array with one row per event, in the input order
+    """
+    codes = EVENT_TYPE_CODES
+    return np.array([
+        (
+            e.get('timestamp') or 0,
+            codes.get(e.get('type'), UNKNOWN_TYPE),
+            e.get('sourceID', -1),
+            e.get('targetID', -1),
+            e.get('abilityGameID', -1),
+            e.get('amount') or 0,
+            e.get('absorbed') or 0,
+            e.get('stack') or 0,
+        )
+        for e in events
+    ], dtype=EVENT_DTYPE)
+
+
+def type_mask(events, event_type):
+    """Rows of one event type."""
+    return events['type'] == EVENT_TYPE_CODES[event_type]
+
+
+def count_buff_applications(events, ability_ids, target_id):
+    """
+    Number of applybuff events of any of ability_ids on one target.
+
+    Args:
+        events: EVENT_DTYPE array of buff events
+        ability_ids: Ability ID or list of IDs
+        target_id: Actor ID receiving the buff
+    """
+    mask = (type_mask(events, 'applybuff') &
+            np.isin(events['abilityGameID'], np.atleast_1d(ability_ids)) &
+            (events['targetID'] == target_id))
+    return int(np.count_nonzero(mask))
+
+
+def damage_by_target(events, source_id, target_ids):
+    """
+    Damage (amount + absorbed) each target took from one source.
+
+    Args:
+        events: EVENT_DTYPE array of damage-taken events
+        source_id: Actor ID dealing the damage
+        target_ids: Actor IDs to include (e.g. the players)
+
+    Returns:
+        dict of target ID -> damage taken, only for targets with damage
+    """
+    mask = (events['sourceID'] == source_id) & np.isin(events['targetID'], list(target_ids))
+    targets = events['targetID'][mask]
+    if len(targets) == 0:
+        return {}
+
+    totals = np.zeros(int(targets.max()) + 1, dtype=np.int64)
+    np.add.at(totals, targets, events['amount'][mask] + events['absorbed'][mask])
+
+    # Keyed in order of first appearance, like summing the events one by one
+    present, first_index = np.unique(targets, return_index=True)
+    return {int(target): int(totals[target]) for target in present[np.argsort(first_index)]}
+
+
+def build_swing_timeline(events, player_ids, tank_ids):
+    """
+    Damage from non-player sources on tanks, sorted by time (stable).
+
+    Args:
+        events: EVENT_DTYPE array of damage-taken events
+        player_ids: Player actor IDs (their damage, e.g. friendly fire, is ignored)
+        tank_ids: Tank actor IDs
+
+    Returns:
+        Tuple of (timestamps, tank IDs) arrays
+    """
+    mask = (type_mask(events, 'damage') &
+            ~np.isin(events['sourceID'], list(player_ids)) &
+            np.isin(events['targetID'], [t for t in tank_ids if t is not None]))
+    swings = events[mask]
+    order = np.argsort(swings['timestamp'], kind='stable')
+    return swings['timestamp'][order], swings['targetID'][order]
+
+
+def lookup_active(timeline_timestamps, timeline_values, timestamps, missing=-1):
+    """
+    Value of the latest timeline entry at or before each timestamp.
+
+    Args:
+        timeline_timestamps: Sorted timestamps of the timeline
+        timeline_values: Value at each timeline entry (e.g. the tank swung at)
+        timestamps: Times to look up
+        missing: Value for timestamps before the first entry
+
+    Returns:
+        Array of values, one per timestamp
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timeline_timestamps) == 0:
+        return np.full(len(timestamps), missing, dtype=np.int64)
+    indices = np.searchsorted(timeline_timestamps, timestamps, side='right') - 1
+    return np.where(indices >= 0, timeline_values[np.maximum(indices, 0)], missing)
+
+
+def buff_segments(events, end_time):
+    """
+    Per-target segments during which a buff was up, with the stack count held.
+
+    Events are grouped by target and ordered by time (stable). applybuff and
+    refreshbuff start or continue the buff, removebuff ends it, and
+    applybuffstack/removebuffstack set the stack count. A stack event also
+    means the buff is up, e.g. when it was applied before the queried window.
+    A buff still up after the last event of its target lasts until end_time,
+    and nothing after end_time is counted.
+
+    Args:
+        events: EVENT_DTYPE array of one buff's events (e.g. a single caster's Lifebloom)
+        end_time: Timestamp closing buffs that were never removed
+
+    Returns:
+        Tuple of (targets, starts, ends, stacks) arrays, one entry per segment
+    """
+    codes = EVENT_TYPE_CODES
+    events = events[np.isin(events['type'], [
+        codes['applybuff'], codes['refreshbuff'], codes['removebuff'],
+        codes['applybuffstack'], codes['removebuffstack']
+    ])]
+    empty = np.empty(0, dtype=np.int64)
+    if len(events) == 0:
+        return empty, empty, empty, empty
+
+    events = events[np.lexsort((events['timestamp'], events['targetID']))]
+    kinds = events['type']
+    targets = events['targetID'].astype(np.int64)
+    timestamps = events['timestamp']
+    rows = np.arange(len(events))
+
+    first = np.r_[True, targets[1:] != targets[:-1]]
+    last = np.r_[targets[1:] != targets[:-1], True]
+
+    def carry_forward(values, defined):
+        # Rows with no value of their own take the latest defined row of the same target
+        source = np.maximum.accumulate(np.where(defined, rows, 0))
+        return values[source]
+
+    # Up (1) / down (0) after each event
+    is_stack = (kinds == codes['applybuffstack']) | (kinds == codes['removebuffstack'])
+    is_start = (kinds == codes['applybuff']) | (kinds == codes['refreshbuff']) | is_stack
+    is_remove = kinds == codes['removebuff']
+    up = carry_forward(is_start.astype(np.int8), is_start | is_remove | first)
+
+    # Stack count after each event; a refresh keeps the previous count
+    stack_values = np.where(is_stack, events['stack'], np.where(kinds == codes['applybuff'], 1, 0))
+    stacks = carry_forward(stack_values, ~(kinds == codes['refreshbuff']) | first)
+    stacks = np.where(up == 1, np.maximum(stacks, 1), 0)
+
+    ends = np.where(last, end_time, np.r_[timestamps[1:], end_time])
+    ends = np.minimum(ends, end_time)
+
+    keep = (up == 1) & (timestamps < end_time)
+    return targets[keep], timestamps[keep], ends[keep], stacks[keep].astype(np.int64)
+
+
+def covered_length(starts, ends):
+    """Total length of the union of intervals [starts[i], ends[i]) (overlaps counted once)."""
+    if len(starts) == 0:
+        return 0
+    bounds = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64)])
+    order = np.argsort(bounds, kind='stable')
+    bounds, depth = bounds[order], np.cumsum(deltas[order])
+    return int(np.sum(np.diff(bounds)[depth[:-1] > 0]))
+
+
+def overlap_length(a_starts, a_ends, b_starts, b_ends):
+    """Total length covered by both interval sets (|A| + |B| - |A ∪ B|)."""
+    both = covered_length(np.concatenate([a_starts, b_starts]), np.concatenate([a_ends, b_ends]))
+    return covered_length(a_starts, a_ends) + covered_length(b_starts, b_ends) - both
+
+
+def timeline_runs(timeline_timestamps, timeline_values, end_time):
+    """
+    Collapse a timeline into runs of the same value.
+
+    Each entry holds until the next entry (or end_time for the last one).
+
+    Returns:
+        Tuple of (values, starts, ends) arrays, one entry per run
+    """
+    if len(timeline_timestamps) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    values = np.asarray(timeline_values)
+    changes = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    starts = np.asarray(timeline_timestamps)[changes]
+    ends = np.maximum(np.r_[starts[1:], end_time], starts)
+    return values[changes], starts, ends
+
+
+def length_by_value(values, starts, ends):
+    """
+    Total segment length per value (e.g. per target or per stack count).
+
+    Segments sharing a value must not overlap, as with buff_segments() output.
+
+    Returns:
+        dict of value -> total length, in ascending value order
+    """
+    if len(values) == 0:
+        return {}
+    present, inverse = np.unique(values, return_inverse=True)
+    totals = np.bincount(inverse, weights=ends - starts)
+    return {int(value): int(total) for value, total in zip(present, totals)}
+
+
+def overlap_by_value(a_values, a_starts, a_ends, b_values, b_starts, b_ends):
+    """
+    Length during which set A and set B hold the same value.
+
+    E.g. buff segments per target vs. active-tank runs: the time the buff was
+    on whichever tank was active.
+    """
+    total = 0
+    for value in np.intersect1d(a_values, b_values):
+        in_a, in_b = a_values == value, b_values == value
+        total += overlap_length(a_starts[in_a], a_ends[in_a], b_starts[in_b], b_ends[in_b])
+    return total
+
+
+def cast_intervals(events, gcd_ms, off_gcd_ids=()):
+    """
+    Time the caster was busy with each completed cast.
+
+    A cast occupies [start, max(end, start + GCD)], where start is its
+    begincast (if the event right before it is a begincast of the same
+    ability) and end is the cast event. Casts of off_gcd_ids are dropped.
+
+    Args:
+        events: EVENT_DTYPE array of one player's Casts events, in time order
+        gcd_ms: The player's global cooldown in milliseconds
+        off_gcd_ids: Ability IDs that don't trigger the GCD (potions, runes, ...)
+
+    Returns:
+        Tuple of (starts, ends) arrays, one entry per cast, sorted by start
+    """
+    casts = np.flatnonzero(type_mask(events, 'cast') & ~np.isin(events['abilityGameID'], list(off_gcd_ids)))
+    ends = events['timestamp'][casts]
+
+    previous = np.maximum(casts - 1, 0)
+    began = ((casts > 0) & (events['type'][previous] == EVENT_TYPE_CODES['begincast']) &
+             (events['abilityGameID'][previous] == events['abilityGameID'][casts]))
+    starts = np.where(began, events['timestamp'][previous], ends)
+    ends = np.maximum(ends, starts + int(round(gcd_ms)))
+
+    order = np.argsort(starts, kind='stable')
+    return starts[order], ends[order]
+
+
+def idle_gaps(starts, ends):
+    """
+    Idle time between consecutive busy intervals (negative when they overlap).
+
+    Args:
+        starts, ends: Busy intervals sorted by start, as from cast_intervals()
+
+    Returns:
+        Array of gaps, one fewer than the number of intervals
+    """
+    if len(starts) < 2:
+        return np.empty(0, dtype=np.int64)
+    # Gap to the latest end so far, so a long cast isn't "idle" under a short one
+    return starts[1:] - np.maximum.accumulate(ends)[:-1]
@@ -21,9 +21,13 @@ import os
 from datetime import datetime
 from auth import get_user_access_token
 from analyze_druid import analyze_druid_performance
+from datasets import CSV_FIELDNAMES, publish_dataset
+from phases import PHASE_NUMBERS
+import metrics
 
 # API Configuration
-API_URL = "https://www.warcraftlogs.com/api/v2/user"
+# Overridable to point at a local stand-in server (see wcl_standin.py)
+API_URL = os.environ.get("WARCRAFTLOGS_API_URL", "https://www.warcraftlogs.com/api/v2/user")
 
 # Rate limiting configuration
 BASE_DELAY = 2.0  # Base delay between API calls
@@ -66,12 +70,14 @@ def check_rate_limit():
             reset_in = data.get("pointsResetIn", 0)
             percent_used = (spent / limit * 100) if limit > 0 else 0
 
-            return {
+            rate_status = {
                 "limitPerHour": limit,
                 "pointsSpentThisHour": spent,
                 "pointsResetIn": reset_in,
                 "percentUsed": percent_used
             }
+            metrics.record_rate_limit(rate_status)
+            return rate_status
 
     # Return default values if query fails
     return {
@@ -264,6 +270,123 @@ def load_comparison_file(comparison_file):
     return players
 
 
+def build_report_row(data, player_name, player_server, player_region, report_code):
+    """
+    Build a dataset CSV row from an analyze_druid_performance result.
+
+    Args:
+        data: Result dict from analyze_druid_performance
+        player_name: The player's name
+        player_server: The player's server name
+        player_region: The player's server region
+        report_code: The report code that was analyzed
+
+    Returns:
+        Dict keyed by CSV_FIELDNAMES (Rank is recomputed on save)
+    """
+    # Extract stats
+    stats = data['player_stats']
+    trinkets_data = data['player_trinkets']
+    ranking_data = data['player_ranking']
+
+    trinket_list = trinkets_data.get('trinkets', [])
+    trinket1 = trinket_list[0].get('name', '') if len(trinket_list) > 0 else ''
+    trinket2 = trinket_list[1].get('name', '') if len(trinket_list) > 1 else ''
+
+    total_hps = ranking_data.get('hps', 0)
+
+    # Calculate percentages
+    lifebloom_hps = data['lifebloom_hps']
+    lifebloom_percent = (lifebloom_hps / total_hps * 100) if total_hps > 0 else 0
+
+    rejuvenation_hps = data['rejuvenation_hps']
+    rejuvenation_percent = (rejuvenation_hps / total_hps * 100) if total_hps > 0 else 0
+
+    regrowth_hps = data['regrowth_total_hps']
+    regrowth_percent = (regrowth_hps / total_hps * 100) if total_hps > 0 else 0
+
+    # Rotation patterns
+    sorted_patterns = data['sorted_patterns']
+    rotation1 = sorted_patterns[0][0] if len(sorted_patterns) > 0 else ''
+    rotation1_count = sorted_patterns[0][1] if len(sorted_patterns) > 0 else 0
+    total_rotations = len(data['actual_rotations'])
+    rotation1_percent = (rotation1_count / total_rotations * 100) if total_rotations > 0 else 0
+
+    rotation2 = sorted_patterns[1][0] if len(sorted_patterns) > 1 else ''
+    rotation2_count = sorted_patterns[1][1] if len(sorted_patterns) > 1 else 0
+    rotation2_percent = (rotation2_count / total_rotations * 100) if total_rotations > 0 else 0
+
+    # Healer composition
+    healer_comp = data['healer_composition']
+    n_druid = len(healer_comp.get('Restoration Druid', []))
+    n_paladin = len(healer_comp.get('Holy Paladin', []))
+    n_hpriest = len(healer_comp.get('Holy Priest', []))
+    n_dpriest = len(healer_comp.get('Discipline Priest', []))
+    n_shaman = len(healer_comp.get('Restoration Shaman', []))
+
+    # Build row
+    encounter_date = datetime.fromtimestamp(data['timestamp'] / 1000)
+    date_str = encounter_date.strftime("%Y-%m-%d %H:%M:%S")
+    duration_str = f"{data['duration_minutes']}m {data['duration_seconds']}s"
+
+    row = {
+        'Rank': 0,  # Will be recomputed on save
+        'Name': player_name,
+        'Server': player_server,
+        'Region': player_region,
+        'Date': date_str,
+        'Duration': duration_str,
+        'ReportID': report_code,
+        'ReportLink': f"https://classic.warcraftlogs.com/reports/{report_code}?fight={data['fight_id']}&source={data['player_id']}&type=healing",
+        'HPS': round(total_hps, 2),
+        'HasteSummary': stats.get('haste_summary', 0) if stats.get('has_stats') else 0,
+        'HasteGear': stats.get('haste_gear', 0) if stats.get('has_stats') else 0,
+        'Spirit': stats.get('spirit', 0) if stats.get('has_stats') else 0,
+        'Intellect': stats.get('intellect', 0) if stats.get('has_stats') else 0,
+        'TotalHealers': data['total_healers'],
+        'nDruid': n_druid,
+        'nPaladin': n_paladin,
+        'nHPriest': n_hpriest,
+        'nDPriest': n_dpriest,
+        'nShaman': n_shaman,
+        'RaidDamageTakenPerSecond': round(data['raid_damage_taken_per_second'], 2),
+        'VampiricTouch': 'Yes' if data['has_vampiric_touch'] else 'No',
+        'InnervateCount': data['innervate_count'],
+        'Bloodlust': 'Yes' if data['has_bloodlust'] else 'No',
+        'NaturesGrace': 'Yes' if data['has_natures_grace'] else 'No',
+        'Trinket1': trinket1,
+        'Trinket2': trinket2,
+        'LifebloomUptime': round(data['lifebloom_uptime_percent'], 2),
+        'LifebloomTankUptime': round(data['lifebloom_tank_uptime_percent'], 2),
+        'LifebloomStack3Percent': round(data['lifebloom_stack3_percent'], 2),
+        'LifebloomHPS': round(lifebloom_hps, 2),
+        'LifebloomPercentHPS': round(lifebloom_percent, 2),
+        'RejuvenationHPS': round(rejuvenation_hps, 2),
+        'RejuvenationPercentHPS': round(rejuvenation_percent, 2),
+        'RegrowthHPS': round(regrowth_hps, 2),
+        'RegrowthPercentHPS': round(regrowth_percent, 2),
+        'Rotation1': rotation1,
+        'Rotation1Percent': round(rotation1_percent, 2),
+        'Rotation2': rotation2,
+        'Rotation2Percent': round(rotation2_percent, 2),
+        'TankRotationPercent': round(data['tank_rotation_percent'], 2),
+        'RotatingOnTank': 'Yes' if data['rotating_on_tank'] else 'No',
+        'ActiveTimePercent': data['active_time_percent'],
+        'CastsPerMinute': data['casts_per_minute'],
+        'IdleGapCount': data['idle_gap_count'],
+        'IdleGapSeconds': data['idle_gap_seconds'],
+        'EstimatedLatencyMs': data['estimated_latency_ms'],
+        'TimeToOOM': data['time_to_oom_seconds'] if data['time_to_oom_seconds'] is not None else '',
+        'HealingPerMana': data['healing_per_mana'],
+        'ManaFromInnervate': data['mana_gained']['Innervate'],
+        'ManaFromVampiricTouch': data['mana_gained']['Vampiric Touch'],
+        'ManaFromPotions': data['mana_gained']['Potions'],
+        'ManaFromRunes': data['mana_gained']['Runes']
+    }
+
+    return row
+
+
 def save_data(output_file, data, fieldnames):
     """Sort by HPS descending, recompute ranks, and save to CSV."""
     # Sort by HPS descending
@@ -279,6 +402,9 @@ def save_data(output_file, data, fieldnames):
         for row in data:
             writer.writerow(row)
 
+    # Keep the typed Arrow copy (and the SQLite copy, if enabled) used by the web app in sync
+    publish_dataset(output_file)
+
 
 def main():
     """Main execution function."""
@@ -305,10 +431,12 @@ Common Sunwell Plateau encounter IDs:
     parser.add_argument("encounter_id", type=int, help="WarcraftLogs encounter ID")
     parser.add_argument("comparison_file", help="Input CSV with players' best reports")
     parser.add_argument("output_file", help="Output CSV for all reports")
-    parser.add_argument("--phase", "-p", type=int, choices=[1, 2],
-                        help="Phase number for multi-phase encounters (e.g., Eredar Twins)")
+    parser.add_argument("--phase", "-p", type=int, choices=PHASE_NUMBERS,
+                        help="Phase number for multi-phase encounters (see phases.py; e.g., Eredar Twins)")
     parser.add_argument("--limit", "-l", type=int, default=None,
                         help="Limit number of players to process (for testing)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Save raw API responses of each analysis to the event archive (see event_archive.py)")
 
     args = parser.parse_args()
 
@@ -317,6 +445,7 @@ Common Sunwell Plateau encounter IDs:
     output_file = args.output_file
     phase = args.phase
     player_limit = args.limit
+    archive = args.archive
 
     # Validate comparison file exists
     if not os.path.exists(comparison_file):
@@ -379,20 +508,8 @@ Common Sunwell Plateau encounter IDs:
     print(f"Points reset in: {rate_status['pointsResetIn']} seconds")
     print()
 
-    # CSV fieldnames (same as analyze_top_rankings.py)
-    fieldnames = [
-        'Rank', 'Name', 'Server', 'Region', 'Date', 'Duration', 'ReportID', 'ReportLink', 'HPS',
-        'HasteSummary', 'HasteGear', 'Spirit', 'Intellect', 'TotalHealers',
-        'nDruid', 'nPaladin', 'nHPriest', 'nDPriest', 'nShaman',
-        'RaidDamageTakenPerSecond',
-        'VampiricTouch', 'InnervateCount', 'Bloodlust', 'NaturesGrace',
-        'Trinket1', 'Trinket2',
-        'LifebloomUptime', 'LifebloomHPS', 'LifebloomPercentHPS',
-        'RejuvenationHPS', 'RejuvenationPercentHPS',
-        'RegrowthHPS', 'RegrowthPercentHPS',
-        'Rotation1', 'Rotation1Percent', 'Rotation2', 'Rotation2Percent',
-        'TankRotationPercent', 'RotatingOnTank'
-    ]
+    # CSV fieldnames (shared with analyze_top_rankings.py)
+    fieldnames = CSV_FIELDNAMES
 
     # Track progress
     new_reports_count = 0
@@ -449,100 +566,15 @@ Common Sunwell Plateau encounter IDs:
 
             try:
                 time.sleep(BASE_DELAY)
-                data = analyze_druid_performance(report_code, encounter_name, player_name, phase)
-
-                # Extract stats
-                stats = data['player_stats']
-                trinkets_data = data['player_trinkets']
-                ranking_data = data['player_ranking']
-
-                trinket_list = trinkets_data.get('trinkets', [])
-                trinket1 = trinket_list[0].get('name', '') if len(trinket_list) > 0 else ''
-                trinket2 = trinket_list[1].get('name', '') if len(trinket_list) > 1 else ''
-
-                total_hps = ranking_data.get('hps', 0)
-
-                # Calculate percentages
-                lifebloom_hps = data['lifebloom_hps']
-                lifebloom_percent = (lifebloom_hps / total_hps * 100) if total_hps > 0 else 0
-
-                rejuvenation_hps = data['rejuvenation_hps']
-                rejuvenation_percent = (rejuvenation_hps / total_hps * 100) if total_hps > 0 else 0
-
-                regrowth_hps = data['regrowth_total_hps']
-                regrowth_percent = (regrowth_hps / total_hps * 100) if total_hps > 0 else 0
-
-                # Rotation patterns
-                sorted_patterns = data['sorted_patterns']
-                rotation1 = sorted_patterns[0][0] if len(sorted_patterns) > 0 else ''
-                rotation1_count = sorted_patterns[0][1] if len(sorted_patterns) > 0 else 0
-                total_rotations = len(data['actual_rotations'])
-                rotation1_percent = (rotation1_count / total_rotations * 100) if total_rotations > 0 else 0
-
-                rotation2 = sorted_patterns[1][0] if len(sorted_patterns) > 1 else ''
-                rotation2_count = sorted_patterns[1][1] if len(sorted_patterns) > 1 else 0
-                rotation2_percent = (rotation2_count / total_rotations * 100) if total_rotations > 0 else 0
-
-                # Healer composition
-                healer_comp = data['healer_composition']
-                n_druid = len(healer_comp.get('Restoration Druid', []))
-                n_paladin = len(healer_comp.get('Holy Paladin', []))
-                n_hpriest = len(healer_comp.get('Holy Priest', []))
-                n_dpriest = len(healer_comp.get('Discipline Priest', []))
-                n_shaman = len(healer_comp.get('Restoration Shaman', []))
-
-                # Build row
-                encounter_date = datetime.fromtimestamp(data['timestamp'] / 1000)
-                date_str = encounter_date.strftime("%Y-%m-%d %H:%M:%S")
-                duration_str = f"{data['duration_minutes']}m {data['duration_seconds']}s"
-
-                row = {
-                    'Rank': 0,  # Will be recomputed on save
-                    'Name': player_name,
-                    'Server': player_server,
-                    'Region': player_region,
-                    'Date': date_str,
-                    'Duration': duration_str,
-                    'ReportID': report_code,
-                    'ReportLink': f"https://classic.warcraftlogs.com/reports/{report_code}?fight={data['fight_id']}&source={data['player_id']}&type=healing",
-                    'HPS': round(total_hps, 2),
-                    'HasteSummary': stats.get('haste_summary', 0) if stats.get('has_stats') else 0,
-                    'HasteGear': stats.get('haste_gear', 0) if stats.get('has_stats') else 0,
-                    'Spirit': stats.get('spirit', 0) if stats.get('has_stats') else 0,
-                    'Intellect': stats.get('intellect', 0) if stats.get('has_stats') else 0,
-                    'TotalHealers': data['total_healers'],
-                    'nDruid': n_druid,
-                    'nPaladin': n_paladin,
-                    'nHPriest': n_hpriest,
-                    'nDPriest': n_dpriest,
-                    'nShaman': n_shaman,
-                    'RaidDamageTakenPerSecond': round(data['raid_damage_taken_per_second'], 2),
-                    'VampiricTouch': 'Yes' if data['has_vampiric_touch'] else 'No',
-                    'InnervateCount': data['innervate_count'],
-                    'Bloodlust': 'Yes' if data['has_bloodlust'] else 'No',
-                    'NaturesGrace': 'Yes' if data['has_natures_grace'] else 'No',
-                    'Trinket1': trinket1,
-                    'Trinket2': trinket2,
-                    'LifebloomUptime': round(data['lifebloom_uptime_percent'], 2),
-                    'LifebloomHPS': round(lifebloom_hps, 2),
-                    'LifebloomPercentHPS': round(lifebloom_percent, 2),
-                    'RejuvenationHPS': round(rejuvenation_hps, 2),
-                    'RejuvenationPercentHPS': round(rejuvenation_percent, 2),
-                    'RegrowthHPS': round(regrowth_hps, 2),
-                    'RegrowthPercentHPS': round(regrowth_percent, 2),
-                    'Rotation1': rotation1,
-                    'Rotation1Percent': round(rotation1_percent, 2),
-                    'Rotation2': rotation2,
-                    'Rotation2Percent': round(rotation2_percent, 2),
-                    'TankRotationPercent': round(data['tank_rotation_percent'], 2),
-                    'RotatingOnTank': 'Yes' if data['rotating_on_tank'] else 'No'
-                }
+                data = analyze_druid_performance(report_code, encounter_name, player_name, phase, archive=archive)
+
+                row = build_report_row(data, player_name, player_server, player_region, report_code)
 
                 existing_data.append(row)
                 existing_reports.add(report_code)
                 new_reports_count += 1
 
-                print(f"      Added: {total_hps:.2f} HPS")
+                print(f"      Added: {row['HPS']:.2f} HPS")
 
                 # Save periodically
                 if new_reports_count % SAVE_INTERVAL == 0:
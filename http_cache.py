@@ -0,0 +1,133 @@
+"""
+HTTP Caching for the Dataset Endpoints
+
+Datasets only change when a crawl saves them, so responses from /api/data,
+/api/stats and /api/top are a pure function of (dataset version, endpoint,
+query parameters). The cached_response decorator uses that to:
+
+  - send a weak ETag derived from the dataset version and the normalized
+    query string, plus Cache-Control headers
+  - answer If-None-Match requests with 304 Not Modified
+  - keep rendered response bodies in a per-process LRU (bounded by bytes), so
+    repeat queries skip pandas/SQLite and serialization entirely
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request
+import metrics
+
+CACHE_CONTROL = 'public, max-age=300'
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ['Content-Type', 'Content-Encoding', 'Vary']
+
+_response_cache = OrderedDict()
+_response_cache_bytes = 0
+_response_cache_lock = threading.Lock()
+_response_cache_stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+
+def normalize_query(args):
+    """Query parameters in a stable order, so parameter order doesn't change the key."""
+    return "&".join(f"{key}={value}" for key, value in sorted(args.items(multi=True)))
+
+
+def make_etag(version, path, args):
+    """ETag value for a dataset version and request."""
+    return hashlib.sha1(f"{version}|{path}|{normalize_query(args)}".encode('utf-8')).hexdigest()[:20]
+
+
+def get_cached_body(key):
+    """Look up a rendered response, marking it most recently used."""
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            _response_cache_stats['misses'] += 1
+            metrics.RESPONSE_CACHE_LOOKUPS.inc(result='miss')
+            return None
+        _response_cache.move_to_end(key)
+        _response_cache_stats['hits'] += 1
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(result='hit')
+        return entry
+
+
+def store_cached_body(key, body, status, headers):
+    """Store a rendered response, evicting least recently used entries over the byte budget."""
+    global _response_cache_bytes
+
+    if len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+
+    with _response_cache_lock:
+        if key in _response_cache:
+            _response_cache_bytes -= len(_response_cache.pop(key)[0])
+        _response_cache[key] = (body, status, headers)
+        _response_cache_bytes += len(body)
+
+        while _response_cache_bytes > RESPONSE_CACHE_MAX_BYTES:
+            _, (evicted_body, _, _) = _response_cache.popitem(last=False)
+            _response_cache_bytes -= len(evicted_body)
+
+
+def clear_response_cache():
+    """Drop every rendered response (e.g. when the data behind a version changed out of band)."""
+    global _response_cache_bytes
+    with _response_cache_lock:
+        _response_cache.clear()
+        _response_cache_bytes = 0
+
+
+def get_response_cache_stats():
+    """Entry count, size and hit counters of this process's response LRU."""
+    with _response_cache_lock:
+        return dict(_response_cache_stats, entries=len(_response_cache), bytes=_response_cache_bytes)
+
+
+def cached_response(version_func):
+    """
+    Decorate a dataset endpoint with ETag/304 handling and the rendered-response LRU.
+
+    Args:
+        version_func: Callable returning the current dataset version string for
+            the request, or None to skip caching (e.g. unknown dataset)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_func()
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(version, request.path, request.args)
+            if request.if_none_match.contains_weak(etag):
+                with _response_cache_lock:
+                    _response_cache_stats['not_modified'] += 1
+                metrics.RESPONSE_CACHE_LOOKUPS.inc(result='not_modified')
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = CACHE_CONTROL
+                return response
+
+            # Compressed bodies differ by Accept-Encoding, so it is part of the key
+            key = (etag, request.headers.get('Accept-Encoding', ''))
+            entry = get_cached_body(key)
+            if entry is None:
+                response = view(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response
+                headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                entry = (response.get_data(), response.status_code, headers)
+                store_cached_body(key, *entry)
+
+            body, status, headers = entry
+            response = Response(body, status=status, headers=headers)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Background Analysis Jobs for /api/analyze-report
+
+Runs analyze_druid_performance in a local process pool instead of inside a web
+request thread, so web workers are never blocked on WarcraftLogs. Job status,
+progress and results live in a small SQLite file shared by every web worker
+process, so any worker can answer a status poll for any job.
+
+Job lifecycle: queued -> running -> done | failed
+
+Identical requests are coalesced: while a job for the same report, boss,
+player and phase is queued, running or done, new submissions (from any web
+worker) attach to it instead of starting another analysis.
+
+Usage:
+    from jobs import submit_analysis, get_job
+    job_id = submit_analysis(report_code, boss_name, player_name)
+    python jobs.py            # list recent jobs
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from result_cache import store_result, get_cache_key
+from cast_timeline import sections_to_payload
+import metrics
+
+JOBS_DB_PATH = os.environ.get('LIFEBLOOM_JOBS_DB', 'data/jobs.db')
+ANALYSIS_WORKERS = int(os.environ.get('LIFEBLOOM_ANALYSIS_WORKERS', '2'))
+JOB_RETENTION_SECONDS = 3600
+STALE_JOB_SECONDS = 300  # a queued/running job with no progress for this long is treated as lost
+
+JOB_COLUMNS = [
+    'id', 'request_key', 'status', 'step', 'step_label', 'progress', 'partial', 'report_code', 'boss_name',
+    'player_name', 'phase', 'result', 'error', 'error_status', 'created_at', 'updated_at'
+]
+
+SSE_POLL_INTERVAL = 0.5  # seconds between job store checks while streaming
+SSE_MAX_SECONDS = 45  # end each stream before uwsgi's harakiri; EventSource reconnects and resumes
+SSE_RETRY_MS = 1000
+# Each open stream holds one web worker thread for up to SSE_MAX_SECONDS. Keep
+# this below the server's threads per worker (8) so dataset requests always
+# have threads left; extra streams get 503 and the page polls instead.
+SSE_MAX_STREAMS = int(os.environ.get('LIFEBLOOM_SSE_MAX_STREAMS', '4'))
+
+_executor = None
+_executor_lock = threading.Lock()
+_sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def get_connection():
+    """Open a connection to the job store, creating it if needed."""
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            request_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            step TEXT,
+            step_label TEXT,
+            progress INTEGER NOT NULL DEFAULT 0,
+            partial TEXT,
+            report_code TEXT NOT NULL,
+            boss_name TEXT NOT NULL,
+            player_name TEXT NOT NULL,
+            phase INTEGER,
+            result TEXT,
+            error TEXT,
+            error_status INTEGER,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_request_key ON jobs (request_key, status)")
+    return conn
+
+
+def claim_job(report_code, boss_name, player_name, phase=None):
+    """
+    Attach to an existing job for the same request, or insert a new queued one.
+
+    The lookup and insert run under BEGIN IMMEDIATE, which takes the database
+    write lock, so concurrent submissions from any thread or worker process
+    can't both create a job. Failed and stale jobs are not reused.
+
+    Returns:
+        Tuple of (job_id, status, created)
+    """
+    request_key = get_cache_key(report_code, boss_name, player_name, phase)
+    now = time.time()
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, status FROM jobs WHERE request_key = ? AND "
+            "(status = 'done' OR (status IN ('queued', 'running') AND updated_at >= ?)) "
+            "ORDER BY created_at DESC LIMIT 1",
+            (request_key, now - STALE_JOB_SECONDS)
+        ).fetchone()
+        if row:
+            conn.execute("COMMIT")
+            return row[0], row[1], False
+
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, request_key, status, report_code, boss_name, player_name, phase, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+            (job_id, request_key, report_code, boss_name, player_name, phase, now, now)
+        )
+        conn.execute("COMMIT")
+        return job_id, 'queued', True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def update_job(job_id, **fields):
+    """Update job columns and bump updated_at."""
+    fields['updated_at'] = time.time()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+    finally:
+        conn.close()
+
+
+def is_stale(status, updated_at):
+    """Whether a queued or running job has gone STALE_JOB_SECONDS without progress."""
+    return status in ('queued', 'running') and time.time() - updated_at > STALE_JOB_SECONDS
+
+
+def load_job(conn, job_id):
+    """
+    Read a job on an open connection.
+
+    A queued or running job that hasn't reported progress within
+    STALE_JOB_SECONDS (e.g. its worker process was recycled) is marked failed.
+
+    Returns:
+        Job dict, or None if unknown
+    """
+    row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    job = dict(zip(JOB_COLUMNS, row))
+    if is_stale(job['status'], job['updated_at']):
+        update_job(job_id, status='failed', error='Analysis timed out. Please try again.', error_status=504)
+        return load_job(conn, job_id)
+    return job
+
+
+def get_job(job_id):
+    """
+    Look up a job (see load_job).
+
+    Returns:
+        Job dict, or None if unknown
+    """
+    conn = get_connection()
+    try:
+        return load_job(conn, job_id)
+    finally:
+        conn.close()
+
+
+def purge_old_jobs():
+    """Delete jobs older than JOB_RETENTION_SECONDS."""
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM jobs WHERE created_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+    finally:
+        conn.close()
+
+
+def build_analysis_response(report_code, result):
+    """Build the /api/analyze-report JSON payload from an analysis result."""
+    return {
+        'success': True,
+        'report_code': report_code,
+        'fight_id': result['fight_id'],
+        'player_id': result['player_id'],
+        'is_kill': result['is_kill'],
+        'date': datetime.fromtimestamp(result['timestamp'] / 1000).strftime("%Y-%m-%d"),
+        'duration': f"{result['duration_minutes']}m {result['duration_seconds']}s",
+        'duration_minutes': result['duration_minutes'],
+        'duration_seconds': result['duration_seconds'],
+        'total_healers': result['total_healers'],
+        'healer_composition': result['healer_composition'],
+        'raid_damage_taken_per_second': result['raid_damage_taken_per_second'],
+        'player_name': result['player_name'],
+        'player_stats': result['player_stats'],
+        'player_trinkets': result['player_trinkets'],
+        'player_ranking': result['player_ranking'],
+        'has_vampiric_touch': result['has_vampiric_touch'],
+        'innervate_count': result['innervate_count'],
+        'has_bloodlust': result['has_bloodlust'],
+        'has_natures_grace': result['has_natures_grace'],
+        'lifebloom_uptime_percent': result['lifebloom_uptime_percent'],
+        'lifebloom_target_uptime': result['lifebloom_target_uptime'],
+        'lifebloom_tank_uptime_percent': result['lifebloom_tank_uptime_percent'],
+        'lifebloom_stack_seconds': result['lifebloom_stack_seconds'],
+        'lifebloom_stack3_percent': result['lifebloom_stack3_percent'],
+        'lifebloom_hps': result['lifebloom_hps'],
+        'rejuvenation_hps': result['rejuvenation_hps'],
+        'regrowth_total_hps': result['regrowth_total_hps'],
+        'regrowth_by_rank': result['regrowth_by_rank'],
+        'tanks': result['tanks'],
+        'rotation_count': result['rotation_count'],
+        'actual_rotations': sections_to_payload(result['actual_rotations']),
+        'rotation_sections': sections_to_payload(result['rotation_sections']),
+        'sorted_patterns': result['sorted_patterns'],
+        'tank_rotation_percent': result['tank_rotation_percent'],
+        'rotating_on_tank': result['rotating_on_tank'],
+        'player_gcd': result['player_gcd'],
+        'active_time_percent': result['active_time_percent'],
+        'casts_per_minute': result['casts_per_minute'],
+        'idle_gap_count': result['idle_gap_count'],
+        'idle_gap_seconds': result['idle_gap_seconds'],
+        'estimated_latency_ms': result['estimated_latency_ms'],
+        'latency_p90_ms': result['latency_p90_ms'],
+        'has_mana_data': result['has_mana_data'],
+        'time_to_oom_seconds': result['time_to_oom_seconds'],
+        'min_mana_percent': result['min_mana_percent'],
+        'end_mana_percent': result['end_mana_percent'],
+        'mana_spent': result['mana_spent'],
+        'mana_spent_by_spell': result['mana_spent_by_spell'],
+        'mana_gained': result['mana_gained'],
+        'healing_per_mana': result['healing_per_mana'],
+        'mana_timeline': result['mana_timeline'],
+        'cast_data': result['cast_data'].to_payload(),
+        'report_link': f"https://classic.warcraftlogs.com/reports/{report_code}?fight={result['fight_id']}&source={result['player_id']}&type=healing"
+    }
+
+
+def build_partial_response(partial):
+    """
+    Format the partial result fields reported so far like the final payload.
+
+    Adds the derived 'date' and 'duration' fields once the fight is known.
+    """
+    response = dict(partial)
+    if 'timestamp' in partial:
+        response['date'] = datetime.fromtimestamp(partial['timestamp'] / 1000).strftime("%Y-%m-%d")
+    if 'duration_minutes' in partial:
+        response['duration'] = f"{partial['duration_minutes']}m {partial['duration_seconds']}s"
+    return response
+
+
+def classify_analysis_error(error_message):
+    """
+    Map an analysis exception message to a user-friendly error and HTTP status.
+
+    Returns:
+        Tuple of (message, status_code)
+    """
+    # Provide more user-friendly error messages
+    if 'not found' in error_message.lower():
+        return f'Could not find the specified data: {error_message}', 404
+    elif 'token' in error_message.lower() or 'auth' in error_message.lower():
+        return 'Authentication error. Please ensure your WarcraftLogs credentials are configured.', 401
+    elif 'rate limit' in error_message.lower():
+        return 'Rate limit exceeded. Please wait a few minutes and try again.', 429
+    else:
+        return f'Analysis failed: {error_message}', 500
+
+
+def run_analysis_job(job_id, report_code, boss_name, player_name, phase=None):
+    """
+    Run one analysis job (executes in a pool process).
+
+    Progress and the final result or error are written to the job store.
+    """
+    # Imported here so web workers never load the analysis stack (requests,
+    # auth, haste tables); only the pool processes running jobs do
+    from analyze_druid import analyze_druid_performance
+
+    update_job(job_id, status='running')
+
+    partial_result = {}
+
+    def on_progress(step, label, percent, partial):
+        partial_result.update(partial)
+        update_job(job_id, step=step, step_label=label, progress=percent,
+                   partial=json.dumps(build_partial_response(partial_result)))
+
+    try:
+        result = analyze_druid_performance(report_code, boss_name, player_name, phase,
+                                           progress_callback=on_progress)
+        response_json = json.dumps(build_analysis_response(report_code, result))
+        update_job(job_id, status='done', progress=100, result=response_json)
+        store_result(report_code, boss_name, player_name, phase, response_json)
+    except Exception as e:
+        error_message, error_status = classify_analysis_error(str(e))
+        update_job(job_id, status='failed', error=error_message, error_status=error_status)
+    finally:
+        # Pool processes exit without running atexit handlers
+        metrics.dump_snapshot()
+
+
+def get_executor():
+    """
+    Return this process's analysis pool, creating it on first use.
+
+    Created lazily so each forked web worker builds its own pool. The pool uses
+    'spawn' so analysis processes don't inherit the web worker's threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            _executor = ProcessPoolExecutor(
+                max_workers=ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def submit_analysis(report_code, boss_name, player_name, phase=None):
+    """
+    Queue an analysis in the background pool, or join an identical one.
+
+    Returns:
+        Tuple of (job_id to poll with get_job(), current job status)
+    """
+    purge_old_jobs()
+    job_id, status, created = claim_job(report_code, boss_name, player_name, phase)
+    if created:
+        get_executor().submit(run_analysis_job, job_id, report_code, boss_name, player_name, phase)
+    return job_id, status
+
+
+def job_status_payload(job):
+    """Public status fields of a job for the status endpoint."""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'step': job['step'],
+        'step_label': job['step_label'],
+        'progress': job['progress'],
+        'partial': json.loads(job['partial']) if job['partial'] else {},
+        'error': job['error']
+    }
+
+
+def format_sse_event(event, data):
+    """Format one Server-Sent Events message (data is a JSON string)."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def acquire_sse_slot():
+    """
+    Reserve one of this worker's SSE_MAX_STREAMS stream slots.
+
+    Returns:
+        True if a slot was reserved (release it with release_sse_slot when
+        the stream closes), False if every slot is in use
+    """
+    return _sse_slots.acquire(blocking=False)
+
+
+def release_sse_slot():
+    """Free a slot reserved by acquire_sse_slot."""
+    _sse_slots.release()
+
+
+def iter_job_events(job_id):
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    Emits a 'progress' event (status payload with partial results) whenever
+    the job changes, then a final 'result' or 'failed' event. Each stream
+    lasts at most SSE_MAX_SECONDS; the browser's EventSource reconnects and
+    the new stream picks up from the job's current state.
+
+    The stream keeps one connection to the job store and polls only the
+    job's status and updated_at; the partial/result JSON is read when the
+    job has changed.
+    """
+    deadline = time.time() + SSE_MAX_SECONDS
+    last_update = None
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+
+    conn = get_connection()
+    try:
+        while True:
+            row = conn.execute("SELECT status, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and (row[1] != last_update or is_stale(*row)):
+                job = load_job(conn, job_id)
+                if job is None:
+                    row = None  # Purged between the two reads
+                elif job['status'] == 'done':
+                    yield format_sse_event('result', job['result'])
+                    return
+                elif job['status'] == 'failed':
+                    yield format_sse_event('failed', json.dumps({'error': job['error'], 'status': job['error_status']}))
+                    return
+                else:
+                    last_update = job['updated_at']
+                    yield format_sse_event('progress', json.dumps(job_status_payload(job)))
+
+            if row is None:
+                yield format_sse_event('failed', json.dumps({'error': 'Job not found', 'status': 404}))
+                return
+
+            if time.time() >= deadline:
+                return
+            time.sleep(SSE_POLL_INTERVAL)
+    finally:
+        conn.close()
+
+
+def main():
+    """List recent jobs."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT id, status, progress, report_code, boss_name, player_name, created_at "
+        "FROM jobs ORDER BY created_at DESC LIMIT 50"
+    ).fetchall()
+    conn.close()
+
+    for job_id, status, progress, report_code, boss_name, player_name, created_at in rows:
+        created = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"  {job_id}  {status:<8} {progress:>3}%  {report_code} {boss_name} {player_name}  ({created})")
+    print(f"\n{len(rows)} jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,235 @@
+"""
+Mana Timeline and Mana Efficiency
+
+Step 3 of the analysis fetches the druid's Resources events, and step 10 the
+druid's Casts events. Both carry the player's current mana in
+classResources, so together they give a mana timeline at no extra cost:
+
+  - resourcechange events: mana gained (Vampiric Touch, potions, runes, Mana
+    Tide, ...), with the amount wasted at full mana
+  - cast events: the mana cost of every cast
+
+Passive regeneration isn't logged. It is inferred from the change in mana
+between consecutive samples that isn't explained by a logged cost or gain.
+Innervate only boosts regeneration, so its mana is estimated as the regen
+while Innervate was up minus the regen the druid had without it.
+
+Everything is computed in one pass over the events into NumPy arrays. The
+timeline sent to the web UI is down-sampled to one point every
+TIMELINE_STEP_MS.
+"""
+
+import numpy as np
+import event_arrays
+
+MANA_RESOURCE_TYPE = 0
+OOM_THRESHOLD_PERCENT = 5  # below this share of max mana the druid counts as out of mana
+TIMELINE_STEP_MS = 5000
+
+# Mana sources reported separately; gains from anything else are "Other"
+MANA_SOURCES = ["Innervate", "Vampiric Touch", "Potions", "Runes", "Other"]
+
+# Energize ability ID -> mana source
+MANA_SOURCE_IDS = {
+    34919: "Vampiric Touch",
+    28499: "Potions",  # Super Mana Potion
+    17531: "Potions",  # Major Mana Potion
+    38929: "Potions",  # Fel Mana Potion
+    27869: "Runes",    # Dark Rune
+    16666: "Runes"     # Demonic Rune
+}
+
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('amount', np.int64),
+    ('max', np.int64),
+    ('cost', np.int64),
+    ('gain', np.int64),
+    ('abilityGameID', np.int32),
+])
+
+
+def player_mana(event, player_id):
+    """
+    The player's mana entry in an event's classResources, or None.
+
+    resourceActor says whose resources classResources describes (1 = source,
+    2 = target); events without it are taken as the player's, since both
+    streams are already filtered to the player.
+    """
+    resources = event.get("classResources")
+    if not resources:
+        return None
+
+    actor = event.get("resourceActor")
+    owner = event.get("sourceID") if actor == 1 else event.get("targetID") if actor == 2 else None
+    if owner is not None and owner != player_id:
+        return None
+
+    for resource in resources:
+        if resource.get("type") == MANA_RESOURCE_TYPE:
+            return resource
+    return None
+
+
+def to_mana_samples(resource_events, cast_events, player_id):
+    """
+    Collect the player's mana samples, costs and gains into one array.
+
+    Args:
+        resource_events: Resources events targeting the player
+        cast_events: The player's Casts events
+        player_id: The player's actor ID
+
+    Returns:
+        SAMPLE_DTYPE array sorted by time; amount/max are -1 where the event
+        carried no mana reading
+    """
+    rows = []
+
+    for event in resource_events:
+        if event.get("targetID") != player_id or event.get("resourceChangeType") != MANA_RESOURCE_TYPE:
+            continue
+        mana = player_mana(event, player_id)
+        gain = max((event.get("resourceChange") or 0) - (event.get("waste") or 0), 0)
+        rows.append((
+            event.get("timestamp") or 0,
+            mana.get("amount", -1) if mana else -1,
+            mana.get("max", -1) if mana else -1,
+            0, gain, event.get("abilityGameID", -1)
+        ))
+
+    for event in cast_events:
+        if event.get("type") != "cast":
+            continue
+        mana = player_mana(event, player_id)
+        if mana is None:
+            continue
+        rows.append((
+            event.get("timestamp") or 0,
+            mana.get("amount", -1), mana.get("max", -1),
+            mana.get("cost") or 0, 0, event.get("abilityGameID", -1)
+        ))
+
+    samples = np.array(rows, dtype=SAMPLE_DTYPE)
+    return samples[np.argsort(samples['timestamp'], kind='stable')]
+
+
+def calculate_mana_timeline(resource_events, cast_events, player_id, window_start, window_end,
+                            ability_names, innervate_starts, innervate_ends, total_healing):
+    """
+    Build the mana timeline and mana efficiency metrics of one analysis.
+
+    Args:
+        resource_events: Resources events targeting the player (step 3)
+        cast_events: The player's Casts events (step 10)
+        player_id: The player's actor ID
+        window_start: Report-relative start of the analyzed window (ms)
+        window_end: Report-relative end of the analyzed window (ms)
+        ability_names: Dict of ability ID -> name
+        innervate_starts, innervate_ends: Innervate buff segments on the player
+        total_healing: The player's healing over the window
+
+    Returns:
+        dict with has_mana_data, time_to_oom_seconds (None if never OOM),
+        min_mana_percent, end_mana_percent, mana_spent, mana_spent_by_spell,
+        mana_gained (per MANA_SOURCES), healing_per_mana and mana_timeline
+        ({'time': seconds, 'mana_percent': values}, one point per TIMELINE_STEP_MS)
+    """
+    samples = to_mana_samples(resource_events, cast_events, player_id)
+    samples = samples[(samples['timestamp'] >= window_start) & (samples['timestamp'] <= window_end)]
+
+    # Mana spent per spell
+    spent = samples[samples['cost'] > 0]
+    spell_ids, spell_index = np.unique(spent['abilityGameID'], return_inverse=True)
+    spell_mana = np.bincount(spell_index, weights=spent['cost'], minlength=len(spell_ids))
+    spell_casts = np.bincount(spell_index, minlength=len(spell_ids))
+    mana_spent = int(spent['cost'].sum())
+    mana_spent_by_spell = sorted((
+        {
+            "id": int(ability_id),
+            "name": ability_names.get(int(ability_id), f"Unknown ({int(ability_id)})"),
+            "mana": int(mana),
+            "casts": int(casts),
+            "percent": round(mana / mana_spent * 100, 2) if mana_spent > 0 else 0
+        }
+        for ability_id, mana, casts in zip(spell_ids, spell_mana, spell_casts)
+    ), key=lambda spell: spell["mana"], reverse=True)
+
+    # Logged mana gains by source
+    mana_gained = dict.fromkeys(MANA_SOURCES, 0)
+    for ability_id, gain in zip(samples['abilityGameID'], samples['gain']):
+        if gain > 0:
+            mana_gained[MANA_SOURCE_IDS.get(int(ability_id), "Other")] += int(gain)
+
+    readings = samples[(samples['amount'] >= 0) & (samples['max'] > 0)]
+    has_mana_data = len(readings) > 0
+
+    time_to_oom_seconds = None
+    min_mana_percent = end_mana_percent = 0
+    timeline = {"time": [], "mana_percent": []}
+
+    if has_mana_data:
+        percent = readings['amount'] / readings['max'] * 100
+        min_mana_percent = float(percent.min())
+        end_mana_percent = float(percent[-1])
+
+        oom = np.flatnonzero(percent < OOM_THRESHOLD_PERCENT)
+        if len(oom):
+            time_to_oom_seconds = (int(readings['timestamp'][oom[0]]) - window_start) / 1000
+
+        # Regen = change between readings not explained by the logged cost or gain
+        regen = np.maximum(
+            np.diff(readings['amount']) + readings['cost'][1:] - readings['gain'][1:], 0
+        )
+        interval_starts, interval_ends = readings['timestamp'][:-1], readings['timestamp'][1:]
+        mana_gained["Innervate"] = estimate_innervate_mana(
+            regen, interval_starts, interval_ends, innervate_starts, innervate_ends
+        )
+
+        sample_times = np.arange(window_start, window_end + 1, TIMELINE_STEP_MS)
+        sampled = event_arrays.lookup_active(readings['timestamp'], percent, sample_times, missing=percent[0])
+        timeline = {
+            "time": ((sample_times - window_start) / 1000).tolist(),
+            "mana_percent": np.round(sampled, 1).tolist()
+        }
+
+    return {
+        "has_mana_data": has_mana_data,
+        "time_to_oom_seconds": time_to_oom_seconds,
+        "min_mana_percent": round(min_mana_percent, 2),
+        "end_mana_percent": round(end_mana_percent, 2),
+        "mana_spent": mana_spent,
+        "mana_spent_by_spell": mana_spent_by_spell,
+        "mana_gained": mana_gained,
+        "healing_per_mana": round(total_healing / mana_spent, 3) if mana_spent > 0 else 0,
+        "mana_timeline": timeline
+    }
+
+
+def estimate_innervate_mana(regen, interval_starts, interval_ends, innervate_starts, innervate_ends):
+    """
+    Extra regen while Innervate was up, over the regen rate without it.
+
+    Args:
+        regen: Mana regenerated over each interval between mana readings
+        interval_starts, interval_ends: The intervals (ms)
+        innervate_starts, innervate_ends: Innervate segments on the player (ms)
+
+    Returns:
+        Estimated mana from Innervate (0 without Innervate)
+    """
+    if len(innervate_starts) == 0 or len(regen) == 0:
+        return 0
+
+    # Intervals ending inside an Innervate segment (the player's segments don't overlap)
+    order = np.argsort(innervate_starts)
+    starts, ends = np.asarray(innervate_starts)[order], np.asarray(innervate_ends)[order]
+    segment = np.searchsorted(starts, interval_ends, side='right') - 1
+    inside = (segment >= 0) & (interval_ends <= ends[np.maximum(segment, 0)])
+
+    lengths = interval_ends - interval_starts
+    inside_ms, outside_ms = lengths[inside].sum(), lengths[~inside].sum()
+    baseline_rate = regen[~inside].sum() / outside_ms if outside_ms > 0 else 0
+
+    return max(int(regen[inside].sum() - baseline_rate * inside_ms), 0)
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Prometheus-Style Metrics for the Web App and Crawlers
+
+A small in-process registry of counters, gauges and histograms, rendered in
+the Prometheus text exposition format by `/metrics` and by this script.
+
+The web app runs several worker processes, analyses run in a process pool and
+the crawlers are separate CLI runs, so every process periodically dumps its
+values to METRICS_DIR/<pid>.json (and once more at exit). Rendering merges
+those snapshots with the live values of the current process: counters and
+histograms are summed, gauges take the most recently written value.
+
+Snapshots of processes that have exited (recycled workers, finished crawls)
+are folded into METRICS_DIR/aggregate.json the next time metrics are
+rendered, so counters never go backwards and each render reads one file per
+live process plus the aggregate.
+
+Usage:
+    python metrics.py          # print the merged metrics
+    python metrics.py clear    # delete the snapshot files
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development server: a single process, nothing to race with
+    fcntl = None
+
+METRICS_DIR = os.environ.get('LIFEBLOOM_METRICS_DIR', 'data/metrics')
+METRICS_DUMP_INTERVAL = float(os.environ.get('LIFEBLOOM_METRICS_DUMP_INTERVAL', '15'))  # 0 disables dumps
+METRICS_MAX_AGE_SECONDS = 7 * 24 * 3600  # Snapshots idle this long are folded even if their pid was reused
+AGGREGATE_FILE = 'aggregate.json'
+AGGREGATE_LOCK_FILE = 'aggregate.lock'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ANALYSIS_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry = {}
+_lock = threading.Lock()
+_dumper = {'pid': None}
+_stages = threading.local()
+
+
+class Metric:
+    """Base class: a named metric with a fixed set of label names."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        _registry[name] = self
+
+    def label_key(self, labels):
+        """Label values in labelnames order."""
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        ensure_dumper()
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.label_key(labels)
+        with _lock:
+            self.values[key] = value
+        ensure_dumper()
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        ensure_dumper()
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+# ===== Web app =====
+HTTP_REQUEST_SECONDS = Histogram(
+    'lifebloom_http_request_duration_seconds', 'Flask request latency by route.',
+    ['route', 'method'])
+HTTP_REQUESTS = Counter(
+    'lifebloom_http_requests_total', 'Flask requests by route and status code.',
+    ['route', 'method', 'status'])
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'lifebloom_response_cache_lookups_total', 'Dataset endpoint response cache lookups by result.',
+    ['result'])
+RESULT_CACHE_STATS = Gauge(
+    'lifebloom_result_cache', 'Shared analysis result cache counters and size (see result_cache.py).',
+    ['stat'])
+
+# ===== Analysis pipeline =====
+ANALYSIS_SECONDS = Histogram(
+    'lifebloom_analysis_duration_seconds', 'Duration of a full druid analysis by outcome.',
+    ['outcome'], buckets=ANALYSIS_BUCKETS)
+ANALYSIS_STAGE_SECONDS = Histogram(
+    'lifebloom_analysis_stage_duration_seconds', 'Duration of each analysis pipeline step.',
+    ['stage'], buckets=STAGE_BUCKETS)
+
+# ===== WarcraftLogs API =====
+WCL_QUERY_SECONDS = Histogram(
+    'lifebloom_wcl_query_duration_seconds', 'WarcraftLogs GraphQL request latency by query.',
+    ['query'], buckets=QUERY_BUCKETS)
+WCL_RETRIES = Counter(
+    'lifebloom_wcl_retries_total', 'WarcraftLogs requests retried, by query and reason.',
+    ['query', 'reason'])
+WCL_RATE_LIMITED = Counter(
+    'lifebloom_wcl_rate_limited_total', 'WarcraftLogs responses with status 429.',
+    ['query'])
+WCL_TIMEOUTS = Counter(
+    'lifebloom_wcl_timeouts_total', 'WarcraftLogs requests that timed out.',
+    ['query'])
+WCL_FAILURES = Counter(
+    'lifebloom_wcl_failures_total', 'WarcraftLogs queries that failed after all retries.',
+    ['query'])
+WCL_RATE_LIMIT_POINTS = Gauge(
+    'lifebloom_wcl_rate_limit_points', 'WarcraftLogs rate limit budget from rateLimitData.',
+    ['field'])
+
+
+def record_rate_limit(rate_status):
+    """Set the rate limit gauges from a check_rate_limit() result."""
+    WCL_RATE_LIMIT_POINTS.set(rate_status['limitPerHour'], field='limit_per_hour')
+    WCL_RATE_LIMIT_POINTS.set(rate_status['pointsSpentThisHour'], field='spent_this_hour')
+    WCL_RATE_LIMIT_POINTS.set(rate_status['limitPerHour'] - rate_status['pointsSpentThisHour'], field='remaining')
+    WCL_RATE_LIMIT_POINTS.set(rate_status['pointsResetIn'], field='reset_in_seconds')
+
+
+@contextmanager
+def stage_timer():
+    """
+    Time the analysis steps marked with mark_stage() inside the with-block.
+
+    Each step runs until the next one is marked (or the block ends). The
+    whole block is observed in ANALYSIS_SECONDS, labelled ok or error.
+    """
+    start = time.perf_counter()
+    _stages.current = None
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        mark_stage(None)
+        ANALYSIS_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+
+
+def mark_stage(stage):
+    """End the current analysis step (if any) and start timing the next one."""
+    now = time.perf_counter()
+    current = getattr(_stages, 'current', None)
+    if current is not None:
+        ANALYSIS_STAGE_SECONDS.observe(now - current[1], stage=current[0])
+    _stages.current = (stage, now) if stage is not None else None
+
+
+def reset_metrics():
+    """Clear this process's values (e.g. between benchmark sections)."""
+    with _lock:
+        for metric in _registry.values():
+            metric.values.clear()
+
+
+def snapshot():
+    """This process's metric values as a JSON-serializable dict."""
+    with _lock:
+        # Serialized under the lock: histogram entries are mutated in place
+        values = json.dumps({name: [[list(key), value] for key, value in metric.values.items()]
+                             for name, metric in _registry.items() if metric.values})
+    return {'pid': os.getpid(), 'updated_at': time.time(), 'metrics': json.loads(values)}
+
+
+def get_snapshot_path(pid):
+    """Snapshot file of one process."""
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def dump_snapshot():
+    """Write this process's values to its snapshot file."""
+    if not any(metric.values for metric in _registry.values()):
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    write_snapshot(get_snapshot_path(os.getpid()), snapshot())
+
+
+def dump_periodically():
+    """Dump loop run by each process's background thread."""
+    while True:
+        time.sleep(METRICS_DUMP_INTERVAL)
+        try:
+            dump_snapshot()
+        except OSError as e:
+            print(f"⚠ Could not write metrics snapshot: {e}")
+
+
+def ensure_dumper():
+    """Start the dump thread the first time this process records a value."""
+    pid = os.getpid()
+    if _dumper['pid'] == pid or METRICS_DUMP_INTERVAL <= 0:
+        return
+    with _lock:
+        # Forked workers inherit the flag but not the thread, hence the pid
+        if _dumper['pid'] == pid:
+            return
+        _dumper['pid'] = pid
+    threading.Thread(target=dump_periodically, name='metrics-dump', daemon=True).start()
+    atexit.register(dump_snapshot)
+
+
+def process_running(pid):
+    """Whether a process with this pid exists (assumed yes where that can't be checked)."""
+    if os.name == 'nt':
+        return True  # os.kill would terminate the process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def snapshot_lock():
+    """Hold the lock that serializes folding snapshots into the aggregate across processes."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, AGGREGATE_LOCK_FILE), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_snapshot(path):
+    """A snapshot file's contents, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path, snap):
+    """Write a snapshot file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snap, f)
+    os.replace(temp_path, path)
+
+
+def fold_snapshots(paths):
+    """
+    Add the snapshots of exited processes to the aggregate and delete them.
+
+    Must be called with snapshot_lock() held, so a snapshot is never counted twice.
+    """
+    aggregate_path = os.path.join(METRICS_DIR, AGGREGATE_FILE)
+    snapshots = [read_snapshot(path) for path in [aggregate_path] + paths]
+    snapshots = [snap for snap in snapshots if snap is not None]
+
+    merged = merge_snapshots(snapshots)
+    write_snapshot(aggregate_path, {
+        'pid': None,
+        'updated_at': max((snap['updated_at'] for snap in snapshots), default=time.time()),
+        'metrics': {name: [[list(key), value] for key, value in values.items()]
+                    for name, values in merged.items() if values}
+    })
+    for path in paths:
+        os.remove(path)
+
+
+def load_snapshots():
+    """Snapshots of every other live process plus the aggregate of exited ones."""
+    if not os.path.isdir(METRICS_DIR):
+        return []
+
+    with snapshot_lock():
+        now = time.time()
+        live, exited = [], []
+        for filename in os.listdir(METRICS_DIR):
+            pid = filename[:-len('.json')]
+            if not filename.endswith('.json') or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            path = os.path.join(METRICS_DIR, filename)
+            try:
+                idle = now - os.path.getmtime(path) > METRICS_MAX_AGE_SECONDS
+            except OSError:
+                continue  # Being replaced by its process
+            (exited if idle or not process_running(int(pid)) else live).append(path)
+
+        if exited:
+            fold_snapshots(exited)
+
+        paths = live + [os.path.join(METRICS_DIR, AGGREGATE_FILE)]
+        return [snap for snap in (read_snapshot(path) for path in paths) if snap is not None]
+
+
+def merge_snapshots(snapshots):
+    """
+    Merge snapshots: counters and histograms are summed, gauges keep the newest value.
+
+    Returns:
+        dict of metric name -> {label key tuple: value}
+    """
+    merged = {name: {} for name in _registry}
+    for snap in sorted(snapshots, key=lambda s: s['updated_at']):
+        for name, entries in snap['metrics'].items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue  # Written by an older/newer version of this module
+            values = merged[name]
+            for key, value in entries:
+                key = tuple(key)
+                if metric.kind == 'gauge' or key not in values:
+                    values[key] = value
+                elif metric.kind == 'counter':
+                    values[key] += value
+                else:
+                    counts, total, count = values[key]
+                    values[key] = [[a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2]]
+    return merged
+
+
+def collect():
+    """
+    Merge the snapshots of all processes with this process's live values.
+
+    Returns:
+        dict of metric name -> {label key tuple: value}
+    """
+    return merge_snapshots(load_snapshots() + [snapshot()])
+
+
+def escape_label_value(value):
+    """Escape a label value for the text exposition format."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, key, extra=None):
+    """Render {name="value",...} for one series."""
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_number(value):
+    """Render a sample value (integers without a trailing .0)."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render_metrics():
+    """All metrics, merged across processes, in the Prometheus text format."""
+    merged = collect()
+    lines = []
+
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(merged[name].items()):
+            if metric.kind != 'histogram':
+                lines.append(f"{name}{format_labels(metric.labelnames, key)} {format_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric.buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                le = f'le="{bound if bound == "+Inf" else format_number(bound)}"'
+                lines.append(f"{name}_bucket{format_labels(metric.labelnames, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(metric.labelnames, key)} {format_number(total)}")
+            lines.append(f"{name}_count{format_labels(metric.labelnames, key)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def clear_snapshots():
+    """Delete every snapshot file, including the aggregate."""
+    if not os.path.isdir(METRICS_DIR):
+        return 0
+    removed = 0
+    for filename in os.listdir(METRICS_DIR):
+        if filename.endswith('.json'):
+            os.remove(os.path.join(METRICS_DIR, filename))
+            removed += 1
+    return removed
+
+
+def main():
+    """Main execution function"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        removed = clear_snapshots()
+        print(f"✓ Removed {removed} metrics snapshots")
+        return 0
+
+    print(render_metrics(), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,132 @@
+"""
+Phase Registry for Multi-Phase Encounters
+
+Which encounters have phases, what they are called and how to find their
+boundaries is declared in PHASE_REGISTRY instead of being hand-coded per boss.
+analyze_druid.detect_phases() resolves a fight's phases in this order:
+
+  1. The fight's phaseTransitions from the report metadata. They come with the
+     fights query, so this costs no extra request.
+  2. The encounter's fallback detectors, tried in order until one finds the
+     Phase 1 -> Phase 2 boundary:
+       - "death":        the NPC's death event (Deaths, one tiny filtered query)
+       - "first_damage": the first damage the NPC takes (e.g. Entropius appearing)
+       - "last_damage":  the last damage the NPC takes (pages through all of its
+                         damage taken with analyze_druid.fetch_events; only used
+                         if the cheap detectors find nothing)
+
+Phase IDs follow WarcraftLogs' PhaseTransition ids: 1-indexed and absolute
+within a fight, so a phase that recurs (Felmyst's air phases) keeps its ID.
+The analysis covers one continuous window, so a phase that occurs more than
+once in a fight can't be analyzed on its own (see get_phase_window).
+"""
+
+# Eredar Twins gameIDs (constant across all reports)
+LADY_SACROLASH_GAME_ID = 25165
+GRAND_WARLOCK_ALYTHESS_GAME_ID = 25166
+EREDAR_TWINS_ENCOUNTER_ID = 727
+
+# M'uru gameIDs (constant across all reports)
+MURU_GAME_ID = 25741
+ENTROPIUS_GAME_ID = 25840
+MURU_ENCOUNTER_ID = 728
+
+FELMYST_ENCOUNTER_ID = 726
+KILJAEDEN_ENCOUNTER_ID = 729
+
+# encounter ID -> phase names and fallback detectors as (detector, NPC gameID)
+PHASE_REGISTRY = {
+    FELMYST_ENCOUNTER_ID: {
+        "name": "Felmyst",
+        "phases": {1: "Ground", 2: "Air"},
+        "detectors": []
+    },
+    EREDAR_TWINS_ENCOUNTER_ID: {
+        "name": "The Eredar Twins",
+        "phases": {1: "Sacrolash and Alythess", 2: "Alythess alone"},
+        "detectors": [("death", LADY_SACROLASH_GAME_ID), ("last_damage", LADY_SACROLASH_GAME_ID)]
+    },
+    MURU_ENCOUNTER_ID: {
+        "name": "M'uru",
+        "phases": {1: "M'uru", 2: "Entropius"},
+        "detectors": [("death", MURU_GAME_ID), ("first_damage", ENTROPIUS_GAME_ID), ("last_damage", MURU_GAME_ID)]
+    },
+    KILJAEDEN_ENCOUNTER_ID: {
+        "name": "Kil'jaeden",
+        "phases": {1: "100-85%", 2: "85-55%", 3: "55-25%", 4: "25-0%"},
+        "detectors": []
+    }
+}
+
+# Every phase number some registered encounter has (for CLI argument checks)
+PHASE_NUMBERS = sorted({number for spec in PHASE_REGISTRY.values() for number in spec["phases"]})
+
+
+def get_phase_spec(encounter_id):
+    """Registry entry for an encounter, or None if it has no phases."""
+    return PHASE_REGISTRY.get(encounter_id)
+
+
+def get_phase_name(encounter_id, phase):
+    """Display name of a phase ("Phase 2" if the registry doesn't name it)."""
+    spec = PHASE_REGISTRY.get(encounter_id) or {}
+    name = spec.get("phases", {}).get(phase)
+    return f"Phase {phase} ({name})" if name else f"Phase {phase}"
+
+
+def find_actor_id(all_actors, game_id):
+    """Report actor ID of the NPC with a gameID, or None."""
+    for actor in all_actors:
+        if actor.get("gameID") == game_id:
+            return actor.get("id")
+    return None
+
+
+def transitions_from_report(phase_transitions, fight_start_time):
+    """
+    Convert a fight's phaseTransitions to fight-relative transitions.
+
+    Args:
+        phase_transitions: List of {'id', 'startTime'} (report-relative) or None
+        fight_start_time: Report-relative start of the fight
+
+    Returns:
+        List of {'id': int, 'start_ms': int} sorted by time, empty if the report
+        has no phase data or only a single phase
+    """
+    transitions = sorted(
+        ({'id': t['id'], 'start_ms': max(t['startTime'] - fight_start_time, 0)} for t in phase_transitions or []),
+        key=lambda t: t['start_ms']
+    )
+    if len({t['id'] for t in transitions}) < 2:
+        return []
+    return transitions
+
+
+def transitions_from_boundary(boundary_ms):
+    """Two-phase transitions with Phase 2 starting at boundary_ms (fight-relative)."""
+    return [{'id': 1, 'start_ms': 0}, {'id': 2, 'start_ms': boundary_ms}]
+
+
+def get_phase_window(transitions, phase, fight_duration_ms):
+    """
+    Fight-relative time range of a phase.
+
+    Each transition lasts until the next one (or the end of the fight). The
+    analysis queries one time range, so a phase that occurs several times in
+    the fight (Felmyst's air phases) is rejected rather than analyzed over
+    one occurrence under the phase's name.
+
+    Returns:
+        Tuple of (start_ms, end_ms), or None if the phase never started
+    """
+    windows = [
+        (t['start_ms'], transitions[i + 1]['start_ms'] if i + 1 < len(transitions) else fight_duration_ms)
+        for i, t in enumerate(transitions) if t['id'] == phase
+    ]
+    if not windows:
+        return None
+    if len(windows) > 1:
+        raise Exception(f"Phase {phase} occurs {len(windows)} times in this fight; "
+                        f"phases that recur can't be analyzed on their own, analyze the full fight instead")
+    return windows[0]
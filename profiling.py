@@ -0,0 +1,183 @@
+"""
+Per-Analysis Profiling for analyze_druid_performance
+
+Opt-in instrumentation that breaks one analysis down so a slow run can be
+blamed on the network, JSON decoding or the processing in a step (e.g. the
+rotation loop):
+
+  - per pipeline step (see ANALYSIS_STEPS): wall time and CPU time
+  - per GraphQL query: requests, network time, JSON decode time, bytes
+    received and events returned
+
+Enable it with analyze_druid_performance(..., profile=True), which attaches
+the numbers as result['profile'], or `python analyze_druid.py ... --profile`.
+Passing a cprofile_path also runs cProfile over the analysis and writes the
+stats file there (open it with `python -m pstats <file>` or snakeviz).
+"""
+
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+
+# The active profile is per thread so concurrent analyses don't mix
+_state = threading.local()
+
+
+class DecodedResponse:
+    """Stand-in for requests.Response whose JSON body was already decoded while profiling."""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return json.dumps(self._payload)
+
+
+class AnalysisProfile:
+    """Timings and counters collected during one analysis."""
+
+    def __init__(self):
+        self.steps = {}
+        self.queries = {}
+        self.current = None
+        self.started = (time.perf_counter(), time.thread_time())
+        self.total = None
+
+    def mark_step(self, step):
+        """End the current step (if any) and start timing the next one."""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if self.current is not None:
+            name, step_wall, step_cpu = self.current
+            totals = self.steps.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            totals['wall'] += wall - step_wall
+            totals['cpu'] += cpu - step_cpu
+        self.current = (step, wall, cpu) if step is not None else None
+
+    def record_query(self, query, network_seconds, decode_seconds, received_bytes, events):
+        """Add one GraphQL request to its query's totals."""
+        totals = self.queries.setdefault(query, {'requests': 0, 'network': 0.0, 'decode': 0.0, 'bytes': 0, 'events': 0})
+        totals['requests'] += 1
+        totals['network'] += network_seconds
+        totals['decode'] += decode_seconds
+        totals['bytes'] += received_bytes
+        totals['events'] += events
+
+    def finish(self):
+        """Close the last step and record the overall totals."""
+        self.mark_step(None)
+        self.total = (time.perf_counter() - self.started[0], time.thread_time() - self.started[1])
+
+    def to_dict(self):
+        """The profile as stored in result['profile'] (times in milliseconds)."""
+        wall, cpu = self.total
+        return {
+            "wall_ms": round(wall * 1000, 1),
+            "cpu_ms": round(cpu * 1000, 1),
+            "steps": [
+                {"step": step, "wall_ms": round(t['wall'] * 1000, 1), "cpu_ms": round(t['cpu'] * 1000, 1)}
+                for step, t in self.steps.items()
+            ],
+            "queries": [
+                {"query": query, "requests": t['requests'], "network_ms": round(t['network'] * 1000, 1),
+                 "decode_ms": round(t['decode'] * 1000, 1), "bytes": t['bytes'], "events": t['events']}
+                for query, t in self.queries.items()
+            ]
+        }
+
+
+@contextmanager
+def profile_analysis(cprofile_path=None):
+    """
+    Profile the analysis run inside the with-block on this thread.
+
+    Args:
+        cprofile_path: Optional file to write cProfile stats to
+
+    Yields:
+        AnalysisProfile; call to_dict() after the block
+    """
+    profile = AnalysisProfile()
+    profiler = cProfile.Profile() if cprofile_path else None
+    _state.profile = profile
+    if profiler:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        profile.finish()
+        _state.profile = None
+
+
+def get_active_profile():
+    """The profile collecting on this thread, or None."""
+    return getattr(_state, 'profile', None)
+
+
+def mark_step(step):
+    """Start timing a pipeline step, if profiling (called by report_progress)."""
+    profile = get_active_profile()
+    if profile is not None:
+        profile.mark_step(step)
+
+
+def count_events(payload):
+    """Number of events in a reportData events response (0 for other queries)."""
+    report = ((payload.get("data") or {}).get("reportData") or {}).get("report") or {}
+    events = report.get("events") or {}
+    return len(events.get("data") or [])
+
+
+def record_response(query, response, network_seconds):
+    """
+    Account a successful API response to the active profile.
+
+    The body is decoded here (to time it) and returned as a DecodedResponse,
+    so callers don't decode it a second time.
+
+    Returns:
+        The response to hand to the caller
+    """
+    profile = get_active_profile()
+    if profile is None or response.status_code != 200:
+        return response
+
+    start = time.perf_counter()
+    payload = response.json()
+    decode_seconds = time.perf_counter() - start
+
+    profile.record_query(query, network_seconds, decode_seconds, len(response.content), count_events(payload))
+    return DecodedResponse(payload)
+
+
+def format_profile(profile):
+    """Lines of the PROFILE section printed by display_results."""
+    lines = [
+        f"Total: {profile['wall_ms']:.0f} ms wall, {profile['cpu_ms']:.0f} ms CPU",
+        "",
+        f"{'Step':<20} {'Wall ms':>10} {'CPU ms':>10} {'% Wall':>8}",
+        "-" * 52
+    ]
+    for step in profile['steps']:
+        share = step['wall_ms'] / profile['wall_ms'] * 100 if profile['wall_ms'] else 0
+        lines.append(f"{step['step']:<20} {step['wall_ms']:>10.1f} {step['cpu_ms']:>10.1f} {share:>7.1f}%")
+
+    lines += [
+        "",
+        f"{'Query':<20} {'Requests':>9} {'Network ms':>11} {'Decode ms':>10} {'KB':>10} {'Events':>8}",
+        "-" * 73
+    ]
+    for query in profile['queries']:
+        lines.append(f"{query['query']:<20} {query['requests']:>9} {query['network_ms']:>11.1f} "
+                     f"{query['decode_ms']:>10.1f} {query['bytes'] / 1024:>10.1f} {query['events']:>8}")
+    return lines
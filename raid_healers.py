@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Raid-Wide Healer Analysis
+
+analyze_druid.py analyzes one Restoration Druid, although the composition it
+fetches already names every Holy Paladin, Holy/Discipline Priest and
+Restoration Shaman in the fight. Analyzing each of them separately would
+repeat the whole pipeline once per healer.
+
+This mode analyzes every healer of a fight from one shared fetch:
+
+  1. The fights query (same as analyze_druid.py)
+  2. One report query with the Summary table (composition), the Healing table
+     without sourceID (one entry per healer, with its per-spell breakdown),
+     playerDetails (gear, for haste) and the report's ability names
+  3. One paginated Casts stream covering all healers, split by source in memory
+
+Each healer gets an HPS breakdown by spell, a cast mix, gear haste and GCD.
+With --dataset the rows are added to the per-spec datasets in data/t6/healers
+(see datasets.HEALER_SPEC_DATASETS).
+
+Usage:
+    python raid_healers.py <report_id> <boss_name> [--fight ID] [--phase N] [--dataset NAME]
+
+Examples:
+    python raid_healers.py wX7H9RtYJ48P1cdW Brutallus
+    python raid_healers.py m329HYcBhMdfJgXz "M'uru" --phase 2 --dataset muru_p2
+"""
+
+import os
+import csv
+import argparse
+from datetime import datetime
+import numpy as np
+import phases
+from all_pulls import get_headers, fetch_pull_events
+from analyze_druid import (
+    api_request_with_retry, calculate_gcd, detect_phases, get_healer_composition, FIGHTS_QUERY
+)
+from datasets import (
+    DATASET_ENCOUNTERS, HEALER_CSV_FIELDNAMES, HEALER_SPEC_DATASETS, get_healer_dataset_path, publish_dataset
+)
+from tbc_haste_items import calculate_gear_haste
+
+TOP_SPELLS = 3  # spells/casts per healer written to the datasets
+
+
+def select_fight(fights, boss_name, fight_id=None):
+    """Pick a boss pull: fight_id if given, else the first kill, else the first pull."""
+    boss_fights = [f for f in fights if f.get("encounterID", 0) > 0 and f.get("name") == boss_name]
+    if not boss_fights:
+        raise Exception(f"Boss '{boss_name}' not found in report!")
+
+    if fight_id is not None:
+        fight = next((f for f in boss_fights if f["id"] == fight_id), None)
+        if fight is None:
+            raise Exception(f"Fight {fight_id} is not a {boss_name} pull!")
+        return fight
+
+    boss_kills = [f for f in boss_fights if f.get("kill")]
+    return boss_kills[0] if boss_kills else boss_fights[0]
+
+
+def find_combatant(player_details, player_id):
+    """A player's playerDetails entry (any role), or None."""
+    for role in ("healers", "tanks", "dps"):
+        for player in player_details.get(role, []):
+            if player.get("id") == player_id:
+                return player
+    return None
+
+
+def healer_haste(combatant):
+    """Gear haste, summary haste and GCD of a playerDetails entry."""
+    combatant_info = (combatant or {}).get("combatantInfo") or {}
+    if not isinstance(combatant_info, dict):
+        combatant_info = {}
+
+    stats = combatant_info.get("stats", {})
+    haste_summary = stats.get("Haste", {}).get("max", 0) if stats.get("Haste") else 0
+    haste_gear = calculate_gear_haste(combatant_info.get("gear", []))["total_haste"]
+
+    return {
+        "haste_summary": haste_summary,
+        "haste_gear": haste_gear,
+        "gcd": calculate_gcd(haste_gear),
+        "has_gear": bool(combatant_info.get("gear"))
+    }
+
+
+def spell_breakdown(healing_entry, duration_seconds):
+    """
+    Per-spell HPS of one Healing table entry, highest first.
+
+    Returns:
+        List of {'id', 'name', 'healing', 'hps', 'percent'}
+    """
+    abilities = healing_entry.get("abilities") or []
+    total = healing_entry.get("total", 0) or sum(a.get("total", 0) for a in abilities)
+
+    spells = [
+        {
+            "id": ability.get("guid") or ability.get("abilityGameID"),
+            "name": ability.get("name", "Unknown"),
+            "healing": ability.get("total", 0),
+            "hps": ability.get("total", 0) / duration_seconds if duration_seconds > 0 else 0,
+            "percent": ability.get("total", 0) / total * 100 if total > 0 else 0
+        }
+        for ability in abilities
+    ]
+    spells.sort(key=lambda spell: spell["healing"], reverse=True)
+    return spells
+
+
+def cast_mix_by_source(cast_events, source_ids, ability_names):
+    """
+    Count every healer's casts by ability from one shared Casts stream.
+
+    Args:
+        cast_events: Casts events of all healers (begincast events are ignored)
+        source_ids: Actor IDs of the healers
+        ability_names: Dict of ability ID -> name
+
+    Returns:
+        Dict of source ID -> list of {'id', 'name', 'casts', 'percent'}, most cast first
+    """
+    casts = [e for e in cast_events if e.get("type") == "cast"]
+    sources = np.array([e.get("sourceID", -1) for e in casts], dtype=np.int64)
+    abilities = np.array([e.get("abilityGameID", 0) for e in casts], dtype=np.int64)
+
+    mix = {}
+    for source_id in source_ids:
+        ids, counts = np.unique(abilities[sources == source_id], return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        total = int(counts.sum())
+        mix[source_id] = [
+            {
+                "id": int(ids[i]),
+                "name": ability_names.get(int(ids[i]), f"Unknown ({int(ids[i])})"),
+                "casts": int(counts[i]),
+                "percent": counts[i] / total * 100
+            }
+            for i in order
+        ]
+    return mix
+
+
+def analyze_raid_healers(report_code, boss_name, fight_id=None, phase=None):
+    """
+    Analyze every healer of a fight from one shared fetch.
+
+    Args:
+        report_code: The report code/ID
+        boss_name: The name of the boss
+        fight_id: Optional fight to analyze (default: the first kill, else the first pull)
+        phase: Optional phase number (see phases.PHASE_REGISTRY)
+
+    Returns:
+        Dict with the fight details and 'healers', a list of per-healer dicts
+        (name, id, spec, hps, overheal_percent, haste, casts, spells, cast_mix)
+    """
+    headers = get_headers()
+
+    print(f"Fetching fights for report {report_code}...")
+    response = api_request_with_retry(
+        query=FIGHTS_QUERY,
+        variables={"code": report_code},
+        headers=headers,
+        query_description="Fetch fights"
+    )
+    if not response or response.status_code != 200:
+        raise Exception(f"Query failed: {response.status_code} - {response.text}")
+
+    result = response.json()
+    if "errors" in result:
+        raise Exception(f"GraphQL errors: {result['errors']}")
+
+    report = result.get("data", {}).get("reportData", {}).get("report")
+    if not report:
+        raise Exception(f"Report {report_code} not found!")
+
+    fight = select_fight(report.get("fights", []), boss_name, fight_id)
+    report_start_time = report.get("startTime", 0)
+    all_actors = report.get("masterData", {}).get("actors", [])
+    start_time = fight["startTime"]
+    end_time = fight["endTime"]
+    print(f"✓ Found {boss_name} (Fight ID: {fight['id']}, {'KILL' if fight.get('kill') else 'WIPE'})")
+
+    if phase is not None:
+        phase_info = detect_phases(report_code, fight, all_actors, headers)
+        window = phases.get_phase_window(phase_info["transitions"], phase, end_time - start_time) \
+            if phase_info["has_phases"] else None
+        if window is None:
+            raise Exception(f"Phase {phase} not found in this fight!")
+        start_time, end_time = fight["startTime"] + window[0], fight["startTime"] + window[1]
+        print(f"✓ Analyzing {phases.get_phase_name(fight.get('encounterID'), phase)}")
+
+    duration_seconds = (end_time - start_time) / 1000
+
+    # Composition, every healer's healing, gear and the ability names in one request
+    print("Querying composition, healing and player details for all healers...")
+    raid_query = f"""
+    query {{
+      reportData {{
+        report(code: "{report_code}") {{
+          summary: table(fightIDs: {[fight['id']]}, dataType: Summary)
+          healing: table(fightIDs: {[fight['id']]}, dataType: Healing, startTime: {start_time}, endTime: {end_time})
+          playerDetails(fightIDs: {[fight['id']]}, includeCombatantInfo: true)
+          masterData {{
+            abilities {{
+              gameID
+              name
+            }}
+          }}
+        }}
+      }}
+    }}
+    """
+
+    response = api_request_with_retry(
+        query=raid_query,
+        headers=headers,
+        query_description="Fetch raid healing"
+    )
+    if not response or response.status_code != 200:
+        raise Exception(f"Query failed: {response.status_code} - {response.text}")
+
+    result = response.json()
+    if "errors" in result:
+        raise Exception(f"GraphQL errors: {result['errors']}")
+
+    report = result.get("data", {}).get("reportData", {}).get("report") or {}
+    summary_data = (report.get("summary") or {}).get("data") or {}
+    healing_entries = ((report.get("healing") or {}).get("data") or {}).get("entries", [])
+    player_details = ((report.get("playerDetails") or {}).get("data") or {}).get("playerDetails", {})
+    ability_names = {a.get("gameID"): a.get("name") for a in (report.get("masterData") or {}).get("abilities", [])}
+
+    if not summary_data:
+        raise Exception("Table data not available (might require subscription for archived reports)")
+
+    composition = summary_data.get("composition", [])
+    healer_composition = get_healer_composition(composition)
+    name_to_id = {p.get("name"): p.get("id") for p in composition}
+    name_to_id.update({a.get("name"): a.get("id") for a in all_actors if a.get("name") not in name_to_id})
+
+    healers = [
+        (name, name_to_id.get(name), spec)
+        for spec, names in healer_composition.items()
+        for name in names
+        if name_to_id.get(name) is not None
+    ]
+    print(f"✓ Found {len(healers)} healers")
+
+    # All healers' casts in one paginated stream
+    source_ids = [healer_id for _, healer_id, _ in healers]
+    cast_events = fetch_pull_events(
+        report_code, [fight["id"]],
+        f'dataType: Casts, filterExpression: "source.id IN ({", ".join(str(i) for i in source_ids)})"',
+        start_time, end_time, headers, "Fetch raid healer casts"
+    ) if source_ids else []
+    print(f"✓ Found {len(cast_events)} cast events")
+
+    cast_mix = cast_mix_by_source(cast_events, source_ids, ability_names)
+    healing_by_id = {entry.get("id"): entry for entry in healing_entries}
+
+    results = []
+    for name, healer_id, spec in healers:
+        entry = healing_by_id.get(healer_id, {})
+        total_healing = entry.get("total", 0)
+        overheal = entry.get("overheal", 0)
+        casts = sum(c["casts"] for c in cast_mix[healer_id])
+
+        results.append({
+            "name": name,
+            "id": healer_id,
+            "spec": spec,
+            "total_healing": total_healing,
+            "hps": total_healing / duration_seconds if duration_seconds > 0 else 0,
+            "overheal_percent": overheal / (total_healing + overheal) * 100 if total_healing + overheal > 0 else 0,
+            "haste": healer_haste(find_combatant(player_details, healer_id)),
+            "casts": casts,
+            "casts_per_minute": casts / (duration_seconds / 60) if duration_seconds > 0 else 0,
+            "spells": spell_breakdown(entry, duration_seconds),
+            "cast_mix": cast_mix[healer_id]
+        })
+
+    results.sort(key=lambda healer: healer["hps"], reverse=True)
+
+    return {
+        "report_code": report_code,
+        "boss_name": boss_name,
+        "fight_id": fight["id"],
+        "is_kill": fight.get("kill", False),
+        "phase": phase,
+        "timestamp": report_start_time + start_time,
+        "duration_seconds": duration_seconds,
+        "total_healers": len(healers),
+        "healers": results
+    }
+
+
+def print_raid_healers(data):
+    """Print one line per healer with their top spells."""
+    print()
+    print("=" * 110)
+    print(f"RAID HEALERS - {data['boss_name']} (Fight {data['fight_id']}, "
+          f"{'KILL' if data['is_kill'] else 'WIPE'}, {data['duration_seconds']:.0f}s)")
+    print("=" * 110)
+    print(f"{'Name':<16} {'Spec':<20} {'HPS':>8} {'Overheal':>9} {'Haste':>6} {'GCD':>6} {'CPM':>6}  Top spells")
+    print("-" * 110)
+
+    for healer in data["healers"]:
+        top_spells = ", ".join(f"{s['name']} {s['percent']:.0f}%" for s in healer["spells"][:TOP_SPELLS])
+        print(f"{healer['name']:<16} {healer['spec']:<20} {healer['hps']:>8.1f} {healer['overheal_percent']:>8.1f}% "
+              f"{healer['haste']['haste_gear']:>6} {healer['haste']['gcd']:>6.3f} {healer['casts_per_minute']:>6.1f}  "
+              f"{top_spells}")
+
+    print("=" * 110)
+
+
+def build_healer_row(data, healer, report_date):
+    """
+    Build a per-spec dataset row for one healer.
+
+    Args:
+        data: Result dict from analyze_raid_healers
+        healer: One entry of data['healers']
+        report_date: Date string of the fight
+
+    Returns:
+        Dict keyed by HEALER_CSV_FIELDNAMES (Rank is recomputed on save)
+    """
+    duration = int(data['duration_seconds'])
+    row = {
+        'Rank': 0,
+        'Name': healer['name'],
+        'Spec': healer['spec'],
+        'Date': report_date,
+        'Duration': f"{duration // 60}m {duration % 60}s",
+        'ReportID': data['report_code'],
+        'FightID': data['fight_id'],
+        'ReportLink': f"https://classic.warcraftlogs.com/reports/{data['report_code']}?fight={data['fight_id']}&source={healer['id']}&type=healing",
+        'HPS': round(healer['hps'], 2),
+        'OverhealPercent': round(healer['overheal_percent'], 2),
+        'HasteSummary': healer['haste']['haste_summary'],
+        'HasteGear': healer['haste']['haste_gear'],
+        'GCD': round(healer['haste']['gcd'], 3),
+        'Casts': healer['casts'],
+        'CastsPerMinute': round(healer['casts_per_minute'], 2),
+        'TotalHealers': data['total_healers']
+    }
+
+    for n in range(1, TOP_SPELLS + 1):
+        spell = healer['spells'][n - 1] if len(healer['spells']) >= n else None
+        row[f'Spell{n}'] = spell['name'] if spell else ''
+        row[f'Spell{n}HPS'] = round(spell['hps'], 2) if spell else 0
+        row[f'Spell{n}PercentHPS'] = round(spell['percent'], 2) if spell else 0
+
+        cast = healer['cast_mix'][n - 1] if len(healer['cast_mix']) >= n else None
+        row[f'Cast{n}'] = cast['name'] if cast else ''
+        row[f'Cast{n}Percent'] = round(cast['percent'], 2) if cast else 0
+
+    return row
+
+
+def save_healer_datasets(data, dataset):
+    """
+    Add a fight's healers to the per-spec datasets of one encounter.
+
+    Rows already present for the same report, fight and player are replaced.
+
+    Args:
+        data: Result dict from analyze_raid_healers
+        dataset: Dataset name (a DATASET_ENCOUNTERS key)
+    """
+    report_date = datetime.fromtimestamp(data['timestamp'] / 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+    for spec in HEALER_SPEC_DATASETS:
+        new_rows = [build_healer_row(data, h, report_date) for h in data['healers'] if h['spec'] == spec]
+        if not new_rows:
+            continue
+
+        path = get_healer_dataset_path(dataset, spec)
+        rows = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+
+        new_keys = {(r['ReportID'], str(r['FightID']), r['Name']) for r in new_rows}
+        rows = [r for r in rows if (r.get('ReportID'), str(r.get('FightID')), r.get('Name')) not in new_keys]
+        rows.extend(new_rows)
+
+        rows.sort(key=lambda r: float(r.get('HPS', 0) or 0), reverse=True)
+        for i, row in enumerate(rows, start=1):
+            row['Rank'] = i
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=HEALER_CSV_FIELDNAMES)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+
+        publish_dataset(path)
+        print(f"✓ Saved {len(new_rows)} {spec} rows to {path} ({len(rows)} total)")
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description="Analyze every healer of a fight from one shared fetch",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python raid_healers.py wX7H9RtYJ48P1cdW Brutallus
+  python raid_healers.py m329HYcBhMdfJgXz "M'uru" --phase 2 --dataset muru_p2
+        """
+    )
+    parser.add_argument("report_code", help="WarcraftLogs report code")
+    parser.add_argument("boss_name", help="Boss name as shown in the report")
+    parser.add_argument("--fight", type=int, help="Fight ID (default: the first kill, else the first pull)")
+    parser.add_argument("--phase", type=int, choices=phases.PHASE_NUMBERS, help="Analyze one phase")
+    parser.add_argument("--dataset", choices=sorted(DATASET_ENCOUNTERS),
+                        help="Add the healers to this encounter's per-spec datasets")
+    args = parser.parse_args()
+
+    if args.dataset and DATASET_ENCOUNTERS[args.dataset]['phase'] != args.phase:
+        dataset_phase = DATASET_ENCOUNTERS[args.dataset]['phase']
+        needed = f"--phase {dataset_phase}" if dataset_phase else "no --phase"
+        print(f"✗ Error: dataset {args.dataset} needs {needed}")
+        return 1
+
+    try:
+        data = analyze_raid_healers(args.report_code, args.boss_name, fight_id=args.fight, phase=args.phase)
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        return 1
+
+    print_raid_healers(data)
+
+    if args.dataset:
+        save_healer_datasets(data, args.dataset)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Incremental Weekly Refresh for the data/t6 Datasets
+
+Keeps every dataset in DATASETS_BEST / DATASETS_ALL up to date without
+re-crawling it from scratch. For each dataset a watermark (the start time of
+the newest parse already merged) is stored in a state file; a refresh only
+analyzes rankings and parses newer than that watermark, then merges the new
+rows into the CSV with an atomic replace.
+
+Usage:
+    python refresh_datasets.py [--dataset NAME ...] [--source best|all|both]
+    python refresh_datasets.py --daemon [--interval-days 7]
+
+Examples:
+    python refresh_datasets.py
+    python refresh_datasets.py --dataset brutallus --dataset muru_p1 --source best
+    python refresh_datasets.py --daemon
+"""
+
+import os
+import csv
+import json
+import time
+import requests
+from datetime import datetime, timedelta
+from analyze_druid import analyze_druid_performance
+from analyze_top_rankings import API_URL, check_rate_limit, wait_for_rate_limit, HIGH_USAGE_THRESHOLD
+from fetch_all_reports import get_headers, get_character_id_from_report, get_all_parses_for_character, build_report_row
+from datasets import DATASETS_BEST, DATASETS_ALL, DATASET_ENCOUNTERS, CSV_FIELDNAMES, publish_dataset
+
+# Refresh configuration
+STATE_FILE = "data/t6/refresh_state.json"
+REFRESH_INTERVAL_DAYS = 7
+BASE_DELAY = 2.0  # Delay between analyses in seconds
+SAVE_INTERVAL = 10  # Checkpoint the dataset every N new entries
+RATE_CHECK_INTERVAL = 10  # Check rate limit every N analyses
+WATERMARK_MARGIN_MS = 24 * 60 * 60 * 1000  # Re-scan one day before a derived watermark
+DATE_FORMATS = ["%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M"]
+
+
+def load_state():
+    """Load the refresh state (watermarks and cached character IDs)."""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"datasets": {}, "character_ids": {}}
+
+
+def save_state(state):
+    """Atomically write the refresh state file."""
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def load_rows(path):
+    """Load all rows of a dataset CSV (empty list if it doesn't exist yet)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows_atomic(path, rows):
+    """
+    Sort rows by HPS, recompute ranks and replace the dataset file atomically.
+
+    The CSV is written to a temporary file next to the target and then moved
+    into place with os.replace, so the web app never reads a half-written file.
+    The Arrow copy is regenerated the same way.
+    """
+    rows.sort(key=lambda x: float(x.get('HPS', 0) or 0), reverse=True)
+    for i, row in enumerate(rows, start=1):
+        row['Rank'] = i
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    os.replace(tmp_path, path)
+    publish_dataset(path)
+
+
+def derive_watermark(rows):
+    """
+    Derive a starting watermark from the newest Date in an existing dataset.
+
+    Used the first time a dataset is refreshed, before any watermark has been
+    recorded. Returns a report start time in milliseconds (0 if unknown).
+    """
+    newest = None
+    for row in rows:
+        date_str = (row.get('Date') or '').strip()
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(date_str, date_format)
+            except ValueError:
+                continue
+            if newest is None or parsed > newest:
+                newest = parsed
+            break
+
+    if newest is None:
+        return 0
+    return max(0, int(newest.timestamp() * 1000) - WATERMARK_MARGIN_MS)
+
+
+def get_watermark(state, dataset, data_source, rows):
+    """Return the stored watermark for a dataset, deriving one if needed."""
+    entry = state["datasets"].get(dataset, {}).get(data_source)
+    if entry and entry.get("watermark") is not None:
+        return entry["watermark"]
+    return derive_watermark(rows)
+
+
+def set_watermark(state, dataset, data_source, watermark, added):
+    """Record a successful refresh for a dataset."""
+    state["datasets"].setdefault(dataset, {})[data_source] = {
+        "watermark": watermark,
+        "last_run": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "added": added
+    }
+
+
+def fetch_new_rankings(encounter_id, watermark):
+    """
+    Page through the Restoration Druid rankings and keep entries newer than the watermark.
+
+    Rankings are ordered by HPS rather than date, so every page is scanned, but
+    rankings pages are cheap compared to analyzing a single report.
+
+    Args:
+        encounter_id: The WarcraftLogs encounter ID
+        watermark: Report start time in milliseconds; older parses are ignored
+
+    Returns:
+        Tuple of (new_rankings list, encounter_name)
+    """
+    query = """
+    query ($encounterId: Int!, $page: Int!) {
+      worldData {
+        encounter(id: $encounterId) {
+          name
+          characterRankings(
+            className: "Druid"
+            specName: "Restoration"
+            metric: hps
+            page: $page
+          )
+        }
+      }
+    }
+    """
+
+    new_rankings = []
+    encounter_name = None
+    page = 1
+    has_more = True
+
+    while has_more:
+        print(f"  Fetching rankings page {page}...")
+        response = requests.post(
+            API_URL,
+            json={"query": query, "variables": {"encounterId": encounter_id, "page": page}},
+            headers=get_headers(),
+            timeout=60
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Query failed: {response.status_code} - {response.text}")
+
+        result = response.json()
+        if "errors" in result:
+            raise Exception(f"GraphQL errors: {result['errors']}")
+
+        encounter_data = result.get("data", {}).get("worldData", {}).get("encounter")
+        if not encounter_data:
+            raise Exception(f"Encounter {encounter_id} not found!")
+
+        if encounter_name is None:
+            encounter_name = encounter_data.get("name", "Unknown")
+
+        rankings_json = encounter_data.get("characterRankings")
+        if not rankings_json or not isinstance(rankings_json, dict):
+            break
+
+        for ranking in rankings_json.get("rankings", []):
+            start_time = ranking.get("startTime") or ranking.get("report", {}).get("startTime", 0)
+            if start_time > watermark and ranking.get("name") != "Anonymous":
+                new_rankings.append(ranking)
+
+        has_more = rankings_json.get("hasMorePages", False)
+        page += 1
+
+    return new_rankings, encounter_name
+
+
+def pace_requests(analyzed_count):
+    """Sleep between analyses and pause when the hourly budget is nearly spent."""
+    if analyzed_count % RATE_CHECK_INTERVAL == 0:
+        rate_status = check_rate_limit()
+        percent_used = rate_status['percentUsed']
+        print(f"  📊 Rate check: {rate_status['pointsSpentThisHour']}/{rate_status['limitPerHour']} ({percent_used:.1f}%)")
+        if percent_used >= HIGH_USAGE_THRESHOLD * 100:
+            print(f"  🛑 Usage at {percent_used:.1f}% - pausing to avoid hitting rate limit")
+            wait_for_rate_limit()
+    time.sleep(BASE_DELAY)
+
+
+def merge_best_row(rows, new_row):
+    """
+    Merge a new row into a best-report-per-player dataset.
+
+    The player's existing row is replaced if the new parse has higher HPS;
+    otherwise the new row is dropped.
+    """
+    player_key = (new_row['Name'], new_row['Server'], new_row['Region'])
+    for i, row in enumerate(rows):
+        if (row.get('Name'), row.get('Server'), row.get('Region')) == player_key:
+            if float(new_row.get('HPS', 0) or 0) > float(row.get('HPS', 0) or 0):
+                rows[i] = new_row
+            return
+    rows.append(new_row)
+
+
+def refresh_best(dataset, state):
+    """
+    Incrementally refresh a best-report-per-player dataset.
+
+    Returns:
+        Number of new parses analyzed and merged
+    """
+    path = DATASETS_BEST[dataset]
+    encounter = DATASET_ENCOUNTERS[dataset]
+    rows = load_rows(path)
+    watermark = get_watermark(state, dataset, 'best', rows)
+    existing_reports = {row.get('ReportID') for row in rows}
+
+    print(f"[{dataset} / best] Watermark: {watermark} ({len(rows)} existing rows)")
+    rankings, encounter_name = fetch_new_rankings(encounter['encounter_id'], watermark)
+    rankings = [r for r in rankings if r.get("report", {}).get("code") not in existing_reports]
+    print(f"  {len(rankings)} new rankings since last refresh")
+
+    new_watermark = watermark
+    failed_start_times = []
+    added = 0
+
+    for ranking in rankings:
+        report_code = ranking.get("report", {}).get("code")
+        player_name = ranking.get("name", "Unknown")
+        server_info = ranking.get("server", {})
+        start_time = ranking.get("startTime") or ranking.get("report", {}).get("startTime", 0)
+
+        print(f"    Analyzing {player_name} (Report: {report_code})...")
+        try:
+            data = analyze_druid_performance(report_code, encounter_name, player_name, encounter['phase'])
+            row = build_report_row(data, player_name, server_info.get("name", "Unknown"),
+                                   server_info.get("region", "Unknown"), report_code)
+        except Exception as e:
+            print(f"      Error analyzing report: {e}")
+            failed_start_times.append(start_time)
+            continue
+
+        merge_best_row(rows, row)
+        existing_reports.add(report_code)
+        new_watermark = max(new_watermark, start_time)
+        added += 1
+
+        if added % SAVE_INTERVAL == 0:
+            write_rows_atomic(path, rows)
+        pace_requests(added)
+
+    if added:
+        write_rows_atomic(path, rows)
+
+    # Failed parses keep the watermark below them so the next refresh retries them
+    if failed_start_times:
+        new_watermark = min(new_watermark, min(failed_start_times) - 1)
+    set_watermark(state, dataset, 'best', new_watermark, added)
+    save_state(state)
+
+    print(f"  ✓ {dataset} / best: {added} new entries, {len(failed_start_times)} failed")
+    return added
+
+
+def refresh_all(dataset, state):
+    """
+    Incrementally refresh an all-reports-per-player dataset.
+
+    Players come from the matching best dataset. Character IDs are cached in
+    the state file so each player costs a single parses query per refresh.
+
+    Returns:
+        Number of new parses analyzed and merged
+    """
+    path = DATASETS_ALL[dataset]
+    encounter = DATASET_ENCOUNTERS[dataset]
+    rows = load_rows(path)
+    watermark = get_watermark(state, dataset, 'all', rows)
+    existing_reports = {row.get('ReportID') for row in rows}
+    players = load_rows(DATASETS_BEST[dataset])
+    character_ids = state.setdefault("character_ids", {})
+
+    print(f"[{dataset} / all] Watermark: {watermark} ({len(rows)} existing rows, {len(players)} players)")
+
+    new_watermark = watermark
+    failed_start_times = []
+    processed_characters = set()
+    encounter_name = None
+    added = 0
+
+    for player in players:
+        player_name = player.get('Name')
+        player_server = player.get('Server')
+        player_region = player.get('Region')
+        player_key = f"{player_name}-{player_server}-{player_region}"
+
+        character_id = character_ids.get(player_key)
+        if not character_id:
+            character_id = get_character_id_from_report(player.get('ReportID'), None, player_name)
+            if not character_id:
+                continue
+            character_ids[player_key] = character_id
+
+        if character_id in processed_characters:
+            continue
+        processed_characters.add(character_id)
+
+        parses = get_all_parses_for_character(character_id, encounter['encounter_id'])
+        new_parses = [
+            p for p in parses
+            if p['start_time'] > watermark and p['report_code'] not in existing_reports
+        ]
+        if not new_parses:
+            continue
+
+        if encounter_name is None:
+            encounter_name = get_encounter_name(encounter['encounter_id'])
+
+        print(f"  {player_name}: {len(new_parses)} new parses")
+        for parse in new_parses:
+            report_code = parse['report_code']
+            try:
+                data = analyze_druid_performance(report_code, encounter_name, player_name, encounter['phase'])
+                row = build_report_row(data, player_name, player_server, player_region, report_code)
+            except Exception as e:
+                print(f"      Error analyzing report {report_code}: {e}")
+                failed_start_times.append(parse['start_time'])
+                continue
+
+            rows.append(row)
+            existing_reports.add(report_code)
+            new_watermark = max(new_watermark, parse['start_time'])
+            added += 1
+
+            if added % SAVE_INTERVAL == 0:
+                write_rows_atomic(path, rows)
+            pace_requests(added)
+
+    if added:
+        write_rows_atomic(path, rows)
+
+    if failed_start_times:
+        new_watermark = min(new_watermark, min(failed_start_times) - 1)
+    set_watermark(state, dataset, 'all', new_watermark, added)
+    save_state(state)
+
+    print(f"  ✓ {dataset} / all: {added} new entries, {len(failed_start_times)} failed")
+    return added
+
+
+def get_encounter_name(encounter_id):
+    """Look up the encounter name used to find the boss fight in reports."""
+    query = f"""
+    query {{
+      worldData {{
+        encounter(id: {encounter_id}) {{
+          name
+        }}
+      }}
+    }}
+    """
+    response = requests.post(API_URL, json={"query": query}, headers=get_headers(), timeout=30)
+    if response.status_code != 200:
+        raise Exception(f"Query failed: {response.status_code} - {response.text}")
+    return response.json().get("data", {}).get("worldData", {}).get("encounter", {}).get("name", "Unknown")
+
+
+def run_refresh(datasets, sources):
+    """
+    Refresh the given datasets once.
+
+    Args:
+        datasets: List of dataset names (keys of DATASET_ENCOUNTERS)
+        sources: List containing 'best' and/or 'all'
+
+    Returns:
+        Total number of new entries merged
+    """
+    state = load_state()
+    total_added = 0
+
+    for dataset in datasets:
+        # Best datasets first: the all-reports refresh reads its players from them
+        if 'best' in sources:
+            try:
+                total_added += refresh_best(dataset, state)
+            except Exception as e:
+                print(f"  ERROR refreshing {dataset} / best: {e}")
+        if 'all' in sources and dataset in DATASETS_ALL:
+            try:
+                total_added += refresh_all(dataset, state)
+            except Exception as e:
+                print(f"  ERROR refreshing {dataset} / all: {e}")
+
+    return total_added
+
+
+def main():
+    """Main execution function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Incrementally refresh the data/t6 datasets from WarcraftLogs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Available datasets: {', '.join(DATASET_ENCOUNTERS)}
+
+Examples:
+  python refresh_datasets.py
+  python refresh_datasets.py --dataset brutallus --source best
+  python refresh_datasets.py --daemon --interval-days 7
+        """
+    )
+
+    parser.add_argument("--dataset", "-d", action="append", choices=list(DATASET_ENCOUNTERS),
+                        help="Dataset to refresh (repeatable, default: all datasets)")
+    parser.add_argument("--source", "-s", choices=["best", "all", "both"], default="both",
+                        help="Which dataset family to refresh (default: both)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and refresh on a fixed interval")
+    parser.add_argument("--interval-days", type=float, default=REFRESH_INTERVAL_DAYS,
+                        help=f"Days between refreshes in daemon mode (default: {REFRESH_INTERVAL_DAYS})")
+
+    args = parser.parse_args()
+
+    datasets = args.dataset or list(DATASET_ENCOUNTERS)
+    sources = ['best', 'all'] if args.source == 'both' else [args.source]
+
+    while True:
+        print("=" * 80)
+        print(f"DATASET REFRESH - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 80)
+
+        total_added = run_refresh(datasets, sources)
+
+        print()
+        print(f"✓ Refresh complete: {total_added} new entries merged")
+
+        if not args.daemon:
+            return 0
+
+        next_run = datetime.now() + timedelta(days=args.interval_days)
+        print(f"⏰ Next refresh at {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+        time.sleep(args.interval_days * 24 * 60 * 60)
+
+
+if __name__ == "__main__":
+    exit(main())
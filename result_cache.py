@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Shared Result Cache for /api/analyze-report
+
+Finished analysis payloads are stored in a SQLite file shared by every web
+worker process, keyed by (report_code, boss_name, player_name, phase). A
+repeat analysis is then served from disk without any WarcraftLogs API spend.
+
+Entries expire after RESULT_CACHE_MAX_AGE_SECONDS, and the least recently used
+entries are evicted once the cache grows past RESULT_CACHE_MAX_BYTES. Hits,
+misses and evictions are counted for the stats endpoint.
+
+Usage:
+    python result_cache.py          # show cache stats
+    python result_cache.py clear    # empty the cache
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+
+RESULT_CACHE_PATH = os.environ.get('LIFEBLOOM_RESULT_CACHE', 'data/result_cache.db')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('LIFEBLOOM_RESULT_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+RESULT_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+# Bump when the analysis output changes so stale payloads are never served:
+# new or removed payload keys, and fixes that change the values of existing
+# ones. test_result_cache.py catches key changes that weren't bumped.
+RESULT_CACHE_VERSION = 4
+
+STAT_NAMES = ['hits', 'misses', 'stores', 'evictions']
+
+
+def get_connection():
+    """Open a connection to the result cache, creating it if needed."""
+    conn = sqlite3.connect(RESULT_CACHE_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            cache_key TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            bytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_used ON results (last_used_at)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    return conn
+
+
+def get_cache_key(report_code, boss_name, player_name, phase=None):
+    """Cache key for one analysis request."""
+    return f"v{RESULT_CACHE_VERSION}|{report_code}|{boss_name}|{player_name}|{phase or 0}"
+
+
+def increment_stat(conn, name, amount=1):
+    """Add to one of the STAT_NAMES counters."""
+    conn.execute(
+        "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+        (name, amount, amount)
+    )
+
+
+def get_cached_result(report_code, boss_name, player_name, phase=None):
+    """
+    Look up a finished analysis.
+
+    Returns:
+        Serialized JSON payload (str), or None on a miss
+    """
+    key = get_cache_key(report_code, boss_name, player_name, phase)
+    now = time.time()
+    conn = get_connection()
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT payload FROM results WHERE cache_key = ? AND created_at >= ?",
+                (key, now - RESULT_CACHE_MAX_AGE_SECONDS)
+            ).fetchone()
+            if row is None:
+                increment_stat(conn, 'misses')
+                return None
+            conn.execute("UPDATE results SET last_used_at = ? WHERE cache_key = ?", (now, key))
+            increment_stat(conn, 'hits')
+    finally:
+        conn.close()
+
+    return zlib.decompress(row[0]).decode('utf-8')
+
+
+def store_result(report_code, boss_name, player_name, phase, payload):
+    """
+    Store a finished analysis payload and evict expired or excess entries.
+
+    Args:
+        payload: Serialized JSON payload (str)
+    """
+    key = get_cache_key(report_code, boss_name, player_name, phase)
+    blob = zlib.compress(payload.encode('utf-8'))
+    now = time.time()
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (cache_key, payload, bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now)
+            )
+            increment_stat(conn, 'stores')
+            evict_entries(conn, now)
+    finally:
+        conn.close()
+
+
+def evict_entries(conn, now):
+    """Drop expired entries, then least recently used ones until under the size cap."""
+    evicted = conn.execute(
+        "DELETE FROM results WHERE created_at < ?", (now - RESULT_CACHE_MAX_AGE_SECONDS,)
+    ).rowcount
+
+    total_bytes = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+    if total_bytes > RESULT_CACHE_MAX_BYTES:
+        for key, size in conn.execute("SELECT cache_key, bytes FROM results ORDER BY last_used_at").fetchall():
+            if total_bytes <= RESULT_CACHE_MAX_BYTES:
+                break
+            conn.execute("DELETE FROM results WHERE cache_key = ?", (key,))
+            total_bytes -= size
+            evicted += 1
+
+    if evicted:
+        increment_stat(conn, 'evictions', evicted)
+
+
+def get_cache_stats():
+    """Entry count, size and hit-rate counters for the result cache."""
+    conn = get_connection()
+    try:
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM results").fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+    finally:
+        conn.close()
+
+    stats = {name: counters.get(name, 0) for name in STAT_NAMES}
+    lookups = stats['hits'] + stats['misses']
+    stats.update({
+        'entries': entries,
+        'bytes': total_bytes,
+        'max_bytes': RESULT_CACHE_MAX_BYTES,
+        'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0
+    })
+    return stats
+
+
+def clear_cache():
+    """Remove every cached result and reset the counters."""
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM stats")
+    finally:
+        conn.close()
+
+
+def main():
+    """Main execution function"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        clear_cache()
+        print("✓ Result cache cleared")
+        return 0
+
+    print(json.dumps(get_cache_stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Test script to verify all-pulls mode matches analyzing each pull on its own
+
+Runs analyze_all_pulls and then analyze_druid_performance for every pull of a
+simulated three-pull report, both against a fake WarcraftLogs API that serves
+the report's events (requests.post is replaced for the run, no token or
+network needed). The page limit is lowered so both paths have to follow
+nextPageTimestamp. Checks that:
+
+  - every pull's analysis payload is identical in both modes, and identical
+    to a single-fight run that fits every stream in one page
+  - no casts are lost to paging
+  - all-pulls mode makes fewer requests
+"""
+
+import os
+import io
+import re
+import json
+import random
+import contextlib
+
+# A long-lived token from the environment, so auth never starts the browser flow
+os.environ.setdefault('WARCRAFTLOGS_TOKEN_JSON', json.dumps({"access_token": "test"}))
+os.environ.setdefault('LIFEBLOOM_METRICS_DUMP_INTERVAL', '0')
+
+import analyze_druid
+import all_pulls
+from jobs import build_analysis_response
+
+REPORT_CODE = 'TestReport'
+BOSS_NAME = 'Brutallus'
+PLAYER_NAME = 'Druid'
+DRUID_ID, TANK_IDS, BOSS_ID, PRIEST_ID = 10, (11, 12), 50, 13
+PAGE_LIMIT = 7  # below every stream of every pull, so all of them are paged
+UNPAGED_LIMIT = 10000  # above every stream, for the reference run without paging
+
+PULLS = [(0, 60000, False), (100000, 160000, False), (200000, 290000, True)]
+SPELLS = [analyze_druid.LIFEBLOOM_ID, analyze_druid.REJUVENATION_ID, analyze_druid.SWIFTMEND_ID]
+ACTORS = [
+    {"id": DRUID_ID, "name": PLAYER_NAME, "type": "Player", "subType": "Druid", "gameID": 0},
+    {"id": TANK_IDS[0], "name": "Tankone", "type": "Player", "subType": "Warrior", "gameID": 0},
+    {"id": TANK_IDS[1], "name": "Tanktwo", "type": "Player", "subType": "Paladin", "gameID": 0},
+    {"id": PRIEST_ID, "name": "Shadow", "type": "Player", "subType": "Priest", "gameID": 0},
+    {"id": BOSS_ID, "name": BOSS_NAME, "type": "NPC", "subType": "Boss", "gameID": 24882},
+]
+
+
+class FakeResponse:
+    """The parts of requests.Response the analysis uses."""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.content = json.dumps(payload).encode()
+        self.text = self.content.decode()
+
+    def json(self):
+        return self.payload
+
+
+class FakeWarcraftLogs:
+    """Serves one simulated report's fights, events and tables, counting requests."""
+
+    def __init__(self, seed=7):
+        rng = random.Random(seed)
+        self.fights = [
+            {"id": i + 1, "encounterID": 725, "name": BOSS_NAME, "kill": kill, "startTime": start,
+             "endTime": end, "phaseTransitions": None}
+            for i, (start, end, kill) in enumerate(PULLS)
+        ]
+        self.events = {"Buffs": [], "Resources": [], "DamageTaken": [], "Casts": []}
+        self.requests = 0
+        self.page_requests = 0
+
+        for fight in self.fights:
+            mana = 10000
+            for t in range(fight["startTime"], fight["endTime"], 1500):
+                tank = TANK_IDS[(t // 20000) % 2]  # the boss swaps tanks every 20s
+                ability_id = rng.choice(SPELLS)
+                mana = max(mana - 300 + 120, 0)
+                self.events["Casts"].append({
+                    "timestamp": t, "type": "cast", "sourceID": DRUID_ID, "targetID": tank,
+                    "abilityGameID": ability_id, "fight": fight["id"], "resourceActor": 1,
+                    "classResources": [{"amount": mana, "max": 10000, "type": 0, "cost": 300}]
+                })
+                self.events["DamageTaken"].append({
+                    "timestamp": t + 3, "type": "damage", "sourceID": BOSS_ID, "targetID": tank,
+                    "abilityGameID": 1, "amount": rng.randrange(2000, 6000), "fight": fight["id"]
+                })
+            for t in range(fight["startTime"], fight["endTime"], 6000):
+                self.events["Buffs"].append({
+                    "timestamp": t, "type": "applybuff" if t == fight["startTime"] else "refreshbuff",
+                    "sourceID": DRUID_ID, "targetID": TANK_IDS[0], "abilityGameID": 33763, "fight": fight["id"]
+                })
+            for t in range(fight["startTime"] + 5, fight["endTime"], 3000):
+                self.events["Resources"].append({
+                    "timestamp": t, "type": "resourcechange", "sourceID": PRIEST_ID, "targetID": DRUID_ID,
+                    "abilityGameID": 34919, "resourceChange": 50, "resourceChangeType": 0, "waste": 0,
+                    "fight": fight["id"], "resourceActor": 2,
+                    "classResources": [{"amount": 5000, "max": 10000, "type": 0}]
+                })
+
+        for events in self.events.values():
+            events.sort(key=lambda event: event["timestamp"])
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        query, variables = json["query"], json.get("variables") or {}
+        self.requests += 1
+
+        if "masterData" in query:
+            return FakeResponse({"data": {"reportData": {"report": {
+                "title": "Test", "startTime": 1700000000000, "fights": self.fights,
+                "masterData": {"actors": ACTORS}
+            }}}})
+        if "gameData" in query:
+            ability_id = re.search(r"id: (\d+)", query).group(1)
+            return FakeResponse({"data": {"gameData": {"ability": {"name": f"Spell {ability_id}", "icon": ""}}}})
+
+        match = re.search(r"events\((.*?)\)\s*\{", query, re.S)
+        if match:
+            return FakeResponse(self.events_page(match.group(1), variables))
+
+        # Tables, rankings and player details
+        return FakeResponse({"data": {"reportData": {"report": {
+            "table": {"data": {"entries": [], "composition": []}},
+            "rankings": {"data": []},
+            "playerDetails": {"data": {"playerDetails": {
+                "tanks": [{"name": "Tankone", "id": TANK_IDS[0]}, {"name": "Tanktwo", "id": TANK_IDS[1]}],
+                "healers": [{"name": PLAYER_NAME, "id": DRUID_ID, "type": "Druid"}]
+            }}}
+        }}}})
+
+    def events_page(self, args, variables):
+        """One page of an events(...) query, filtered like the API filters it."""
+        data_type = re.search(r"dataType: (\w+)", args).group(1)
+        start_match = re.search(r"startTime: ([\d.]+)", args)
+        start = float(start_match.group(1)) if start_match else float(variables["startTime"])
+        if start not in {fight["startTime"] for fight in self.fights}:
+            self.page_requests += 1  # a page after the first
+        end = float(re.search(r"endTime: ([\d.]+)", args).group(1))
+        fight_ids = {int(i) for i in re.search(r"fightIDs: \[([\d, ]+)\]", args).group(1).split(",")}
+
+        events = [e for e in self.events[data_type] if start <= e["timestamp"] <= end and e["fight"] in fight_ids]
+        for arg, key in (("sourceID", "sourceID"), ("targetID", "targetID"), ("abilityID", "abilityGameID")):
+            value = re.search(arg + r": (\d+)", args)
+            if value:
+                events = [e for e in events if e.get(key) == int(value.group(1))]
+
+        limit = int(re.search(r"limit: (\d+)", args).group(1))
+        next_page = events[limit]["timestamp"] if len(events) > limit else None
+        return {"data": {"reportData": {"report": {"events": {"data": events[:limit], "nextPageTimestamp": next_page}}}}}
+
+
+def payload(result):
+    """The /api/analyze-report payload of a result, as JSON."""
+    return json.dumps(build_analysis_response(REPORT_CODE, result), sort_keys=True, default=str)
+
+
+def run_analyses(api, page_limit):
+    """
+    Analyze every pull in all-pulls mode, then each pull on its own.
+
+    Returns:
+        Tuple of (all-pulls results, single-fight results, all-pulls requests,
+        single-fight requests, pages after the first in each mode)
+    """
+    original_post = analyze_druid.requests.post
+    original_limits = analyze_druid.EVENTS_PAGE_LIMIT, all_pulls.EVENTS_PAGE_LIMIT
+    analyze_druid.requests.post = api.post
+    analyze_druid.EVENTS_PAGE_LIMIT = all_pulls.EVENTS_PAGE_LIMIT = page_limit
+
+    try:
+        api.requests = api.page_requests = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            batched = all_pulls.analyze_all_pulls(REPORT_CODE, BOSS_NAME, PLAYER_NAME)
+        batched_requests, batched_pages = api.requests, api.page_requests
+
+        api.requests = api.page_requests = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            single = [analyze_druid.analyze_druid_performance(REPORT_CODE, BOSS_NAME, PLAYER_NAME, fight_id=fight["id"])
+                      for fight in api.fights]
+        single_requests, single_pages = api.requests, api.page_requests
+    finally:
+        analyze_druid.requests.post = original_post
+        analyze_druid.EVENTS_PAGE_LIMIT, all_pulls.EVENTS_PAGE_LIMIT = original_limits
+
+    return batched, single, batched_requests, single_requests, batched_pages + single_pages
+
+
+def main():
+    print("Testing All-Pulls Mode")
+    print("=" * 50)
+
+    api = FakeWarcraftLogs()
+    batched, single, batched_requests, single_requests, pages = run_analyses(api, PAGE_LIMIT)
+    _, unpaged, _, _, unpaged_pages = run_analyses(api, UNPAGED_LIMIT)
+
+    failures = 0
+    if len(batched) != len(api.fights):
+        print(f"⚠ All-pulls mode analyzed {len(batched)} of {len(api.fights)} pulls")
+        return 1
+    if pages == 0 or unpaged_pages != 0:
+        print(f"⚠ Paging not exercised as intended ({pages} paged requests, {unpaged_pages} without paging)")
+        failures += 1
+
+    for (fight, batched_result), single_result, unpaged_result in zip(batched, single, unpaged):
+        name = f"Pull {fight['id']}"
+        if payload(batched_result) != payload(single_result):
+            print(f"⚠ {name}: all-pulls payload differs from the single-fight analysis")
+            failures += 1
+        elif payload(single_result) != payload(unpaged_result):
+            print(f"⚠ {name}: paged payload differs from the one-page analysis")
+            failures += 1
+        else:
+            print(f"✓ {name}: all-pulls, single-fight and one-page payloads match")
+
+        expected_casts = sum(1 for event in api.events["Casts"] if event["fight"] == fight["id"])
+        if len(single_result["cast_data"]) != expected_casts:
+            print(f"⚠ {name}: {len(single_result['cast_data'])} of {expected_casts} casts after paging")
+            failures += 1
+
+    if batched_requests >= single_requests:
+        print(f"⚠ All-pulls mode made {batched_requests} requests, single-fight mode {single_requests}")
+        failures += 1
+    else:
+        print(f"✓ {batched_requests} requests in all-pulls mode vs {single_requests} analyzing each pull")
+
+    print()
+    if failures:
+        print(f"⚠ {failures} all-pulls checks failed")
+        return 1
+    print("✓ All-pulls mode matches the single-fight analysis")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the NumPy event scans match the loops they replaced
+
+Generates seeded random event streams (plus empty ones) and compares
+count_buff_applications, damage_by_target, build_swing_timeline and
+lookup_active with the per-event loops analyze_druid.py used before.
+
+The Lifebloom interval helpers are checked the same way: buff_segments against
+a per-target state machine, covered_length/overlap_length against counting
+milliseconds, and total uptime against the old merge loop. Hand-written
+streams cover interleaved applybuffstack/refreshbuff, a target whose first
+event is a stack event, and an end_time earlier than the last event.
+
+The GCD utilization helpers are checked the same way: cast_intervals and
+idle_gaps against per-cast loops on random cast streams, and
+calculate_gcd_utilization on a hand-written stream with known busy time,
+idle gaps and latency.
+"""
+
+import random
+from collections import defaultdict
+
+import numpy as np
+
+import event_arrays
+from analyze_druid import (
+    calculate_gcd_utilization, OFF_GCD_CAST_IDS, IDLE_GAP_GCDS, LIFEBLOOM_ID, NATURES_SWIFTNESS_ID
+)
+
+SEEDS = range(20)
+PLAYER_IDS = list(range(1, 26))
+TANK_IDS = [1, 2, 3]
+BOSS_IDS = [100, 101, 102]
+BUFF_IDS = [29166, 2825, 32182, 16886, 33763]
+EVENT_TYPES = ['applybuff', 'refreshbuff', 'removebuff', 'damage', 'heal', 'cast', 'absorbed']
+BUFF_EVENT_TYPES = ['applybuff', 'refreshbuff', 'removebuff', 'applybuffstack', 'removebuffstack']
+LIFEBLOOM_TARGETS = [1, 2, 3, 7]
+FIGHT_END = 300000
+
+GCD_MS = 1500
+HEALING_TOUCH_ID = 26979
+REGROWTH_ID = 26980
+SUPER_MANA_POTION_ID = 28499
+CAST_TIMES = {LIFEBLOOM_ID: 0, HEALING_TOUCH_ID: 3000, REGROWTH_ID: 2000,
+              NATURES_SWIFTNESS_ID: 0, SUPER_MANA_POTION_ID: 0}
+
+
+def random_events(rng, count):
+    """Events with random types, actors and amounts; some keys left out like the API does."""
+    events = []
+    for _ in range(count):
+        event = {
+            "timestamp": rng.randrange(0, 300000, rng.choice([1, 250])),  # coarse steps give ties
+            "type": rng.choice(EVENT_TYPES),
+            "sourceID": rng.choice(PLAYER_IDS + BOSS_IDS),
+            "targetID": rng.choice(PLAYER_IDS + BOSS_IDS),
+            "abilityGameID": rng.choice(BUFF_IDS + [1, 2, 3])
+        }
+        if rng.random() < 0.9:
+            event["amount"] = rng.randrange(0, 20000)
+        if rng.random() < 0.3:
+            event["absorbed"] = rng.randrange(0, 5000)
+        if rng.random() < 0.05:
+            del event["sourceID"]
+        events.append(event)
+    return events
+
+
+# ===== The loops analyze_druid.py used before event_arrays =====
+
+def old_count_buff_applications(events, ability_ids, target_id):
+    return len([
+        event for event in events
+        if event.get("abilityGameID") in ability_ids and
+           event.get("type") == "applybuff" and
+           event.get("targetID") == target_id
+    ])
+
+
+def old_damage_by_target(events, source_id, player_ids):
+    damage_by_player = defaultdict(int)
+    for event in [e for e in events if e.get("sourceID") == source_id]:
+        target_id = event.get("targetID")
+        if target_id in player_ids:
+            damage_by_player[target_id] += event.get("amount", 0) + event.get("absorbed", 0)
+    return damage_by_player
+
+
+def old_swing_timeline(events, player_ids, tank_ids):
+    tank_timeline = []
+    for event in events:
+        source_id = event.get("sourceID")
+        target_id = event.get("targetID")
+        if source_id not in player_ids and event.get("type") == "damage" and target_id in tank_ids:
+            tank_timeline.append({"timestamp": event.get("timestamp"), "tank_id": target_id})
+    tank_timeline.sort(key=lambda x: x["timestamp"])
+    return tank_timeline
+
+
+def old_active_tank_at_time(timestamp, timeline):
+    active_tank_id = None
+    for swing in timeline:
+        if swing["timestamp"] <= timestamp:
+            active_tank_id = swing["tank_id"]
+        else:
+            break
+    return active_tank_id
+
+
+def old_lifebloom_uptime(lifebloom_events, query_end_time):
+    intervals = []
+    active_instances = {}
+
+    for event in sorted(lifebloom_events, key=lambda e: e.get("timestamp", 0)):
+        event_type = event.get("type")
+        target_id = event.get("targetID")
+        timestamp = event.get("timestamp")
+
+        if event_type in ["applybuff", "refreshbuff"]:
+            if target_id in active_instances:
+                intervals.append((active_instances[target_id], timestamp))
+            active_instances[target_id] = timestamp
+        elif event_type == "removebuff":
+            if target_id in active_instances:
+                intervals.append((active_instances[target_id], timestamp))
+                del active_instances[target_id]
+
+    for target_id, apply_time in active_instances.items():
+        intervals.append((apply_time, query_end_time))
+
+    if not intervals:
+        return 0
+    intervals.sort()
+    merged_intervals = [intervals[0]]
+    for current_start, current_end in intervals[1:]:
+        last_start, last_end = merged_intervals[-1]
+        if current_start <= last_end:
+            merged_intervals[-1] = (last_start, max(last_end, current_end))
+        else:
+            merged_intervals.append((current_start, current_end))
+    return sum(end - start for start, end in merged_intervals)
+
+
+# ===== Reference implementations of the interval helpers =====
+
+def reference_buff_segments(events, end_time):
+    """buff_segments() one event at a time: (target, start, end, stacks) tuples."""
+    by_target = defaultdict(list)
+    for event in sorted(events, key=lambda e: e["timestamp"]):
+        if event["type"] in BUFF_EVENT_TYPES:
+            by_target[event["targetID"]].append(event)
+
+    segments = []
+    for target_id in sorted(by_target):
+        target_events = by_target[target_id]
+        up, stack = False, 0
+        for i, event in enumerate(target_events):
+            if event["type"] == "applybuff":
+                up, stack = True, 1
+            elif event["type"] == "refreshbuff":
+                up = True
+            elif event["type"] == "removebuff":
+                up, stack = False, 0
+            else:
+                up, stack = True, event.get("stack") or 0
+
+            end = target_events[i + 1]["timestamp"] if i + 1 < len(target_events) else end_time
+            if up and event["timestamp"] < end_time:
+                segments.append((target_id, event["timestamp"], min(end, end_time), max(stack, 1)))
+    return segments
+
+
+def milliseconds(starts, ends):
+    """Set of milliseconds covered by intervals [start, end)."""
+    return {ms for start, end in zip(starts, ends) for ms in range(int(start), int(end))}
+
+
+def random_lifebloom_events(rng, count):
+    """
+    One druid's Lifebloom events on a few targets, in the order a log has them.
+
+    Stack events only happen while Lifebloom is up, as in a real log, so the
+    old loop (which ignored them) sees the same uptime.
+    """
+    events = []
+    stacks = {}
+    timestamp = 0
+    for _ in range(count):
+        timestamp += rng.choice([0, 0, 1, 250, 1000, 7000])
+        target_id = rng.choice(LIFEBLOOM_TARGETS)
+        if target_id not in stacks:
+            event_type = rng.choice(['applybuff', 'refreshbuff'])
+        else:
+            event_type = rng.choice(['refreshbuff', 'removebuff', 'applybuffstack', 'removebuffstack'])
+
+        event = {"timestamp": timestamp, "type": event_type, "sourceID": 10, "targetID": target_id,
+                 "abilityGameID": 33763}
+        if event_type == 'removebuff':
+            del stacks[target_id]
+        elif event_type in ('applybuffstack', 'removebuffstack'):
+            step = 1 if event_type == 'applybuffstack' else -1
+            stacks[target_id] = min(max(stacks[target_id] + step, 1), 3)
+            event["stack"] = stacks[target_id]
+        else:
+            stacks.setdefault(target_id, 1)
+        events.append(event)
+    return events
+
+
+def compare_intervals(events, end_time):
+    """
+    Compare the interval helpers with their references on one Lifebloom stream.
+
+    Returns:
+        List of mismatch descriptions (empty when everything matches)
+    """
+    mismatches = []
+    targets, starts, ends, stacks = event_arrays.buff_segments(event_arrays.to_event_array(events), end_time)
+
+    segments = list(zip(targets.tolist(), starts.tolist(), ends.tolist(), stacks.tolist()))
+    if segments != reference_buff_segments(events, end_time):
+        mismatches.append("buff_segments differs")
+
+    if event_arrays.covered_length(starts, ends) != len(milliseconds(starts, ends)):
+        mismatches.append("covered_length differs")
+
+    tank = targets == LIFEBLOOM_TARGETS[0]
+    overlap = len(milliseconds(starts[tank], ends[tank]) & milliseconds(starts[~tank], ends[~tank]))
+    if event_arrays.overlap_length(starts[tank], ends[tank], starts[~tank], ends[~tank]) != overlap:
+        mismatches.append("overlap_length differs")
+
+    if not events or end_time >= max(event["timestamp"] for event in events):
+        new = event_arrays.covered_length(starts, ends)
+        old = old_lifebloom_uptime(events, end_time)
+        if new != old:
+            mismatches.append(f"total uptime {new} != {old} from the old merge loop")
+    return mismatches
+
+
+def check_buff_cases():
+    """Hand-written Lifebloom streams with known segments."""
+    def event(timestamp, event_type, target_id=1, stack=None):
+        e = {"timestamp": timestamp, "type": event_type, "sourceID": 10, "targetID": target_id, "abilityGameID": 33763}
+        if stack is not None:
+            e["stack"] = stack
+        return e
+
+    cases = [
+        ("Interleaved applybuffstack/refreshbuff", [
+            event(0, 'applybuff'), event(1000, 'applybuffstack', stack=2), event(2000, 'refreshbuff'),
+            event(3000, 'applybuffstack', stack=3), event(4000, 'refreshbuff'), event(5000, 'removebuffstack', stack=2),
+            event(6000, 'refreshbuff'), event(7000, 'removebuff')
+        ], 10000, [(1, 0, 1000, 1), (1, 1000, 2000, 2), (1, 2000, 3000, 2), (1, 3000, 4000, 3),
+                   (1, 4000, 5000, 3), (1, 5000, 6000, 2), (1, 6000, 7000, 2)]),
+        ("Target whose first event is a stack event", [
+            event(500, 'applybuff', target_id=2), event(1000, 'applybuffstack', stack=3),
+            event(2000, 'refreshbuff'), event(3000, 'removebuff')
+        ], 10000, [(1, 1000, 2000, 3), (1, 2000, 3000, 3), (2, 500, 10000, 1)]),
+        ("end_time earlier than the last event", [
+            event(0, 'applybuff'), event(4000, 'refreshbuff'), event(6000, 'applybuffstack', stack=2),
+            event(8000, 'removebuff'), event(9000, 'applybuff', target_id=2)
+        ], 5000, [(1, 0, 4000, 1), (1, 4000, 5000, 1)]),
+        ("Removed and reapplied at the same timestamp", [
+            event(0, 'applybuff'), event(3000, 'removebuff'), event(3000, 'applybuff')
+        ], 5000, [(1, 0, 3000, 1), (1, 3000, 5000, 1)]),
+    ]
+
+    failures = 0
+    for name, events, end_time, expected in cases:
+        targets, starts, ends, stacks = event_arrays.buff_segments(event_arrays.to_event_array(events), end_time)
+        segments = list(zip(targets.tolist(), starts.tolist(), ends.tolist(), stacks.tolist()))
+        if segments != expected or reference_buff_segments(events, end_time) != expected:
+            print(f"⚠ {name}: {segments} != {expected}")
+            failures += 1
+        else:
+            print(f"✓ {name}")
+    return failures
+
+
+# ===== GCD utilization =====
+
+def reference_cast_intervals(events, gcd_ms, off_gcd_ids):
+    """cast_intervals() one cast at a time: (start, end) tuples sorted by start."""
+    intervals = []
+    for i, event in enumerate(events):
+        if event["type"] != "cast" or event["abilityGameID"] in off_gcd_ids:
+            continue
+        previous = events[i - 1] if i > 0 else None
+        began = previous and previous["type"] == "begincast" and previous["abilityGameID"] == event["abilityGameID"]
+        start = previous["timestamp"] if began else event["timestamp"]
+        intervals.append((start, max(event["timestamp"], start + gcd_ms)))
+    return sorted(intervals, key=lambda interval: interval[0])
+
+
+def reference_idle_gaps(intervals):
+    """Gap from each interval's start to the latest end before it."""
+    return [start - max(end for _, end in intervals[:i]) for i, (start, _) in enumerate(intervals) if i > 0]
+
+
+def random_cast_events(rng, count):
+    """
+    One player's Casts events: instants, begincast/cast pairs, interrupted
+    begincasts, begincasts of another spell right before a cast, and off-GCD casts.
+    """
+    events = []
+    timestamp = 0
+    for _ in range(count):
+        timestamp += rng.choice([0, 50, 300, 1500, 4000])
+        ability_id = rng.choice(list(CAST_TIMES))
+        roll = rng.random()
+        if CAST_TIMES[ability_id] and roll < 0.7:
+            events.append({"timestamp": timestamp, "type": "begincast", "abilityGameID": ability_id})
+            timestamp += CAST_TIMES[ability_id] + rng.choice([-200, 0])
+        elif roll < 0.8:
+            # Cancelled cast, or another spell's begincast right before this cast
+            events.append({"timestamp": timestamp, "type": "begincast", "abilityGameID": rng.choice([REGROWTH_ID, HEALING_TOUCH_ID])})
+            timestamp += rng.choice([0, 400])
+            if roll < 0.75:
+                continue
+        events.append({"timestamp": timestamp, "type": "cast", "abilityGameID": ability_id})
+    return events
+
+
+def compare_cast_intervals(events):
+    """
+    Compare cast_intervals and idle_gaps with their references on one cast stream.
+
+    Returns:
+        List of mismatch descriptions (empty when everything matches)
+    """
+    mismatches = []
+    starts, ends = event_arrays.cast_intervals(event_arrays.to_event_array(events), GCD_MS, OFF_GCD_CAST_IDS)
+    expected = reference_cast_intervals(events, GCD_MS, OFF_GCD_CAST_IDS)
+    if list(zip(starts.tolist(), ends.tolist())) != expected:
+        mismatches.append("cast_intervals differs")
+    elif event_arrays.idle_gaps(starts, ends).tolist() != reference_idle_gaps(expected):
+        mismatches.append("idle_gaps differs")
+    return mismatches
+
+
+def check_gcd_cases():
+    """Hand-written cast streams with known intervals, gaps and utilization."""
+    def cast(timestamp, ability_id=LIFEBLOOM_ID, event_type="cast"):
+        return {"timestamp": timestamp, "type": event_type, "sourceID": 10, "abilityGameID": ability_id}
+
+    failures = 0
+
+    # Gaps: 100, 200, 300 (reaction time), 1900 (neither), 8500 (idle), 0
+    events = [
+        cast(0), cast(1600),
+        cast(3300, HEALING_TOUCH_ID, "begincast"), cast(6300, HEALING_TOUCH_ID),  # paired: busy 3300-6300
+        cast(6500, REGROWTH_ID, "begincast"), cast(6600),                         # other spell: instant at 6600
+        cast(8150, NATURES_SWIFTNESS_ID), cast(8200, SUPER_MANA_POTION_ID),       # off the GCD: dropped
+        cast(10000), cast(20000),
+        cast(21500, HEALING_TOUCH_ID, "begincast"), cast(24500, HEALING_TOUCH_ID)
+    ]
+    starts, ends = event_arrays.cast_intervals(event_arrays.to_event_array(events), GCD_MS, OFF_GCD_CAST_IDS)
+    expected = [(0, 1500), (1600, 3100), (3300, 6300), (6600, 8100), (10000, 11500), (20000, 21500), (21500, 24500)]
+    intervals = list(zip(starts.tolist(), ends.tolist()))
+    failures += check_case("begincast pairing and off-GCD casts", intervals, expected)
+    failures += check_case("Gaps between casts", event_arrays.idle_gaps(starts, ends).tolist(),
+                           [100, 200, 300, 1900, 8500, 0])
+
+    utilization = calculate_gcd_utilization(event_arrays.to_event_array(events), GCD_MS / 1000, 0, 60000)
+    failures += check_case("GCD utilization", utilization, {
+        "active_time_percent": 13500 / 60000 * 100,
+        "casts_per_minute": 7.0,
+        "idle_gap_count": 1,                 # only the 8500ms gap is over IDLE_GAP_GCDS GCDs
+        "idle_gap_seconds": 8.5,
+        "estimated_latency_ms": 150.0,       # median of 0, 100, 200, 300; 1900 is over one GCD
+        "latency_p90_ms": float(np.percentile([0, 100, 200, 300], 90))
+    })
+
+    # Gaps of one GCD - 1ms, one GCD, IDLE_GAP_GCDS GCDs and IDLE_GAP_GCDS GCDs + 1ms:
+    # exactly one GCD and exactly IDLE_GAP_GCDS GCDs count as neither
+    idle_ms = IDLE_GAP_GCDS * GCD_MS
+    timestamps = np.cumsum([0, 2 * GCD_MS - 1, 2 * GCD_MS, GCD_MS + idle_ms, GCD_MS + idle_ms + 1]).tolist()
+    events = [cast(timestamp) for timestamp in timestamps]
+    utilization = calculate_gcd_utilization(event_arrays.to_event_array(events), GCD_MS / 1000, 0, 60000)
+    failures += check_case("Gap thresholds",
+                           (utilization["idle_gap_count"], utilization["estimated_latency_ms"]), (1, GCD_MS - 1.0))
+
+    # A long cast with a short one inside it: the next gap is measured from the long cast's end
+    starts, ends = np.array([0, 500, 3200]), np.array([3000, 2000, 4700])
+    failures += check_case("Long cast overlapping a short one", event_arrays.idle_gaps(starts, ends).tolist(), [-2500, 200])
+
+    starts, ends = event_arrays.cast_intervals(event_arrays.to_event_array([]), GCD_MS, OFF_GCD_CAST_IDS)
+    failures += check_case("No casts", (len(starts), event_arrays.idle_gaps(starts, ends).tolist()), (0, []))
+    return failures
+
+
+def check_case(name, actual, expected):
+    """Print one hand-written case and return 1 if it failed."""
+    if actual != expected:
+        print(f"⚠ {name}: {actual} != {expected}")
+        return 1
+    print(f"✓ {name}")
+    return 0
+
+
+# ===== Comparisons =====
+
+def compare(events, rng):
+    """
+    Compare every vectorized scan with its old loop on one event stream.
+
+    Returns:
+        List of mismatch descriptions (empty when everything matches)
+    """
+    mismatches = []
+    array = event_arrays.to_event_array(events)
+
+    if len(array) != len(events):
+        mismatches.append(f"to_event_array: {len(array)} rows for {len(events)} events")
+
+    for target_id in PLAYER_IDS[:5]:
+        for ability_ids in ([29166], [2825, 32182], [16886]):
+            new = event_arrays.count_buff_applications(array, ability_ids, target_id)
+            old = old_count_buff_applications(events, ability_ids, target_id)
+            if new != old:
+                mismatches.append(f"count_buff_applications({ability_ids}, {target_id}): {new} != {old}")
+
+    for source_id in BOSS_IDS:
+        new = event_arrays.damage_by_target(array, source_id, set(PLAYER_IDS))
+        old = old_damage_by_target(events, source_id, set(PLAYER_IDS))
+        # Key order matters: the tank detection breaks ties by first appearance
+        if list(new.items()) != list(old.items()):
+            mismatches.append(f"damage_by_target({source_id}) differs")
+
+    new_timestamps, new_tanks = event_arrays.build_swing_timeline(array, set(PLAYER_IDS) - set(TANK_IDS), TANK_IDS)
+    old_timeline = old_swing_timeline(events, set(PLAYER_IDS) - set(TANK_IDS), TANK_IDS)
+    if (new_timestamps.tolist() != [swing["timestamp"] for swing in old_timeline] or
+            new_tanks.tolist() != [swing["tank_id"] for swing in old_timeline]):
+        mismatches.append("build_swing_timeline differs")
+
+    lookups = sorted(rng.randrange(-1000, 310000) for _ in range(200))
+    lookups += [swing["timestamp"] for swing in old_timeline[:20]]  # exactly on a swing
+    new_active = event_arrays.lookup_active(new_timestamps, new_tanks, lookups).tolist()
+    old_active = [old_active_tank_at_time(t, old_timeline) for t in lookups]
+    if [tank if tank >= 0 else None for tank in new_active] != old_active:
+        mismatches.append("lookup_active differs")
+
+    return mismatches
+
+
+def main():
+    print("Testing NumPy Event Scans")
+    print("=" * 50)
+
+    failures = 0
+    streams = [("empty", []), ("one event", random_events(random.Random(-1), 1))]
+    streams += [(f"seed {seed}", random_events(random.Random(seed), random.Random(seed).randrange(100, 5000)))
+                for seed in SEEDS]
+
+    for name, events in streams:
+        mismatches = compare(events, random.Random(name))
+        if mismatches:
+            failures += len(mismatches)
+            for mismatch in mismatches:
+                print(f"⚠ {name}: {mismatch}")
+        else:
+            print(f"✓ {name} ({len(events)} events)")
+
+    print()
+    print("Lifebloom intervals")
+    failures += check_buff_cases()
+
+    interval_streams = [("empty", [], FIGHT_END)]
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        events = random_lifebloom_events(rng, rng.randrange(1, 400))
+        interval_streams.append((f"seed {seed}", events, FIGHT_END + events[-1]["timestamp"]))
+        interval_streams.append((f"seed {seed}, cut short", events, rng.randrange(0, events[-1]["timestamp"] + 1)))
+
+    for name, events, end_time in interval_streams:
+        mismatches = compare_intervals(events, end_time)
+        if mismatches:
+            failures += len(mismatches)
+            for mismatch in mismatches:
+                print(f"⚠ {name}: {mismatch}")
+        else:
+            print(f"✓ {name} ({len(events)} events, end {end_time})")
+
+    print()
+    print("GCD utilization")
+    failures += check_gcd_cases()
+
+    cast_streams = [("empty", [])]
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        cast_streams.append((f"seed {seed}", random_cast_events(rng, rng.randrange(1, 400))))
+
+    for name, events in cast_streams:
+        mismatches = compare_cast_intervals(events)
+        if mismatches:
+            failures += len(mismatches)
+            for mismatch in mismatches:
+                print(f"⚠ {name}: {mismatch}")
+        else:
+            print(f"✓ {name} ({len(events)} cast events)")
+
+    print()
+    if failures:
+        print(f"⚠ {failures} mismatches with the old loops")
+        return 1
+    print("✓ Event scans, Lifebloom intervals and GCD utilization match the old loops")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script to verify import-time budgets for the web app and CLI tools
+
+Runs `python -X importtime` in a fresh interpreter for each entry point and
+checks that heavy modules stay deferred and total import time stays in budget.
+"""
+
+import sys
+import subprocess
+
+# (module, budget in ms, modules that must not be imported)
+IMPORT_BUDGETS = [
+    ('app', 1000, ['analyze_druid', 'auth', 'requests', 'webbrowser', 'multiprocessing']),
+    ('analyze_top_rankings', 250, ['pandas', 'pyarrow', 'webbrowser', 'http.server']),
+    ('fetch_all_reports', 250, ['pandas', 'pyarrow', 'webbrowser', 'http.server']),
+    ('analyze_druid', 250, ['pandas', 'pyarrow', 'webbrowser', 'http.server']),
+]
+
+def measure_imports(module):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        dict of imported module name -> cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+def main():
+    print("Testing Import-Time Budgets")
+    print("=" * 50)
+
+    failures = 0
+    for module, budget_ms, forbidden in IMPORT_BUDGETS:
+        timings = measure_imports(module)
+        total_ms = timings[module] / 1000
+
+        loaded = [name for name in forbidden if name in timings]
+        if loaded:
+            print(f"⚠ {module} imports {', '.join(loaded)}")
+            failures += 1
+
+        if total_ms > budget_ms:
+            print(f"⚠ {module}: {total_ms:.0f}ms (budget {budget_ms}ms)")
+            failures += 1
+        else:
+            print(f"✓ {module}: {total_ms:.0f}ms (budget {budget_ms}ms)")
+
+    if failures:
+        print(f"\n⚠ {failures} import-time checks failed")
+        return 1
+
+    print("\n✓ All import-time budgets met")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
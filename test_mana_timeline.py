@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the mana timeline on realistic event payloads
+
+Builds Casts and Resources events shaped like the API returns them with
+includeResources: true (classResources, resourceActor, hit points, ...) for a
+druid with known costs, gains and regeneration, and checks that
+calculate_mana_timeline recovers them. Also checks that every query the mana
+timeline reads from asks for classResources.
+"""
+
+import inspect
+
+import numpy as np
+
+import analyze_druid
+import all_pulls
+from mana_timeline import calculate_mana_timeline, OOM_THRESHOLD_PERCENT
+
+PLAYER_ID = 10
+TANK_ID = 11
+SHADOW_PRIEST_ID = 12
+MAX_MANA = 10000
+WINDOW_START = 60000  # fights don't start at 0 in a report
+WINDOW_END = WINDOW_START + 120000
+
+CAST_INTERVAL_MS = 2000
+REGEN_PER_CAST = 20          # passive regen between two casts
+INNERVATE_REGEN_PER_CAST = 100
+INNERVATE_START = WINDOW_START + 30000
+INNERVATE_END = INNERVATE_START + 20000
+
+SPELL_COSTS = {33763: 220, 26982: 415, 26980: 675}  # Lifebloom, Rejuvenation, Regrowth
+VAMPIRIC_TOUCH_ID = 34919
+SUPER_MANA_POTION_ID = 28499
+VAMPIRIC_TOUCH_GAIN = 150
+POTION_MANA = 2400
+POTION_TIME = WINDOW_START + 80001
+
+
+def unit_fields():
+    """Fields includeResources adds to every event besides classResources."""
+    return {
+        "hitPoints": 100, "maxHitPoints": 100, "attackPower": 0, "spellPower": 1900,
+        "armor": 3200, "x": -120561, "y": 257350, "facing": -157, "mapID": 335, "itemLevel": 130
+    }
+
+
+def cast_event(timestamp, ability_id, mana, cost):
+    """A cast event as returned for sourceID = the druid."""
+    event = {
+        "timestamp": timestamp, "type": "cast", "sourceID": PLAYER_ID, "targetID": TANK_ID,
+        "abilityGameID": ability_id, "fight": 1, "resourceActor": 1,
+        "classResources": [{"amount": mana, "max": MAX_MANA, "type": 0, "cost": cost}]
+    }
+    event.update(unit_fields())
+    return event
+
+
+def resource_event(timestamp, source_id, ability_id, mana, change, waste):
+    """A resourcechange event as returned for targetID = the druid."""
+    event = {
+        "timestamp": timestamp, "type": "resourcechange", "sourceID": source_id, "targetID": PLAYER_ID,
+        "abilityGameID": ability_id, "fight": 1, "resourceChange": change, "resourceChangeType": 0,
+        "otherResourceChange": 0, "maxResourceAmount": MAX_MANA, "waste": waste, "resourceActor": 2,
+        "classResources": [{"amount": mana, "max": MAX_MANA, "type": 0}]
+    }
+    event.update(unit_fields())
+    return event
+
+
+def build_events():
+    """
+    Simulate two minutes of casting with regen, Vampiric Touch, Innervate and a potion.
+
+    Returns:
+        dict with casts, resources and the expected totals
+    """
+    spells = list(SPELL_COSTS)
+    mana = MAX_MANA
+    casts, resources = [], []
+    spent_by_spell = dict.fromkeys(spells, 0)
+    vampiric_touch = potion = 0
+    oom_time = None
+
+    for index, timestamp in enumerate(range(WINDOW_START, WINDOW_END + 1, CAST_INTERVAL_MS)):
+        if index > 0:
+            innervated = INNERVATE_START < timestamp <= INNERVATE_END
+            mana = min(mana + (INNERVATE_REGEN_PER_CAST if innervated else REGEN_PER_CAST), MAX_MANA)
+
+        ability_id = spells[index % len(spells)]
+        cost = SPELL_COSTS[ability_id]
+        if mana >= cost:
+            mana -= cost
+            spent_by_spell[ability_id] += cost
+            casts.append(cast_event(timestamp, ability_id, mana, cost))
+            if oom_time is None and mana / MAX_MANA * 100 < OOM_THRESHOLD_PERCENT:
+                oom_time = timestamp
+
+        if index % 5 == 2:
+            mana = min(mana + VAMPIRIC_TOUCH_GAIN, MAX_MANA)
+            vampiric_touch += VAMPIRIC_TOUCH_GAIN
+            resources.append(resource_event(timestamp + 10, SHADOW_PRIEST_ID, VAMPIRIC_TOUCH_ID, mana,
+                                            VAMPIRIC_TOUCH_GAIN, 0))
+
+        if timestamp < POTION_TIME <= timestamp + CAST_INTERVAL_MS:
+            waste = max(mana + POTION_MANA - MAX_MANA, 0)
+            mana += POTION_MANA - waste
+            potion += POTION_MANA - waste
+            resources.append(resource_event(POTION_TIME, PLAYER_ID, SUPER_MANA_POTION_ID, mana, POTION_MANA, waste))
+
+    return {
+        "casts": casts,
+        "resources": resources,
+        "spent_by_spell": spent_by_spell,
+        "vampiric_touch": vampiric_touch,
+        "potion": potion,
+        "oom_time": oom_time
+    }
+
+
+def run(events, innervate=True):
+    """calculate_mana_timeline over the simulated window."""
+    starts = np.array([INNERVATE_START] if innervate else [], dtype=np.int64)
+    ends = np.array([INNERVATE_END] if innervate else [], dtype=np.int64)
+    return calculate_mana_timeline(
+        events["resources"], events["casts"], PLAYER_ID, WINDOW_START, WINDOW_END,
+        {ability_id: f"Spell {ability_id}" for ability_id in SPELL_COSTS},
+        starts, ends, total_healing=1000000
+    )
+
+
+def check(name, ok, detail=""):
+    """Print one check and return 1 if it failed."""
+    print(f"{'✓' if ok else '⚠'} {name}" + (f": {detail}" if detail and not ok else ""))
+    return 0 if ok else 1
+
+
+def check_queries():
+    """Every query the mana timeline reads from must ask for classResources."""
+    failures = 0
+    analysis_source = inspect.getsource(analyze_druid.run_druid_analysis)
+    for data_type in ("Resources", "Casts"):
+        filters = [line for line in analysis_source.splitlines() if f"dataType: {data_type}" in line]
+        failures += check(f"{data_type} query includes resources",
+                          bool(filters) and all("includeResources: true" in line for line in filters))
+
+    for description in ("Check Vampiric Touch", "Fetch cast events"):
+        failures += check(f"All-pulls '{description}' includes resources",
+                          "includeResources: true" in all_pulls.BATCHED_QUERIES[description])
+    return failures
+
+
+def main():
+    print("Testing Mana Timeline")
+    print("=" * 50)
+
+    failures = check_queries()
+
+    events = build_events()
+    result = run(events)
+
+    mana_spent = sum(events["spent_by_spell"].values())
+    spent_by_spell = {spell["id"]: spell["mana"] for spell in result["mana_spent_by_spell"]}
+
+    failures += check("Mana data found", result["has_mana_data"])
+    failures += check("Mana spent", result["mana_spent"] == mana_spent,
+                      f"{result['mana_spent']} != {mana_spent}")
+    failures += check("Mana spent by spell", spent_by_spell == events["spent_by_spell"],
+                      f"{spent_by_spell} != {events['spent_by_spell']}")
+    failures += check("Healing per mana", result["healing_per_mana"] == round(1000000 / mana_spent, 3))
+    failures += check("Mana from Vampiric Touch",
+                      result["mana_gained"]["Vampiric Touch"] == events["vampiric_touch"],
+                      f"{result['mana_gained']['Vampiric Touch']} != {events['vampiric_touch']}")
+    failures += check("Mana from potions (net of waste)", result["mana_gained"]["Potions"] == events["potion"],
+                      f"{result['mana_gained']['Potions']} != {events['potion']}")
+
+    # Innervate regen is INNERVATE_REGEN_PER_CAST per cast instead of REGEN_PER_CAST
+    innervate_casts = (INNERVATE_END - INNERVATE_START) // CAST_INTERVAL_MS
+    expected_innervate = innervate_casts * (INNERVATE_REGEN_PER_CAST - REGEN_PER_CAST)
+    innervate = result["mana_gained"]["Innervate"]
+    failures += check("Mana from Innervate", abs(innervate - expected_innervate) <= expected_innervate * 0.2,
+                      f"{innervate} vs ~{expected_innervate}")
+    failures += check("No Innervate without the buff", run(events, innervate=False)["mana_gained"]["Innervate"] == 0)
+
+    expected_oom = (events["oom_time"] - WINDOW_START) / 1000 if events["oom_time"] else None
+    failures += check("Time to OOM", result["time_to_oom_seconds"] == expected_oom,
+                      f"{result['time_to_oom_seconds']} != {expected_oom}")
+    failures += check("Min mana below the OOM threshold", result["min_mana_percent"] < OOM_THRESHOLD_PERCENT)
+
+    timeline = result["mana_timeline"]
+    failures += check("Timeline covers the window",
+                      timeline["time"][0] == 0 and timeline["time"][-1] == (WINDOW_END - WINDOW_START) / 1000 and
+                      len(timeline["time"]) == len(timeline["mana_percent"]))
+    failures += check("Timeline starts from the first reading",
+                      timeline["mana_percent"][0] == round(events["casts"][0]["classResources"][0]["amount"] / MAX_MANA * 100, 1))
+
+    # Without includeResources the events carry no classResources
+    for event in events["casts"] + events["resources"]:
+        event.pop("classResources")
+    bare = run(events)
+    failures += check("Events without classResources give no mana data",
+                      not bare["has_mana_data"] and bare["mana_spent"] == 0 and bare["time_to_oom_seconds"] is None)
+
+    print()
+    if failures:
+        print(f"⚠ {failures} mana timeline checks failed")
+        return 1
+    print("✓ Mana timeline matches the simulated fight")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script to verify metrics snapshots of exited processes are folded
+
+Writes snapshot files into a temporary LIFEBLOOM_METRICS_DIR: one for a
+process that has exited and one for a live process. Checks that rendering
+folds the exited one into the aggregate file and deletes it, keeps the live
+one, and that counters, histograms and gauges keep their totals across
+repeated folds.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+os.environ['LIFEBLOOM_METRICS_DIR'] = tempfile.mkdtemp(prefix='lifebloom-metrics-')
+os.environ['LIFEBLOOM_METRICS_DUMP_INTERVAL'] = '0'
+
+import metrics
+
+ROUTE_KEY = ['/api/data', 'GET', '200']
+
+
+def exited_pid():
+    """Pid of a process that has already exited."""
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+def write_process_snapshot(pid, requests, latency, points, updated_at):
+    """Write a snapshot file as a process with this pid would."""
+    counts = [0] * (len(metrics.DEFAULT_BUCKETS) + 1)
+    counts[0] = requests
+    metrics.write_snapshot(metrics.get_snapshot_path(pid), {
+        'pid': pid,
+        'updated_at': updated_at,
+        'metrics': {
+            metrics.HTTP_REQUESTS.name: [[ROUTE_KEY, requests]],
+            metrics.HTTP_REQUEST_SECONDS.name: [[['/api/data', 'GET'], [counts, latency, requests]]],
+            metrics.WCL_RATE_LIMIT_POINTS.name: [[['remaining'], points]]
+        }
+    })
+
+
+def check(name, ok, detail=""):
+    """Print one check and return 1 if it failed."""
+    print(f"{'✓' if ok else '⚠'} {name}" + (f": {detail}" if detail and not ok else ""))
+    return 0 if ok else 1
+
+
+def totals():
+    """Merged request count, latency count and rate limit gauge."""
+    merged = metrics.collect()
+    return (merged[metrics.HTTP_REQUESTS.name].get(tuple(ROUTE_KEY)),
+            merged[metrics.HTTP_REQUEST_SECONDS.name].get(('/api/data', 'GET'), [None, None, None])[2],
+            merged[metrics.WCL_RATE_LIMIT_POINTS.name].get(('remaining',)))
+
+
+def main():
+    print("Testing Metrics Snapshot Folding")
+    print("=" * 50)
+
+    failures = 0
+    now = time.time()
+    live_pid = os.getppid()
+
+    write_process_snapshot(exited_pid(), 3, 0.01, 900, now - 20)
+    write_process_snapshot(live_pid, 5, 0.02, 800, now - 10)
+    failures += check("First render sums exited and live processes", totals() == (8, 8, 800), totals())
+
+    files = sorted(os.listdir(metrics.METRICS_DIR))
+    failures += check("Exited snapshot folded into the aggregate",
+                      files == sorted([f"{live_pid}.json", metrics.AGGREGATE_FILE, metrics.AGGREGATE_LOCK_FILE]), files)
+
+    # Another worker exits: its counts are added to the aggregate, not replacing it
+    write_process_snapshot(exited_pid(), 4, 0.01, 700, now)
+    failures += check("Second fold adds to the aggregate", totals() == (12, 12, 700), totals())
+    failures += check("Repeated renders don't count folded snapshots twice", totals() == (12, 12, 700), totals())
+
+    with open(os.path.join(metrics.METRICS_DIR, metrics.AGGREGATE_FILE), encoding='utf-8') as f:
+        aggregate = json.load(f)
+    failures += check("Aggregate holds only the exited processes",
+                      aggregate['metrics'][metrics.HTTP_REQUESTS.name] == [[ROUTE_KEY, 7]],
+                      aggregate['metrics'][metrics.HTTP_REQUESTS.name])
+
+    removed = metrics.clear_snapshots()
+    failures += check("clear removes the aggregate too", removed == 2 and totals() == (None, None, None),
+                      f"{removed} removed, totals {totals()}")
+
+    print()
+    if failures:
+        print(f"⚠ {failures} metrics checks failed")
+        return 1
+    print("✓ Metrics snapshots fold as expected")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        exit(main())
+    finally:
+        shutil.rmtree(metrics.METRICS_DIR, ignore_errors=True)
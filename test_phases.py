@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script to verify phase windows and the paged last_damage detector
+
+Checks transitions_from_report and get_phase_window on hand-written
+phaseTransitions (unsorted, single-phase, recurring phases), and runs
+find_phase_boundary's last_damage detector against a fake WarcraftLogs API
+(requests.post is replaced for the run) whose damage events span several
+pages, so the boundary has to come from the last page.
+"""
+
+import os
+import io
+import re
+import json
+import contextlib
+
+os.environ.setdefault('WARCRAFTLOGS_TOKEN_JSON', json.dumps({"access_token": "test"}))
+os.environ.setdefault('LIFEBLOOM_METRICS_DUMP_INTERVAL', '0')
+
+import analyze_druid
+import phases
+
+FIGHT_START = 50000
+FIGHT_END = FIGHT_START + 300000
+NPC_ID = 40
+PAGE_LIMIT = 25
+LAST_HIT = FIGHT_START + 211111
+
+
+class FakeResponse:
+    """The parts of requests.Response the detector uses."""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeDamageTaken:
+    """Serves an NPC's damage taken in pages of PAGE_LIMIT events."""
+
+    def __init__(self):
+        self.events = [{"timestamp": t, "type": "damage", "targetID": NPC_ID, "amount": 100}
+                       for t in range(FIGHT_START + 1000, LAST_HIT, 997)] + \
+                      [{"timestamp": LAST_HIT, "type": "damage", "targetID": NPC_ID, "amount": 100}]
+        self.requests = 0
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.requests += 1
+        args = re.search(r"events\((.*?)\)\s*\{", json["query"], re.S).group(1)
+        start_match = re.search(r"startTime: ([\d.]+)", args)
+        start = float(start_match.group(1)) if start_match else float(json["variables"]["startTime"])
+        end = float(re.search(r"endTime: ([\d.]+)", args).group(1))
+        limit = int(re.search(r"limit: (\d+)", args).group(1))
+
+        events = [e for e in self.events if start <= e["timestamp"] <= end]
+        next_page = events[limit]["timestamp"] if len(events) > limit else None
+        return FakeResponse({"data": {"reportData": {"report": {
+            "events": {"data": events[:limit], "nextPageTimestamp": next_page}
+        }}}})
+
+
+def check(name, ok, detail=""):
+    """Print one check and return 1 if it failed."""
+    print(f"{'✓' if ok else '⚠'} {name}" + (f": {detail}" if detail and not ok else ""))
+    return 0 if ok else 1
+
+
+def check_transitions():
+    """transitions_from_report on unsorted, missing and single-phase data."""
+    failures = 0
+    report = [{"id": 2, "startTime": FIGHT_START + 90000}, {"id": 1, "startTime": FIGHT_START - 20}]
+    transitions = phases.transitions_from_report(report, FIGHT_START)
+    failures += check("Transitions sorted, fight-relative and clamped at 0",
+                      transitions == [{'id': 1, 'start_ms': 0}, {'id': 2, 'start_ms': 90000}], transitions)
+    failures += check("No phaseTransitions", phases.transitions_from_report(None, FIGHT_START) == [])
+    single = [{"id": 1, "startTime": FIGHT_START}, {"id": 1, "startTime": FIGHT_START + 5000}]
+    failures += check("Single-phase fight has no transitions", phases.transitions_from_report(single, FIGHT_START) == [])
+    return failures
+
+
+def check_windows():
+    """get_phase_window for single, last, missing and recurring phases."""
+    failures = 0
+    duration = FIGHT_END - FIGHT_START
+    transitions = [{'id': 1, 'start_ms': 0}, {'id': 2, 'start_ms': 90000}, {'id': 3, 'start_ms': 200000}]
+    failures += check("Middle phase ends at the next transition",
+                      phases.get_phase_window(transitions, 2, duration) == (90000, 200000))
+    failures += check("Last phase ends with the fight",
+                      phases.get_phase_window(transitions, 3, duration) == (200000, duration))
+    failures += check("Phase that never started", phases.get_phase_window(transitions, 4, duration) is None)
+
+    # Felmyst: ground, air, ground, air
+    felmyst = [{'id': 1, 'start_ms': 0}, {'id': 2, 'start_ms': 60000},
+               {'id': 1, 'start_ms': 160000}, {'id': 2, 'start_ms': 220000}]
+    for phase in (1, 2):
+        try:
+            window = phases.get_phase_window(felmyst, phase, duration)
+            failures += check(f"Recurring phase {phase} rejected", False, f"got window {window}")
+        except Exception as e:
+            failures += check(f"Recurring phase {phase} rejected", "occurs 2 times" in str(e), str(e))
+    return failures
+
+
+def check_last_damage():
+    """The last_damage detector finds the NPC's last hit past the first page."""
+    api = FakeDamageTaken()
+    original_post = analyze_druid.requests.post
+    original_limit = analyze_druid.EVENTS_PAGE_LIMIT
+    analyze_druid.requests.post = api.post
+    analyze_druid.EVENTS_PAGE_LIMIT = PAGE_LIMIT
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            boundary = analyze_druid.find_phase_boundary('TestReport', 1, FIGHT_START, FIGHT_END,
+                                                         "last_damage", NPC_ID, {})
+    finally:
+        analyze_druid.requests.post = original_post
+        analyze_druid.EVENTS_PAGE_LIMIT = original_limit
+
+    failures = check("Damage taken spans several pages", api.requests > 1, f"{api.requests} request(s)")
+    failures += check("last_damage boundary is the NPC's last hit", boundary == LAST_HIT - FIGHT_START,
+                      f"{boundary} != {LAST_HIT - FIGHT_START}")
+    return failures
+
+
+def main():
+    print("Testing Phase Windows")
+    print("=" * 50)
+
+    failures = check_transitions() + check_windows() + check_last_damage()
+
+    print()
+    if failures:
+        print(f"⚠ {failures} phase checks failed")
+        return 1
+    print("✓ Phase windows and detectors behave as expected")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
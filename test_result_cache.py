@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script to verify RESULT_CACHE_VERSION is bumped when the analysis payload changes
+
+The result cache keeps finished /api/analyze-report payloads for a week, keyed
+by RESULT_CACHE_VERSION. If build_analysis_response gains or loses a key
+without a version bump, cached payloads missing the new fields are served to
+a front end that expects them. This script fingerprints the payload keys and
+fails unless the fingerprint is the one recorded for the current version.
+
+After changing the payload: bump RESULT_CACHE_VERSION in result_cache.py and
+add the fingerprint this script prints to PAYLOAD_FINGERPRINTS.
+"""
+
+import ast
+import hashlib
+import inspect
+
+import jobs
+from result_cache import RESULT_CACHE_VERSION
+
+# RESULT_CACHE_VERSION -> fingerprint of build_analysis_response's keys
+PAYLOAD_FINGERPRINTS = {
+    3: '817a877604da',
+    4: '817a877604da',  # single-fight event streams paged
+}
+
+
+def get_payload_keys():
+    """Keys of the dict literal build_analysis_response returns, sorted."""
+    tree = ast.parse(inspect.getsource(jobs.build_analysis_response))
+    returned = next(node.value for node in ast.walk(tree) if isinstance(node, ast.Return))
+    return sorted(key.value for key in returned.keys)
+
+
+def get_fingerprint(keys):
+    """Short hash of a sorted key list."""
+    return hashlib.sha1(",".join(keys).encode()).hexdigest()[:12]
+
+
+def main():
+    print("Testing Result Cache Versioning")
+    print("=" * 50)
+
+    keys = get_payload_keys()
+    fingerprint = get_fingerprint(keys)
+    print(f"Payload keys: {len(keys)}, fingerprint {fingerprint}, RESULT_CACHE_VERSION {RESULT_CACHE_VERSION}")
+
+    recorded = PAYLOAD_FINGERPRINTS.get(RESULT_CACHE_VERSION)
+    if recorded == fingerprint:
+        print("✓ Payload keys match the fingerprint recorded for this version")
+        return 0
+
+    if fingerprint in PAYLOAD_FINGERPRINTS.values():
+        print("⚠ RESULT_CACHE_VERSION changed but the payload keys didn't; record the fingerprint for the new version")
+    else:
+        print("⚠ The payload keys changed without a RESULT_CACHE_VERSION bump")
+    print(f"  Bump RESULT_CACHE_VERSION and add {RESULT_CACHE_VERSION if recorded is None else RESULT_CACHE_VERSION + 1}: "
+          f"'{fingerprint}' to PAYLOAD_FINGERPRINTS")
+    return 1
+
+
+if __name__ == "__main__":
+    exit(main())
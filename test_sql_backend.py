@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the SQLite backend returns the same API responses as pandas
+
+Requires the database: python db_backend.py init
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+# Keep test requests out of the real /metrics snapshots
+os.environ.setdefault('LIFEBLOOM_METRICS_DUMP_INTERVAL', '0')
+
+import app as webapp
+import db_backend
+import http_cache
+from datasets import DATASETS_BEST
+from dataset_store import read_csv_dataset
+from db_backend import database_exists, DATABASE_PATH, ROWS_TABLE, VERSIONS_TABLE
+
+# Columns added to CSV_FIELDNAMES after databases were already in use; the
+# stale-schema check drops them from a copy of the database before migrating it
+ADDED_COLUMNS = [
+    'LifebloomTankUptime', 'LifebloomStack3Percent',
+    'ActiveTimePercent', 'CastsPerMinute', 'IdleGapCount', 'IdleGapSeconds', 'EstimatedLatencyMs',
+    'TimeToOOM', 'HealingPerMana', 'ManaFromInnervate', 'ManaFromVampiricTouch', 'ManaFromPotions', 'ManaFromRunes'
+]
+
+# Filter combinations exercised against every dataset
+QUERIES = [
+    {},
+    {'regions': 'US,EU'},
+    {'naturesGrace': 'Yes'},
+    {'totalHealers': '5', 'nDruid': '1'},
+    {'vampiricTouch': 'No', 'innervates': '0'},
+    {'rotatingOnTank': 'Yes', 'nPaladin': '2', 'nShaman': '1'},
+    {'nHPriest': '1', 'nDPriest': '1', 'regions': 'EU'},
+    {'totalHealers': 'abc', 'naturesGrace': 'maybe'},
+]
+
+def fetch(client, url, use_sql):
+    webapp.USE_SQL_BACKEND = use_sql
+    response = client.get(url)
+    return response.status_code, response.get_json()
+
+def stats_match(pandas_stats, sql_stats):
+    for key, value in pandas_stats.items():
+        if value is None or sql_stats[key] is None:
+            if value != sql_stats[key]:
+                return False
+        elif abs(value - sql_stats[key]) > 1e-6:
+            return False
+    return True
+
+def use_database(path):
+    """Point db_backend at another database file and drop cached connections."""
+    db_backend.DATABASE_PATH = path
+    db_backend._local.conn = None
+    db_backend._migrated = False
+    http_cache.clear_response_cache()
+
+def check_stale_schema(client):
+    """Migrate a copy of the database without the newer columns and compare one dataset."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stale_path = os.path.join(tmp_dir, "stale.db")
+        shutil.copy(DATABASE_PATH, stale_path)
+
+        conn = sqlite3.connect(stale_path)
+        for col in ADDED_COLUMNS:
+            conn.execute(f'ALTER TABLE {ROWS_TABLE} DROP COLUMN "{col}"')
+        conn.execute(f"ALTER TABLE {VERSIONS_TABLE} DROP COLUMN columns")
+        conn.execute(f"ALTER TABLE {VERSIONS_TABLE} DROP COLUMN version")
+        conn.commit()
+        conn.close()
+
+        use_database(stale_path)
+        try:
+            failures = 0
+            for data_source in ['best', 'all']:
+                url = f"/api/data?dataset=brutallus&dataSource={data_source}"
+                if fetch(client, url, False) != fetch(client, url, True):
+                    print(f"⚠ Mismatch on a stale database: {url}")
+                    failures += 1
+
+            conn = sqlite3.connect(stale_path)
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({ROWS_TABLE})")}
+            conn.close()
+            missing = [col for col in ADDED_COLUMNS if col not in columns]
+            if missing:
+                print(f"⚠ Migration did not add {missing}")
+                failures += 1
+        finally:
+            use_database(DATABASE_PATH)
+
+    if not failures:
+        print("✓ Stale database migrated")
+    return failures
+
+def check_missing_database():
+    """Reads against a database that doesn't exist must fail without creating it."""
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        missing_path = os.path.join(tmp_dir, "missing.db")
+        use_database(missing_path)
+        try:
+            db_backend.query_all('brutallus', 'best')
+            print("⚠ Query on a missing database did not raise")
+            failures += 1
+        except Exception as e:
+            if "db_backend.py init" not in str(e):
+                print(f"⚠ Unexpected error on a missing database: {e}")
+                failures += 1
+        finally:
+            use_database(DATABASE_PATH)
+
+        if os.path.exists(missing_path):
+            print("⚠ Reading created an empty database")
+            failures += 1
+
+    if not failures:
+        print("✓ Missing database reported, not created")
+    return failures
+
+def check_sync_version(client):
+    """Re-sync a dataset in a copy of the database and check the SQL responses follow it."""
+    failures = 0
+    url = "/api/data?dataset=brutallus&dataSource=best"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "sync.db")
+        csv_path = os.path.join(tmp_dir, "brutallus.csv")
+        shutil.copy(DATABASE_PATH, db_path)
+        read_csv_dataset(DATASETS_BEST['brutallus']).iloc[:-1].to_csv(csv_path, index=False)
+
+        use_database(db_path)
+        try:
+            webapp.USE_SQL_BACKEND = True
+            before = client.get(url)
+
+            conn = sqlite3.connect(db_path)
+            db_backend.sync_dataset(conn, 'brutallus', 'best', csv_path)
+            conn.close()
+
+            after = client.get(url, headers={'If-None-Match': before.headers['ETag']})
+            if after.status_code != 200 or after.headers['ETag'] == before.headers['ETag']:
+                print(f"⚠ ETag unchanged after a sync: {url}")
+                failures += 1
+            elif len(after.get_json()) != len(before.get_json()) - 1:
+                print(f"⚠ Stale rows served after a sync: {url}")
+                failures += 1
+        finally:
+            use_database(DATABASE_PATH)
+
+    if not failures:
+        print("✓ Responses follow database syncs")
+    return failures
+
+def main():
+    print("Testing SQLite Backend Equivalence")
+    print("=" * 50)
+
+    if not database_exists():
+        print(f"⚠ {DATABASE_PATH} not found. Run: python db_backend.py init")
+        return 1
+
+    client = webapp.app.test_client()
+    failures = 0
+
+    for dataset in DATASETS_BEST:
+        for data_source in ['best', 'all']:
+            base = {'dataset': dataset, 'dataSource': data_source}
+
+            for params in QUERIES:
+                query = '&'.join(f"{k}={v}" for k, v in {**base, **params}.items())
+                url = f"/api/top/100?{query}"
+                if fetch(client, url, False) != fetch(client, url, True):
+                    print(f"⚠ Mismatch: {url}")
+                    failures += 1
+
+            query = f"dataset={dataset}&dataSource={data_source}"
+            if fetch(client, f"/api/data?{query}", False) != fetch(client, f"/api/data?{query}", True):
+                print(f"⚠ Mismatch: /api/data?{query}")
+                failures += 1
+
+            pandas_status, pandas_stats = fetch(client, f"/api/stats?{query}", False)
+            sql_status, sql_stats = fetch(client, f"/api/stats?{query}", True)
+            if pandas_status != sql_status or not stats_match(pandas_stats, sql_stats):
+                print(f"⚠ Mismatch: /api/stats?{query}")
+                failures += 1
+
+            print(f"✓ Checked {dataset} / {data_source}")
+
+    failures += check_stale_schema(client)
+    failures += check_sync_version(client)
+    failures += check_missing_database()
+
+    if failures:
+        print(f"\n⚠ {failures} mismatched responses")
+        return 1
+
+    print("\n✓ SQLite backend matches the pandas backend")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
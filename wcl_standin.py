@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Local WarcraftLogs Stand-In Server
+
+Serves recorded GraphQL responses (fixtures) over HTTP so the analyzer, the
+crawlers and the benchmark can run without spending API points. Point the
+tools at it with WARCRAFTLOGS_API_URL.
+
+Record mode is a proxy: every request is forwarded to the real API and the
+response is saved as a fixture. Serve mode answers from the fixtures and
+emulates the parts of the API the crawlers depend on:
+
+  - latency: a fixed delay plus seeded random jitter per request
+  - rateLimitData: points are spent per query and reset every hour
+  - 429s: returned once the hourly budget is spent, or at a random rate
+  - pagination: characterRankings pages report hasMorePages only when the
+    next page was recorded, and unrecorded pages come back empty
+
+Fixtures are keyed by the query text (whitespace-normalized) and variables and
+stored as one compressed file each (same codec as the event archive):
+
+    data/fixtures/<key>.json.zz
+
+Usage:
+    python wcl_standin.py record [--port 8790]
+    python wcl_standin.py serve [--port 8790] [--latency-ms 80] [--limit-per-hour 3600] [--error-rate 0.01]
+    python wcl_standin.py list
+
+    WARCRAFTLOGS_API_URL=http://127.0.0.1:8790 python analyze_druid.py <report_id> <boss_name> <player_name>
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from event_archive import encode_entry, decode_entry
+
+FIXTURE_DIR = os.environ.get('LIFEBLOOM_FIXTURE_DIR', 'data/fixtures')
+UPSTREAM_API_URL = "https://www.warcraftlogs.com/api/v2/user"
+DEFAULT_PORT = 8790
+
+# Serve-mode defaults (Standard tier budget, typical API round trip)
+DEFAULT_LATENCY_MS = 80
+DEFAULT_JITTER_MS = 20
+DEFAULT_LIMIT_PER_HOUR = 3600
+DEFAULT_POINTS_PER_QUERY = 1.0
+RATE_LIMIT_WINDOW_SECONDS = 3600
+
+
+def normalize_query(query):
+    """Query text with whitespace collapsed, so formatting changes don't change the key."""
+    return " ".join(query.split())
+
+
+def get_fixture_key(query, variables):
+    """Fixture key for one GraphQL request."""
+    payload = f"{normalize_query(query)}|{json.dumps(variables or {}, sort_keys=True)}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:24]
+
+
+def get_fixture_path(key):
+    """Fixture file for a key."""
+    return os.path.join(FIXTURE_DIR, f"{key}.json.zz")
+
+
+def save_fixture(query, variables, status, body):
+    """
+    Store one recorded response.
+
+    Returns:
+        Fixture key
+    """
+    key = get_fixture_key(query, variables)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = get_fixture_path(key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_entry({
+            "query": normalize_query(query),
+            "variables": variables or {},
+            "status": status,
+            "body": body,
+            "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }))
+    os.replace(tmp_path, path)
+    return key
+
+
+def load_fixture(query, variables):
+    """Recorded response for a request, or None if it was never recorded."""
+    path = get_fixture_path(get_fixture_key(query, variables))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return decode_entry(f.read())
+
+
+def is_rate_limit_query(query):
+    """Whether a request only asks for rateLimitData (answered from the server's own budget)."""
+    return 'rateLimitData' in query and 'reportData' not in query and 'worldData' not in query
+
+
+def get_rankings(body):
+    """The characterRankings object of a rankings response, or None."""
+    encounter = ((body or {}).get("data") or {}).get("worldData", {}).get("encounter") or {}
+    rankings = encounter.get("characterRankings")
+    return rankings if isinstance(rankings, dict) else None
+
+
+class StandInState:
+    """Rate limit budget, random source and request counters shared by all handler threads."""
+
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS, jitter_ms=DEFAULT_JITTER_MS,
+                 limit_per_hour=DEFAULT_LIMIT_PER_HOUR, points_per_query=DEFAULT_POINTS_PER_QUERY,
+                 error_rate=0.0, seed=0, upstream=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.limit_per_hour = limit_per_hour
+        self.points_per_query = points_per_query
+        self.error_rate = error_rate
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.points_spent = 0.0
+        self.stats = {'requests': 0, 'served': 0, 'missing': 0, 'rate_limited': 0, 'recorded': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get_delay(self):
+        """Seconds to wait before answering one request."""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def get_rate_limit_data(self):
+        """Current budget in the shape of the rateLimitData query."""
+        with self.lock:
+            self.reset_window_if_due()
+            return {
+                "limitPerHour": self.limit_per_hour,
+                "pointsSpentThisHour": round(self.points_spent, 2),
+                "pointsResetIn": int(self.window_start + RATE_LIMIT_WINDOW_SECONDS - time.time())
+            }
+
+    def reset_window_if_due(self):
+        if time.time() - self.window_start >= RATE_LIMIT_WINDOW_SECONDS:
+            self.window_start = time.time()
+            self.points_spent = 0.0
+
+    def spend_points(self):
+        """
+        Charge one query against the hourly budget.
+
+        Returns:
+            False if the request should get a 429 (budget spent or injected error)
+        """
+        with self.lock:
+            self.reset_window_if_due()
+            if self.points_spent + self.points_per_query > self.limit_per_hour:
+                return False
+            if self.error_rate and self.random.random() < self.error_rate:
+                return False
+            self.points_spent += self.points_per_query
+            return True
+
+
+def serve_request(state, query, variables):
+    """
+    Answer one GraphQL request from the fixtures.
+
+    Returns:
+        Tuple of (status code, response body dict)
+    """
+    if is_rate_limit_query(query):
+        return 200, {"data": {"rateLimitData": state.get_rate_limit_data()}}
+
+    if not state.spend_points():
+        state.count('rate_limited')
+        return 429, {"error": "Too Many Requests"}
+
+    fixture = load_fixture(query, variables)
+    page = (variables or {}).get("page")
+
+    if fixture is None and page and page > 1:
+        # Past the last recorded rankings page: an empty final page
+        first_page = load_fixture(query, dict(variables, page=1))
+        rankings = get_rankings(first_page["body"]) if first_page else None
+        if rankings is not None:
+            state.count('served')
+            body = json.loads(json.dumps(first_page["body"]))
+            get_rankings(body).update(page=page, hasMorePages=False, count=0, rankings=[])
+            return 200, body
+
+    if fixture is None:
+        state.count('missing')
+        return 200, {"errors": [{"message": "Request not recorded in the stand-in fixtures"}]}
+
+    state.count('served')
+    body = fixture["body"]
+    rankings = get_rankings(body) if page else None
+    if rankings is not None:
+        # Only advertise pages that can actually be served
+        rankings["hasMorePages"] = load_fixture(query, dict(variables, page=page + 1)) is not None
+    return fixture["status"], body
+
+
+def record_request(state, query, variables, headers):
+    """
+    Forward one request to the real API and store the response as a fixture.
+
+    Returns:
+        Tuple of (status code, response body dict)
+    """
+    import requests
+
+    payload = {"query": query}
+    if variables:
+        payload["variables"] = variables
+    response = requests.post(state.upstream, json=payload, headers=headers, timeout=60)
+    body = response.json()
+
+    # Rate limit status is live data, and failures shouldn't be replayed
+    if response.status_code == 200 and "errors" not in body and not is_rate_limit_query(query):
+        save_fixture(query, variables, response.status_code, body)
+        state.count('recorded')
+    return response.status_code, body
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Handles GraphQL POSTs for the stand-in server."""
+
+    def do_POST(self):
+        state = self.server.state
+        state.count('requests')
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+
+        if state.upstream:
+            forward_headers = {"Content-Type": "application/json"}
+            if self.headers.get('Authorization'):
+                forward_headers["Authorization"] = self.headers['Authorization']
+            status, body = record_request(state, query, variables, forward_headers)
+        else:
+            time.sleep(state.get_delay())
+            status, body = serve_request(state, query, variables)
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """Suppress per-request logging"""
+        pass
+
+
+def start_server(state, port=0):
+    """
+    Start the stand-in on a background thread.
+
+    Args:
+        state: StandInState (set state.upstream to record instead of serve)
+        port: Port to bind on 127.0.0.1 (0 picks a free one)
+
+    Returns:
+        The running ThreadingHTTPServer; its URL is get_server_url(server)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandInHandler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='wcl-standin', daemon=True).start()
+    return server
+
+
+def get_server_url(server):
+    """URL to use as WARCRAFTLOGS_API_URL for a running stand-in."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def list_fixtures():
+    """Print every recorded fixture."""
+    if not os.path.isdir(FIXTURE_DIR):
+        print(f"⚠ No fixtures in {FIXTURE_DIR}")
+        return
+
+    total_bytes = 0
+    count = 0
+    for filename in sorted(os.listdir(FIXTURE_DIR)):
+        if not filename.endswith('.json.zz'):
+            continue
+        path = os.path.join(FIXTURE_DIR, filename)
+        with open(path, 'rb') as f:
+            blob = f.read()
+        fixture = decode_entry(blob)
+        total_bytes += len(blob)
+        count += 1
+        print(f"  {filename[:24]}  {json.dumps(fixture['variables'])[:60]:<60} {len(blob):>10,} bytes  {fixture['recorded_at']}")
+    print(f"\n{count} fixtures, {total_bytes:,} bytes")
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Local WarcraftLogs stand-in server")
+    parser.add_argument("command", choices=["serve", "record", "list"])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--upstream", default=UPSTREAM_API_URL, help="API to forward to in record mode")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--limit-per-hour", type=int, default=DEFAULT_LIMIT_PER_HOUR)
+    parser.add_argument("--points-per-query", type=float, default=DEFAULT_POINTS_PER_QUERY)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of queries answered with 429")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency jitter and injected 429s")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        list_fixtures()
+        return 0
+
+    state = StandInState(args.latency_ms, args.jitter_ms, args.limit_per_hour, args.points_per_query,
+                         args.error_rate, args.seed,
+                         upstream=args.upstream if args.command == 'record' else None)
+    server = start_server(state, args.port)
+    mode = f"recording from {args.upstream}" if state.upstream else f"serving {FIXTURE_DIR}"
+    print(f"✓ WarcraftLogs stand-in {mode} at {get_server_url(server)}")
+    print(f"  export WARCRAFTLOGS_API_URL={get_server_url(server)}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n✓ Stopped: {json.dumps(state.stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
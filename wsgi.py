@@ -1,7 +1,15 @@
 """
 WSGI entry point for production deployment
 """
-from app import app
+import gc
+from app import app, warm_datasets
+
+# Load every dataset at import time. With gunicorn --preload (or uwsgi
+# without lazy-apps) this runs once in the master, before workers fork.
+warm_datasets()
+
+# Keep the garbage collector from touching (and un-sharing) preloaded objects
+gc.freeze()
 
 if __name__ == "__main__":
     app.run()